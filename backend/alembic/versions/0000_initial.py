@@ -0,0 +1,88 @@
+"""Esquema inicial: companies, scrape_logs, aum_snapshots e usage
+
+Revision ID: 0000_initial
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+Raiz da cadeia de migrações. As tabelas podem já existir (create_all no
+startup da aplicação), por isso só as que faltam são criadas.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_initial'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("companies"):
+        op.create_table(
+            "companies",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("url_site", sa.String()),
+            sa.Column("url_linkedin", sa.String()),
+            sa.Column("url_instagram", sa.String()),
+            sa.Column("url_x", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_companies_id", "companies", ["id"])
+        op.create_index("ix_companies_name", "companies", ["name"])
+
+    if not inspector.has_table("scrape_logs"):
+        op.create_table(
+            "scrape_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id"), nullable=False),
+            sa.Column("url", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("content_type", sa.String()),
+            sa.Column("scraped_content", sa.Text()),
+            sa.Column("error_message", sa.Text()),
+            sa.Column("scraped_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_scrape_logs_id", "scrape_logs", ["id"])
+
+    if not inspector.has_table("aum_snapshots"):
+        op.create_table(
+            "aum_snapshots",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id"), nullable=False),
+            sa.Column("aum_raw_text", sa.String()),
+            sa.Column("aum_normalized", sa.Float()),
+            sa.Column("source_url", sa.String()),
+            sa.Column("source_content", sa.Text()),
+            sa.Column("extraction_method", sa.String()),
+            sa.Column("confidence_score", sa.Float()),
+            sa.Column("extracted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_aum_snapshots_id", "aum_snapshots", ["id"])
+
+    if not inspector.has_table("usage"):
+        op.create_table(
+            "usage",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer()),
+            sa.Column("prompt_tokens", sa.Integer()),
+            sa.Column("completion_tokens", sa.Integer()),
+            sa.Column("total_tokens", sa.Integer()),
+            sa.Column("cost_usd", sa.Float()),
+            sa.Column("model_used", sa.String()),
+            sa.Column("request_type", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_usage_id", "usage", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("usage")
+    op.drop_table("aum_snapshots")
+    op.drop_table("scrape_logs")
+    op.drop_table("companies")
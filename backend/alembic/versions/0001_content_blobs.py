@@ -0,0 +1,134 @@
+"""Move textos grandes para content_blobs (comprimidos, deduplicados por hash)
+
+Revision ID: 0001_content_blobs
+Revises: 0000_initial
+Create Date: 2026-10-19 00:00:00
+
+scrape_logs.scraped_content e aum_snapshots.source_content viram referências
+(sha256) para content_blobs. As tabelas podem já existir via create_all, por
+isso cada passo confere o esquema atual antes de alterar.
+"""
+import hashlib
+import zlib
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_content_blobs'
+down_revision = '0000_initial'
+branch_labels = None
+depends_on = None
+
+# (tabela, coluna de texto antiga, coluna de hash nova)
+MOVED_COLUMNS = [
+    ("scrape_logs", "scraped_content", "scraped_content_hash"),
+    ("aum_snapshots", "source_content", "source_content_hash"),
+]
+
+BATCH_SIZE = 1000
+
+content_blobs = sa.table(
+    "content_blobs",
+    sa.column("hash", sa.String),
+    sa.column("data", sa.LargeBinary),
+    sa.column("size", sa.Integer),
+)
+
+
+def _columns(bind, table):
+    return {column["name"] for column in sa.inspect(bind).get_columns(table)}
+
+
+def _move_to_blobs(bind, table_name, old, new):
+    """Copia os textos para content_blobs em lotes e grava o hash em cada linha"""
+    table = sa.table(table_name, sa.column("id", sa.Integer), sa.column(old, sa.Text), sa.column(new, sa.String))
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c[old])
+            .where(table.c.id > last_id, table.c[old].isnot(None))
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        digests = {}
+        updates = []
+        for row in rows:
+            text = row[1]
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            digests.setdefault(digest, text)
+            updates.append({"row_id": row.id, "digest": digest})
+
+        existing = set(bind.execute(
+            sa.select(content_blobs.c.hash).where(content_blobs.c.hash.in_(list(digests)))
+        ).scalars())
+        new_blobs = [
+            {"hash": digest, "data": zlib.compress(text.encode("utf-8"), 6), "size": len(text)}
+            for digest, text in digests.items() if digest not in existing
+        ]
+        if new_blobs:
+            bind.execute(content_blobs.insert(), new_blobs)
+
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam("row_id")).values({new: sa.bindparam("digest")}),
+            updates
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if not sa.inspect(bind).has_table("content_blobs"):
+        op.create_table(
+            "content_blobs",
+            sa.Column("hash", sa.String(64), primary_key=True),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    for table, old, new in MOVED_COLUMNS:
+        if not sa.inspect(bind).has_table(table):
+            continue
+        columns = _columns(bind, table)
+
+        if new not in columns:
+            with op.batch_alter_table(table) as batch:
+                batch.add_column(sa.Column(new, sa.String(64), nullable=True))
+                batch.create_index(f"ix_{table}_{new}", [new])
+                batch.create_foreign_key(f"fk_{table}_{new}", "content_blobs", [new], ["hash"])
+
+        if old in columns:
+            _move_to_blobs(bind, table, old, new)
+            with op.batch_alter_table(table) as batch:
+                batch.drop_column(old)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    for table_name, old, new in MOVED_COLUMNS:
+        with op.batch_alter_table(table_name) as batch:
+            batch.add_column(sa.Column(old, sa.Text(), nullable=True))
+
+        table = sa.table(table_name, sa.column(old, sa.Text), sa.column(new, sa.String))
+        for digest, data in bind.execute(
+            sa.select(content_blobs.c.hash, content_blobs.c.data)
+            .where(content_blobs.c.hash.in_(sa.select(table.c[new]).where(table.c[new].isnot(None))))
+        ):
+            bind.execute(
+                table.update().where(table.c[new] == digest)
+                .values({old: zlib.decompress(data).decode("utf-8")})
+            )
+
+        with op.batch_alter_table(table_name) as batch:
+            batch.drop_constraint(f"fk_{table_name}_{new}", type_="foreignkey")
+            batch.drop_index(f"ix_{table_name}_{new}")
+            batch.drop_column(new)
+
+    op.drop_table("content_blobs")
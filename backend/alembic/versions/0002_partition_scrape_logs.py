@@ -0,0 +1,147 @@
+"""Particiona scrape_logs por mês e cria os resumos diários
+
+Revision ID: 0002_partition_scrape_logs
+Revises: 0001_content_blobs
+Create Date: 2026-10-19 00:00:00
+
+No PostgreSQL scrape_logs vira uma tabela particionada por RANGE (scraped_at)
+com uma partição por mês (scrape_logs_yAAAAmMM) e uma default. A chave
+primária passa a ser (id, scraped_at), exigência do particionamento. Em
+outros bancos só a tabela de resumos é criada.
+"""
+from datetime import date, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_partition_scrape_logs'
+down_revision = '0001_content_blobs'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 2
+
+COLUMNS = "id, company_id, url, status, content_type, scraped_content_hash, archive_ref, error_message, scraped_at"
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _create_summaries(bind):
+    if "scrape_log_daily_summaries" in sa.inspect(bind).get_table_names():
+        return
+
+    op.create_table(
+        "scrape_log_daily_summaries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("content_type", sa.String()),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("log_count", sa.Integer(), default=0),
+        sa.Column("url_count", sa.Integer(), default=0),
+        sa.Column("first_scraped_at", sa.DateTime(timezone=True)),
+        sa.Column("last_scraped_at", sa.DateTime(timezone=True)),
+        sa.Column("compacted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("company_id", "day", "content_type", "status", name="uq_scrape_log_daily_summary"),
+    )
+    op.create_index("ix_scrape_log_daily_summaries_id", "scrape_log_daily_summaries", ["id"])
+    op.create_index("ix_scrape_log_daily_summaries_company_id", "scrape_log_daily_summaries", ["company_id"])
+    op.create_index("ix_scrape_log_daily_summaries_day", "scrape_log_daily_summaries", ["day"])
+
+
+def _create_indexes():
+    op.create_index("ix_scrape_logs_id", "scrape_logs", ["id"])
+    op.create_index("ix_scrape_logs_company_id_scraped_at", "scrape_logs", ["company_id", "scraped_at"])
+    op.create_index("ix_scrape_logs_scraped_content_hash", "scrape_logs", ["scraped_content_hash"])
+    op.create_index("ix_scrape_logs_archive_ref", "scrape_logs", ["archive_ref"])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _create_summaries(bind)
+
+    if bind.dialect.name != "postgresql":
+        return
+
+    relkind = bind.execute(sa.text("SELECT relkind FROM pg_class WHERE relname = 'scrape_logs'")).scalar()
+    if relkind == "p":
+        return
+
+    # A sequência do id sobrevive à tabela antiga
+    op.execute("ALTER TABLE scrape_logs ADD COLUMN IF NOT EXISTS archive_ref VARCHAR(64)")
+    op.execute("ALTER SEQUENCE scrape_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE scrape_logs RENAME TO scrape_logs_legacy")
+
+    op.execute("""
+        CREATE TABLE scrape_logs (
+            id INTEGER NOT NULL DEFAULT nextval('scrape_logs_id_seq'),
+            company_id INTEGER NOT NULL REFERENCES companies (id),
+            url VARCHAR NOT NULL,
+            status VARCHAR NOT NULL,
+            content_type VARCHAR,
+            scraped_content_hash VARCHAR(64) REFERENCES content_blobs (hash),
+            archive_ref VARCHAR(64),
+            error_message TEXT,
+            scraped_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, scraped_at)
+        ) PARTITION BY RANGE (scraped_at)
+    """)
+    op.execute("CREATE TABLE scrape_logs_default PARTITION OF scrape_logs DEFAULT")
+
+    # Uma partição por mês, do log mais antigo até MONTHS_AHEAD meses à frente
+    oldest = bind.execute(sa.text("SELECT min(scraped_at) FROM scrape_logs_legacy")).scalar()
+    month = (oldest.date() if oldest else date.today()).replace(day=1)
+    last = date.today().replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE scrape_logs_y{month.year}m{month.month:02d} PARTITION OF scrape_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+
+    op.execute(
+        f"INSERT INTO scrape_logs ({COLUMNS}) "
+        f"SELECT id, company_id, url, status, content_type, scraped_content_hash, archive_ref, "
+        f"error_message, COALESCE(scraped_at, now()) FROM scrape_logs_legacy"
+    )
+    op.execute("DROP TABLE scrape_logs_legacy")
+    op.execute("ALTER SEQUENCE scrape_logs_id_seq OWNED BY scrape_logs.id")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        relkind = bind.execute(sa.text("SELECT relkind FROM pg_class WHERE relname = 'scrape_logs'")).scalar()
+        if relkind == "p":
+            op.execute("ALTER SEQUENCE scrape_logs_id_seq OWNED BY NONE")
+            op.execute("ALTER TABLE scrape_logs RENAME TO scrape_logs_partitioned")
+            for index in ("id", "company_id_scraped_at", "scraped_content_hash", "archive_ref"):
+                op.execute(f"DROP INDEX IF EXISTS ix_scrape_logs_{index}")
+
+            op.execute("""
+                CREATE TABLE scrape_logs (
+                    id INTEGER NOT NULL DEFAULT nextval('scrape_logs_id_seq') PRIMARY KEY,
+                    company_id INTEGER NOT NULL REFERENCES companies (id),
+                    url VARCHAR NOT NULL,
+                    status VARCHAR NOT NULL,
+                    content_type VARCHAR,
+                    scraped_content_hash VARCHAR(64) REFERENCES content_blobs (hash),
+                    archive_ref VARCHAR(64),
+                    error_message TEXT,
+                    scraped_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+                )
+            """)
+            op.execute(f"INSERT INTO scrape_logs ({COLUMNS}) SELECT {COLUMNS} FROM scrape_logs_partitioned")
+            # Remove também todas as partições
+            op.execute("DROP TABLE scrape_logs_partitioned")
+            op.execute("ALTER SEQUENCE scrape_logs_id_seq OWNED BY scrape_logs.id")
+            _create_indexes()
+
+    op.drop_table("scrape_log_daily_summaries")
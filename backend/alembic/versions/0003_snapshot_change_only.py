@@ -0,0 +1,118 @@
+"""Intervalo de validade nos aum_snapshots (histórico só com mudanças)
+
+Revision ID: 0003_snapshot_change_only
+Revises: 0002_partition_scrape_logs
+Create Date: 2026-10-19 00:00:00
+
+Adiciona first_seen_at, last_seen_at e observation_count e compacta o
+histórico existente: snapshots consecutivos da mesma empresa com o mesmo
+valor viram um único intervalo.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_snapshot_change_only'
+down_revision = '0002_partition_scrape_logs'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+snapshots = sa.table(
+    "aum_snapshots",
+    sa.column("id", sa.Integer),
+    sa.column("company_id", sa.Integer),
+    sa.column("aum_raw_text", sa.String),
+    sa.column("aum_normalized", sa.Float),
+    sa.column("extracted_at", sa.DateTime),
+    sa.column("first_seen_at", sa.DateTime),
+    sa.column("last_seen_at", sa.DateTime),
+    sa.column("observation_count", sa.Integer),
+)
+
+
+def _same_value(previous, current):
+    if previous.aum_raw_text == current.aum_raw_text:
+        return True
+    return previous.aum_normalized is not None and previous.aum_normalized == current.aum_normalized
+
+
+def _compact_history(bind):
+    """Funde snapshots consecutivos de mesmo valor no primeiro de cada sequência"""
+    # Por empresa: snapshot mantido, repetições e última vez em que o valor foi visto
+    runs = {}
+    finished = []
+    to_delete = []
+    last_id = 0
+
+    while True:
+        rows = bind.execute(
+            sa.select(snapshots.c.id, snapshots.c.company_id, snapshots.c.aum_raw_text,
+                      snapshots.c.aum_normalized, snapshots.c.extracted_at)
+            .where(snapshots.c.id > last_id)
+            .order_by(snapshots.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for row in rows:
+            run = runs.get(row.company_id)
+            if run is not None and _same_value(run["row"], row):
+                run["count"] += 1
+                run["last_seen"] = row.extracted_at
+                to_delete.append(row.id)
+                continue
+            if run is not None and run["count"] > 1:
+                finished.append(run)
+            runs[row.company_id] = {"row": row, "count": 1, "last_seen": row.extracted_at}
+
+        _apply(bind, finished, to_delete)
+
+    _apply(bind, finished + [run for run in runs.values() if run["count"] > 1], to_delete)
+
+
+def _apply(bind, runs, to_delete):
+    if runs:
+        bind.execute(
+            snapshots.update().where(snapshots.c.id == sa.bindparam("kept_id"))
+            .values(last_seen_at=sa.bindparam("seen"), observation_count=sa.bindparam("seen_count")),
+            [{"kept_id": run["row"].id, "seen": run["last_seen"], "seen_count": run["count"]} for run in runs]
+        )
+        runs.clear()
+    if to_delete:
+        bind.execute(snapshots.delete().where(snapshots.c.id.in_(to_delete)))
+        to_delete.clear()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("aum_snapshots")}
+
+    with op.batch_alter_table("aum_snapshots") as batch:
+        if "first_seen_at" not in columns:
+            batch.add_column(sa.Column("first_seen_at", sa.DateTime(timezone=True), server_default=sa.func.now()))
+        if "last_seen_at" not in columns:
+            batch.add_column(sa.Column("last_seen_at", sa.DateTime(timezone=True), server_default=sa.func.now()))
+        if "observation_count" not in columns:
+            batch.add_column(sa.Column("observation_count", sa.Integer(), server_default="1"))
+
+    bind.execute(
+        snapshots.update().values(
+            first_seen_at=snapshots.c.extracted_at,
+            last_seen_at=snapshots.c.extracted_at,
+            observation_count=1
+        )
+    )
+    _compact_history(bind)
+
+
+def downgrade() -> None:
+    # O histórico compactado não é expandido de volta
+    with op.batch_alter_table("aum_snapshots") as batch:
+        batch.drop_column("observation_count")
+        batch.drop_column("last_seen_at")
+        batch.drop_column("first_seen_at")
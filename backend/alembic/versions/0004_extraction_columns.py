@@ -0,0 +1,54 @@
+"""Colunas de extração em aum_snapshots e referência ao arquivo em scrape_logs
+
+Revision ID: 0004_extraction_columns
+Revises: 0003_snapshot_change_only
+Create Date: 2026-10-19 00:00:00
+
+aum_snapshots.source_type (rendimento por fonte), evidence_fingerprints e
+answer_fingerprints (extração incremental) e scrape_logs.archive_ref
+(arquivo de páginas) em qualquer banco. create_all não altera tabelas já
+existentes, por isso cada coluna só é criada se ainda faltar.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_extraction_columns'
+down_revision = '0003_snapshot_change_only'
+branch_labels = None
+depends_on = None
+
+# (tabela, coluna)
+NEW_COLUMNS = [
+    ("aum_snapshots", sa.Column("source_type", sa.String(), nullable=True)),
+    ("aum_snapshots", sa.Column("evidence_fingerprints", sa.JSON(), nullable=True)),
+    ("aum_snapshots", sa.Column("answer_fingerprints", sa.JSON(), nullable=True)),
+    ("scrape_logs", sa.Column("archive_ref", sa.String(64), nullable=True)),
+]
+
+INDEXES = [
+    ("ix_scrape_logs_archive_ref", "scrape_logs", ["archive_ref"]),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table, column in NEW_COLUMNS:
+        if column.name not in {existing["name"] for existing in inspector.get_columns(table)}:
+            op.add_column(table, column)
+
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in sa.inspect(bind).get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    for table, column in reversed(NEW_COLUMNS):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column.name)
@@ -0,0 +1,51 @@
+"""Tamanho do conteúdo em scrape_logs
+
+Revision ID: 0005_scrape_log_content_size
+Revises: 0004_extraction_columns
+Create Date: 2026-10-19 00:00:00
+
+Páginas arquivadas não guardam texto no log; content_size mantém o tamanho
+do texto extraído. Logs existentes recebem o tamanho do blob referenciado.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_scrape_log_content_size'
+down_revision = '0004_extraction_columns'
+branch_labels = None
+depends_on = None
+
+scrape_logs = sa.table(
+    "scrape_logs",
+    sa.column("scraped_content_hash", sa.String),
+    sa.column("content_size", sa.Integer),
+)
+
+content_blobs = sa.table(
+    "content_blobs",
+    sa.column("hash", sa.String),
+    sa.column("size", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("scrape_logs")}
+    if "content_size" not in columns:
+        op.add_column("scrape_logs", sa.Column("content_size", sa.Integer(), nullable=True))
+
+    op.execute(
+        scrape_logs.update()
+        .where(scrape_logs.c.content_size.is_(None), scrape_logs.c.scraped_content_hash.isnot(None))
+        .values(content_size=(
+            sa.select(content_blobs.c.size)
+            .where(content_blobs.c.hash == scrape_logs.c.scraped_content_hash)
+            .scalar_subquery()
+        ))
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("scrape_logs") as batch:
+        batch.drop_column("content_size")
@@ -0,0 +1,44 @@
+"""Data do último teste HTTP em domain_fetch_strategies
+
+Revision ID: 0006_fetch_strategy_probed_at
+Revises: 0005_scrape_log_content_size
+Create Date: 2026-10-19 00:00:00
+
+O TTL dos domínios marcados como browser passa a contar de probed_at, que
+só muda quando HTTP é testado de novo (updated_at muda a cada fetch).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_fetch_strategy_probed_at'
+down_revision = '0005_scrape_log_content_size'
+branch_labels = None
+depends_on = None
+
+strategies = sa.table(
+    "domain_fetch_strategies",
+    sa.column("updated_at", sa.DateTime),
+    sa.column("probed_at", sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Tabela criada pelo create_all no startup; sem ela não há o que migrar
+    if not inspector.has_table("domain_fetch_strategies"):
+        return
+
+    if "probed_at" not in {column["name"] for column in inspector.get_columns("domain_fetch_strategies")}:
+        op.add_column(
+            "domain_fetch_strategies",
+            sa.Column("probed_at", sa.DateTime(timezone=True), server_default=sa.func.now())
+        )
+        op.execute(strategies.update().values(probed_at=strategies.c.updated_at))
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("domain_fetch_strategies"):
+        with op.batch_alter_table("domain_fetch_strategies") as batch:
+            batch.drop_column("probed_at")
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.models.company import Company
 from app.schemas import CompanyCreate
+from app.services.url_validator import URLValidator, is_definitive_failure
 import requests
 import re
 import logging
@@ -18,6 +19,7 @@ router = APIRouter(
 @router.post("/download-and-load-companies")
 async def download_and_load_companies(
     limit: int = None,  # Limitar número de empresas (None = todas)
+    validate_urls: bool = True,  # Validar URLs adivinhadas (DNS + HEAD)
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -95,10 +97,14 @@ async def download_and_load_companies(
                 logger.error(f"Erro ao processar {name}: {str(e)}")
                 continue
         
-        # 6. SALVAR no banco
+        # 6. VALIDAR URLs adivinhadas e tentar alternativas
+        if validate_urls and companies_created:
+            await _apply_validated_urls(companies_created, db)
+        
+        # 7. SALVAR no banco
         await db.commit()
         
-        # 7. REFRESH objetos para ter IDs
+        # 8. REFRESH objetos para ter IDs
         for company in companies_created:
             await db.refresh(company)
         
@@ -127,62 +133,153 @@ async def download_and_load_companies(
             detail=f"Erro no download automático: {str(e)}"
         )
 
+@router.post("/revalidate-urls")
+async def revalidate_company_urls(
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Revalida as URLs das empresas já cadastradas, trocando URLs mortas
+    (DNS inexistente, 404/410) por alternativas que responderam
+    """
+    from sqlalchemy import select
+    
+    result = await db.execute(select(Company))
+    companies = result.scalars().all()
+    
+    changes = await _apply_validated_urls(companies, db)
+    await db.commit()
+    
+    return {
+        "message": "URLs revalidadas",
+        "companies_checked": len(companies),
+        "companies_updated": len(changes),
+        "changes": changes[:50]
+    }
+
+async def _apply_validated_urls(companies: list, db: AsyncSession) -> list:
+    """
+    Valida as URLs de cada empresa e troca só as definitivamente mortas por
+    uma alternativa confirmada; falhas passageiras mantêm a URL e nada é apagado
+    """
+    fields = {
+        "site": "url_site",
+        "linkedin": "url_linkedin",
+        "instagram": "url_instagram",
+        "x": "url_x"
+    }
+    
+    # URLs curadas não passam pela revalidação
+    companies = [company for company in companies if company.name not in SPECIAL_CASE_URLS]
+    
+    candidates_by_company = {}
+    for index, company in enumerate(companies):
+        alternatives = generate_url_candidates(company.name)
+        candidates_by_company[index] = {
+            content_type: list(dict.fromkeys(
+                url for url in [getattr(company, field)] + alternatives[content_type] if url
+            ))
+            for content_type, field in fields.items()
+        }
+    
+    validator = URLValidator()
+    checks = await validator.check_urls_cached(db, (
+        url
+        for candidates in candidates_by_company.values()
+        for urls in candidates.values()
+        for url in urls
+    ))
+    
+    changes = []
+    for index, company in enumerate(companies):
+        for content_type, field in fields.items():
+            old_url = getattr(company, field) or None
+            if old_url:
+                alive, reason = checks.get(old_url, (True, None))
+                if alive or not is_definitive_failure(reason):
+                    continue
+            
+            new_url = next(
+                (url for url in candidates_by_company[index][content_type]
+                 if url != old_url and checks.get(url, (False, None))[0]),
+                None
+            )
+            if new_url is None:
+                continue
+            
+            setattr(company, field, new_url)
+            changes.append({
+                "company": company.name,
+                "field": field,
+                "old": old_url,
+                "new": new_url
+            })
+    
+    logger.info(f"Validação de URLs: {len(changes)} URLs alteradas")
+    return changes
+
+# Casos especiais conhecidos (URLs reais, curadas: a revalidação não as altera)
+SPECIAL_CASE_URLS = {
+    'XP Investimentos': (
+        'https://www.xpi.com.br',
+        'https://www.linkedin.com/company/xp-investimentos',
+        'https://www.instagram.com/xpinvestimentos',
+        'https://x.com/xpinvestimentos'
+    ),
+    'BTG Pactual': (
+        'https://www.btgpactual.com',
+        'https://www.linkedin.com/company/btg-pactual',
+        'https://www.instagram.com/btgpactual',
+        'https://x.com/btgpactual'
+    ),
+    'Warren Investimentos': (
+        'https://warren.com.br',
+        'https://www.linkedin.com/company/warren-investimentos',
+        'https://www.instagram.com/warreninvestimentos',
+        'https://x.com/warren_inv'
+    ),
+    'Genial Investimentos': (
+        'https://www.genialinvestimentos.com.br',
+        'https://www.linkedin.com/company/genial-investimentos',
+        'https://www.instagram.com/genialinvestimentos',
+        ''
+    ),
+    'Itaú Asset Management': (
+        'https://www.itauassetmanagement.com.br',
+        'https://www.linkedin.com/company/itau-asset-management',
+        'https://www.instagram.com/itauasset',
+        ''
+    ),
+    'Hashdex': (
+        'https://www.hashdex.com.br',
+        'https://www.linkedin.com/company/hashdex',
+        'https://www.instagram.com/hashdex',
+        'https://x.com/hashdex'
+    ),
+    'Gávea Investimentos': (
+        'https://www.gavea.com.br',
+        'https://www.linkedin.com/company/gavea-investimentos',
+        'https://www.instagram.com/gaveainvestimentos',
+        ''
+    )
+}
+
 def generate_company_urls(company_name: str):
     """Gera URLs automaticamente baseado no nome da empresa"""
     
-    # Casos especiais conhecidos (URLs reais)
-    special_cases = {
-        'XP Investimentos': (
-            'https://www.xpi.com.br',
-            'https://www.linkedin.com/company/xp-investimentos',
-            'https://www.instagram.com/xpinvestimentos',
-            'https://x.com/xpinvestimentos'
-        ),
-        'BTG Pactual': (
-            'https://www.btgpactual.com',
-            'https://www.linkedin.com/company/btg-pactual',
-            'https://www.instagram.com/btgpactual',
-            'https://x.com/btgpactual'
-        ),
-        'Warren Investimentos': (
-            'https://warren.com.br',
-            'https://www.linkedin.com/company/warren-investimentos',
-            'https://www.instagram.com/warreninvestimentos',
-            'https://x.com/warren_inv'
-        ),
-        'Genial Investimentos': (
-            'https://www.genialinvestimentos.com.br',
-            'https://www.linkedin.com/company/genial-investimentos',
-            'https://www.instagram.com/genialinvestimentos',
-            ''
-        ),
-        'Itaú Asset Management': (
-            'https://www.itauassetmanagement.com.br',
-            'https://www.linkedin.com/company/itau-asset-management',
-            'https://www.instagram.com/itauasset',
-            ''
-        ),
-        'Hashdex': (
-            'https://www.hashdex.com.br',
-            'https://www.linkedin.com/company/hashdex',
-            'https://www.instagram.com/hashdex',
-            'https://x.com/hashdex'
-        ),
-        'Gávea Investimentos': (
-            'https://www.gavea.com.br',
-            'https://www.linkedin.com/company/gavea-investimentos',
-            'https://www.instagram.com/gaveainvestimentos',
-            ''
-        )
-    }
+    if company_name in SPECIAL_CASE_URLS:
+        return SPECIAL_CASE_URLS[company_name]
     
-    if company_name in special_cases:
-        return special_cases[company_name]
+    candidates = generate_url_candidates(company_name)
     
-    # Gerar URLs automaticamente
-    clean_name = company_name.lower()
+    site_url = candidates["site"][0]
+    linkedin_url = candidates["linkedin"][0]
+    instagram_url = candidates["instagram"][0]
+    x_url = ""  # Deixar vazio por padrão
     
-    # Remover acentos
+    return site_url, linkedin_url, instagram_url, x_url
+
+def _remove_accents(text: str) -> str:
+    """Remove acentos de um texto em minúsculas"""
     replacements = {
         'á': 'a', 'à': 'a', 'â': 'a', 'ã': 'a', 'ä': 'a',
         'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
@@ -193,7 +290,15 @@ def generate_company_urls(company_name: str):
     }
     
     for old, new in replacements.items():
-        clean_name = clean_name.replace(old, new)
+        text = text.replace(old, new)
+    
+    return text
+
+def _make_slug(company_name: str) -> str:
+    """Gera o slug base usado nas URLs adivinhadas"""
+    
+    # Remover acentos
+    clean_name = _remove_accents(company_name.lower())
     
     # Remover caracteres especiais
     clean_name = re.sub(r'[^\w\s]', '', clean_name)
@@ -213,13 +318,36 @@ def generate_company_urls(company_name: str):
     if len(clean_name) < 3:
         clean_name = re.sub(r'[^\w]', '', company_name.lower().replace(' ', ''))[:12]
     
-    # Gerar URLs
-    site_url = f"https://www.{clean_name}.com.br"
-    linkedin_url = f"https://www.linkedin.com/company/{clean_name}"
-    instagram_url = f"https://www.instagram.com/{clean_name}"
-    x_url = ""  # Deixar vazio por padrão
+    return clean_name
+
+def generate_url_candidates(company_name: str) -> dict:
+    """
+    Gera URLs candidatas por tipo, em ordem de preferência
+    (TLDs e slugs alternativos para validação)
+    """
+    slug = _make_slug(company_name)
     
-    return site_url, linkedin_url, instagram_url, x_url
+    # Slug com hífens a partir do nome completo (padrão comum no LinkedIn)
+    hyphen_slug = re.sub(r'[^a-z0-9]+', '-', _remove_accents(company_name.lower())).strip('-')
+    
+    return {
+        "site": [
+            f"https://www.{slug}.com.br",
+            f"https://{slug}.com.br",
+            f"https://www.{slug}.com",
+            f"https://www.{slug}investimentos.com.br",
+        ],
+        "linkedin": list(dict.fromkeys([
+            f"https://www.linkedin.com/company/{slug}",
+            f"https://www.linkedin.com/company/{hyphen_slug}",
+            f"https://www.linkedin.com/company/{slug}-investimentos",
+        ])),
+        "instagram": [
+            f"https://www.instagram.com/{slug}",
+            f"https://www.instagram.com/{slug}investimentos",
+        ],
+        "x": [],
+    }
 
 @router.post("/quick-demo-setup")
 async def quick_demo_setup(db: AsyncSession = Depends(get_db)):
@@ -58,7 +58,10 @@ async def get_company_aum_history(
     company_id: int,
     db: AsyncSession = Depends(get_db)
 ):
-    """Obtém histórico de AUM de uma empresa"""
+    """
+    Obtém histórico de AUM de uma empresa: cada snapshot é um intervalo em que
+    o valor se manteve (first_seen_at até last_seen_at, observation_count execuções)
+    """
     # Verificar se empresa existe
     result = await db.execute(
         select(Company).where(Company.id == company_id)
@@ -76,6 +79,7 @@ async def get_company_aum_history(
         select(AUMSnapshot)
         .where(AUMSnapshot.company_id == company_id)
         .order_by(AUMSnapshot.extracted_at.desc())
+        .options(selectinload(AUMSnapshot.source_content_blob))  # source_content vai na resposta
     )
     
     aum_snapshots = result.scalars().all()
@@ -127,7 +131,9 @@ async def get_company_latest_aum(
         "confidence_score": latest_aum.confidence_score,
         "source_url": latest_aum.source_url,
         "extraction_method": latest_aum.extraction_method,
-        "extracted_at": latest_aum.extracted_at
+        "extracted_at": latest_aum.extracted_at,
+        "last_seen_at": latest_aum.last_seen_at,
+        "observation_count": latest_aum.observation_count
     }
 
 @router.post("/load-from-csv")
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
-from app.core.database import get_db
+from typing import List, Optional
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.company import Company
 from app.services.scraper import WebScraper
 from app.services.ai_extractor import AIExtractor
-from app.services.excel_exporter import ExcelExporter
+from app.services.batch_extraction import BatchExtractionRunner
+from app.services.replay_pipeline import ReplayPipeline
+from app.services.log_retention import LogRetentionManager
+from app.services.single_flight import company_flight
+from app.services.export_jobs import get_export_jobs
 from app.services.csv_reader import CSVReader
 from app.schemas import ScrapeResponse
+from app.core.config import settings
 import logging
 import asyncio
 
@@ -41,13 +47,10 @@ async def scrape_company(
         )
     
     try:
-        # Executar scraping
-        scraper = WebScraper()
-        scraped_data = await scraper.scrape_company_urls(company, db, use_playwright)
-        
-        # Executar extração de AUM
-        ai_extractor = AIExtractor()
-        aum_snapshot = await ai_extractor.extract_aum_from_content(company, scraped_data, db)
+        # Pedidos concorrentes para a mesma empresa (inclusive do pipeline) compartilham a execução
+        aum_snapshot = await company_flight.do(
+            company_id, lambda: _scrape_and_extract(company_id, use_playwright)
+        )
         
         return ScrapeResponse(
             message="Scraping executado com sucesso",
@@ -120,10 +123,14 @@ async def scrape_all_companies(
 @router.post("/pipeline/full")
 async def run_full_pipeline(
     use_playwright: bool = False,
+    batch_file: bool = False,
     background_tasks: BackgroundTasks = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Executa pipeline completo: carrega CSV + scraping + extração AUM"""
+    """
+    Executa pipeline completo: carrega CSV + scraping + extração AUM
+    (batch_file=true usa a API de batch, para execuções noturnas)
+    """
     
     try:
         # 1. Carregar empresas do CSV
@@ -138,7 +145,8 @@ async def run_full_pipeline(
                 _process_all_companies,
                 companies,
                 use_playwright,
-                db
+                db,
+                batch_file
             )
             
             return {
@@ -147,7 +155,7 @@ async def run_full_pipeline(
                 "status": "processing"
             }
         else:
-            results = await _process_all_companies(companies, use_playwright, db)
+            results = await _process_all_companies(companies, use_playwright, db, batch_file)
             successful = len([r for r in results if r.get("status") == "success"])
             
             return {
@@ -165,23 +173,113 @@ async def run_full_pipeline(
             detail=f"Erro no pipeline: {str(e)}"
         )
 
+@router.post("/pipeline/replay")
+async def run_replay_pipeline(
+    dry_run: bool = True,
+    max_age_hours: Optional[int] = None,
+    company_id: Optional[List[int]] = Query(None)
+):
+    """
+    Reexecuta só a extração de AUM sobre o conteúdo salvo nos ScrapeLogs
+    (sem scraping); dry_run=true compara com os snapshots sem gravar
+    """
+    
+    try:
+        replay = ReplayPipeline(dry_run=dry_run, max_age_hours=max_age_hours)
+        report = await replay.run(company_id)
+        
+        if not report["companies"]:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Nenhum conteúdo coletado dentro da janela de replay"
+            )
+        
+        return report
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no replay da extração: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro no replay: {str(e)}"
+        )
+
+@router.post("/maintenance/retention")
+async def run_log_retention(
+    db: AsyncSession = Depends(get_db)
+):
+    """Compacta os scrape_logs antigos em resumos diários e descarta as partições expiradas"""
+    
+    try:
+        return await LogRetentionManager().run(db)
+    except Exception as e:
+        logger.error(f"Erro na retenção dos logs: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro na retenção: {str(e)}"
+        )
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+@router.post("/export/excel/jobs")
+async def create_excel_export_job(
+    db: AsyncSession = Depends(get_db)
+):
+    """Inicia a exportação do Excel em background (ou reaproveita o arquivo se os dados não mudaram)"""
+    
+    try:
+        return await get_export_jobs().submit(db)
+        
+    except Exception as e:
+        logger.error(f"Erro ao iniciar exportação do Excel: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro na exportação: {str(e)}"
+        )
+
+@router.get("/export/excel/jobs/{job_id}")
+async def get_excel_export_job(job_id: str):
+    """Status de um job de exportação"""
+    
+    job = get_export_jobs().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    return job
+
+@router.get("/export/excel/jobs/{job_id}/download")
+async def download_excel_export(job_id: str):
+    """Baixa o arquivo de um job de exportação concluído"""
+    
+    jobs = get_export_jobs()
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada")
+    
+    path = jobs.get_file(job_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Exportação não disponível (status: {job['status']})"
+        )
+    
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=job["filename"])
+
 @router.get("/export/excel")
 async def export_results_to_excel(
     db: AsyncSession = Depends(get_db)
 ):
-    """Exporta resultados para Excel"""
+    """Exporta resultados para Excel (aguarda o job de exportação sem bloquear o servidor)"""
     
     try:
-        exporter = ExcelExporter()
-        excel_data = await exporter.export_results(db)
+        jobs = get_export_jobs()
+        job = await jobs.wait((await jobs.submit(db))["job_id"])
         
-        filename = exporter.get_filename()
+        path = jobs.get_file(job["job_id"])
+        if path is None:
+            raise RuntimeError(job.get("error") or "arquivo não gerado")
         
-        return Response(
-            content=excel_data,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+        return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=job["filename"])
         
     except Exception as e:
         logger.error(f"Erro ao exportar Excel: {str(e)}")
@@ -248,45 +346,156 @@ async def get_scraping_status(
         "timestamp": datetime.now().isoformat()
     }
 
+async def _scrape_and_extract(company_id: int, use_playwright: bool):
+    """
+    Scraping + extração de uma empresa em sessão própria: a execução é
+    compartilhada e pode sobreviver ao request que a iniciou
+    """
+    async with AsyncSessionLocal() as db:
+        company = await db.get(Company, company_id)
+        
+        # Executar scraping
+        scraper = WebScraper()
+        scraped_data = await scraper.scrape_company_urls(company, db, use_playwright)
+        
+        # Executar extração de AUM (pedido interativo: pode usar hedge)
+        ai_extractor = AIExtractor(interactive=True)
+        return await ai_extractor.extract_aum_from_content(company, scraped_data, db)
+
 async def _process_all_companies(
     companies: List[Company],
     use_playwright: bool,
-    db: AsyncSession
+    db: AsyncSession,
+    batch_file: bool = False
 ) -> List[dict]:
-    """Função auxiliar para processar todas as empresas"""
+    """
+    Função auxiliar para processar todas as empresas
+
+    Com batch_file a extração vai para a API de batch (execuções noturnas):
+    mais barata e fora dos limites por minuto, mas o resultado demora.
+    """
     
     scraper = WebScraper()
     ai_extractor = AIExtractor()
+    batch_runner = BatchExtractionRunner(ai_extractor) if batch_file else None
     
     results = []
+    pending = []  # Empresas já scrapadas aguardando extração em lote
+    owned = set()  # Empresas cuja execução este pipeline publica no single-flight
     
-    for i, company in enumerate(companies):
-        logger.info(f"Processando empresa {i+1}/{len(companies)}: {company.name}")
-        
+    def publish(company_id: int, snapshot=None, error: BaseException = None):
+        if company_id in owned:
+            owned.discard(company_id)
+            company_flight.finish(company_id, result=snapshot, error=error)
+    
+    async def flush_pending():
         try:
-            # Scraping
-            scraped_data = await scraper.scrape_company_urls(company, db, use_playwright)
-            
-            # Extração AUM
-            aum_snapshot = await ai_extractor.extract_aum_from_content(company, scraped_data, db)
-            
-            results.append({
-                "company_id": company.id,
-                "company_name": company.name,
-                "status": "success",
-                "aum_found": aum_snapshot.aum_raw_text if aum_snapshot else "NAO_DISPONIVEL"
-            })
-            
+            snapshots = await ai_extractor.batch_extract_aum(pending, db, batched=True)
         except Exception as e:
-            logger.error(f"Erro processando {company.name}: {str(e)}")
+            logger.error(f"Erro na extração em lote: {str(e)}")
+            snapshots = []
+        by_company = {snapshot.company_id: snapshot for snapshot in snapshots}
+        for item in pending:
+            company = item["company"]
+            snapshot = by_company.get(company.id)
+            publish(company.id, snapshot)
             results.append({
                 "company_id": company.id,
                 "company_name": company.name,
-                "status": "failed",
-                "error": str(e)
+                "status": "success" if snapshot else "failed",
+                "aum_found": snapshot.aum_raw_text if snapshot else "NAO_DISPONIVEL"
             })
+        pending.clear()
+    
+    try:
+        for i, company in enumerate(companies):
+            logger.info(f"Processando empresa {i+1}/{len(companies)}: {company.name}")
+            
+            # Execução noturna em lote não segura a empresa: o resultado demora horas
+            if not batch_runner:
+                future, owner = company_flight.start(company.id)
+                if not owner:
+                    # Empresa já em processamento (ex: /scraping/company/{id}): reaproveitar o resultado
+                    try:
+                        aum_snapshot = await asyncio.shield(future)
+                        results.append({
+                            "company_id": company.id,
+                            "company_name": company.name,
+                            "status": "success",
+                            "aum_found": aum_snapshot.aum_raw_text if aum_snapshot else "NAO_DISPONIVEL"
+                        })
+                    except Exception as e:
+                        results.append({
+                            "company_id": company.id,
+                            "company_name": company.name,
+                            "status": "failed",
+                            "error": str(e)
+                        })
+                    continue
+                owned.add(company.id)
+            
+            try:
+                # Scraping
+                scraped_data = await scraper.scrape_company_urls(company, db, use_playwright)
+                
+                if batch_runner:
+                    await batch_runner.add_company(company, scraped_data, db)
+                    results.append({
+                        "company_id": company.id,
+                        "company_name": company.name,
+                        "status": "queued",
+                        "aum_found": "NAO_DISPONIVEL"
+                    })
+                elif settings.batched_extraction_enabled:
+                    # Extração AUM em lote, várias empresas por prompt
+                    pending.append({"company": company, "scraped_data": scraped_data})
+                    if len(pending) >= settings.batch_max_companies:
+                        await flush_pending()
+                else:
+                    # Extração AUM
+                    aum_snapshot = await ai_extractor.extract_aum_from_content(company, scraped_data, db)
+                    publish(company.id, aum_snapshot)
+                    
+                    results.append({
+                        "company_id": company.id,
+                        "company_name": company.name,
+                        "status": "success",
+                        "aum_found": aum_snapshot.aum_raw_text if aum_snapshot else "NAO_DISPONIVEL"
+                    })
+                
+            except Exception as e:
+                logger.error(f"Erro processando {company.name}: {str(e)}")
+                publish(company.id, error=e)
+                results.append({
+                    "company_id": company.id,
+                    "company_name": company.name,
+                    "status": "failed",
+                    "error": str(e)
+                })
+            
+            # Pequeno delay entre empresas
+            await asyncio.sleep(1)
         
-        # Pequeno delay entre empresas
-        await asyncio.sleep(1)
+        if pending:
+            await flush_pending()
+    finally:
+        # Pipeline interrompido: liberar quem aguarda as empresas ainda não publicadas
+        for company_id in list(owned):
+            publish(company_id, error=RuntimeError("Pipeline interrompido"))
+    
+    if batch_runner:
+        batch_error = None
+        try:
+            snapshots = await batch_runner.run(db)
+        except Exception as e:
+            logger.error(f"Erro na extração pelo arquivo de lote: {str(e)}")
+            batch_error, snapshots = e, []
+        by_company = {snapshot.company_id: snapshot for snapshot in snapshots}
+        for result in results:
+            snapshot = by_company.get(result["company_id"])
+            if result["status"] == "queued":
+                result["status"] = "success" if snapshot or batch_error is None else "failed"
+            if snapshot:
+                result["aum_found"] = snapshot.aum_raw_text
     
-    return results
\ No newline at end of file
+    return results
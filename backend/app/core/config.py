@@ -9,6 +9,14 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str = "chave-open-ai-aqui"
     openai_model: str = "gpt-4o"
+    openai_cheap_model: str = "gpt-4o-mini"  # Primeira tentativa da cascata de modelos
+    cascade_enabled: bool = False  # Modelo barato primeiro, escalando respostas duvidosas
+    openai_timeout: float = 30.0
+    openai_max_connections: int = 20
+    openai_max_keepalive_connections: int = 10
+    openai_keepalive_expiry: float = 60.0
+    openai_hedging_enabled: bool = False  # Envia cópia da chamada que passar do p95 de latência
+    openai_hedge_min_samples: int = 20  # Latências observadas antes de confiar no p95
     max_tokens_per_request: int = 1500
     
     # Budget
@@ -21,6 +29,87 @@ class Settings(BaseSettings):
     # Scraping
     max_concurrent_requests: int = 3
     request_delay: float = 1.0
+    max_response_bytes: int = 2000000  # Limite de leitura por página (bytes)
+    playwright_ready_timeout_ms: int = 3000  # Espera máxima por conteúdo dinâmico
+    playwright_ready_poll_ms: int = 250
+    js_shell_min_text_chars: int = 500  # Menos texto que isso + marcadores SPA = usar navegador
+    fetch_strategy_ttl_days: int = 30  # Re-testar HTTP em domínios marcados como browser
+    
+    # Retries e circuit breaker por domínio
+    fetch_retry_attempts: int = 3
+    fetch_retry_base_delay: float = 1.0
+    fetch_retry_max_delay: float = 10.0
+    circuit_failure_threshold: int = 5  # Falhas consecutivas até abrir o circuito
+    circuit_block_threshold: int = 2  # Respostas 403/429 até abrir o circuito
+    circuit_reset_seconds: float = 300.0
+    
+    # Validação de URLs adivinhadas
+    url_validation_timeout: float = 5.0
+    url_validation_concurrency: int = 20
+    url_negative_cache_ttl_hours: int = 168  # 7 dias
+    
+    # Crawl do site da gestora
+    site_crawl_enabled: bool = True
+    site_crawl_max_pages: int = 5  # Páginas internas além da home
+    site_crawl_max_depth: int = 2
+    aum_evidence_stop_score: float = 0.9  # Evidência forte de AUM encerra a busca
+    
+    # Ordem das fontes e parada antecipada
+    early_stop_enabled: bool = True
+    source_yield_min_samples: int = 20  # Fetches mínimos para confiar no rendimento histórico
+    source_min_yield_per_second: float = 0.005  # Abaixo disso a fonte é pulada (AUMs por segundo de fetch)
+    source_explore_rate: float = 0.1  # Chance de buscar mesmo assim uma fonte pulada, para manter as estatísticas
+    
+    # Extração em lote (várias empresas por prompt)
+    batched_extraction_enabled: bool = False
+    batch_max_companies: int = 8
+    batch_max_tokens_per_request: int = 6000
+    batch_company_token_budget: int = 600  # Tokens de conteúdo por empresa no lote
+    
+    # Extração por arquivo de lote (execuções noturnas)
+    openai_batch_base_url: str = "https://api.openai.com/v1"
+    batch_files_dir: str = "batch_files"
+    batch_poll_interval_seconds: float = 60.0
+    batch_timeout_seconds: float = 86400.0
+    batch_api_cost_multiplier: float = 0.5  # Desconto da API de batch sobre o preço normal
+    
+    # Histórico de AUM só com mudanças: valor repetido estende o snapshot anterior
+    snapshot_change_only: bool = True
+    
+    # Extração incremental: reaproveita o AUM anterior se a evidência não mudou
+    incremental_extraction_enabled: bool = True
+    
+    # Arquivo das páginas brutas (comprimido, endereçado pelo conteúdo)
+    archive_enabled: bool = True
+    archive_dir: str = "page_archive"
+    archive_segment_max_bytes: int = 256 * 1024 * 1024  # Novo segmento a cada 256 MB
+    archive_compression_level: int = 6  # zlib
+    
+    # Retenção dos scrape_logs (partições mensais no PostgreSQL)
+    scrape_log_retention_days: int = 90  # Logs mais antigos viram resumos diários
+    scrape_log_partition_months_ahead: int = 2  # Partições criadas com antecedência
+    log_retention_interval_hours: float = 24.0  # 0 = sem job periódico
+    export_log_window_days: int = 30  # Logs incluídos na exportação
+    export_chunk_size: int = 1000  # Linhas lidas do banco por bloco na exportação
+    
+    # Exportação do Excel em background (arquivos reaproveitados enquanto os dados não mudam)
+    export_dir: str = "exports"
+    export_workers: int = 1  # Threads dedicadas às exportações
+    export_keep_files: int = 5  # Arquivos mantidos em export_dir
+    
+    # Replay da extração a partir do conteúdo salvo nos ScrapeLogs (sem rede)
+    replay_max_age_hours: int = 168  # Só conteúdo coletado nos últimos 7 dias
+    replay_concurrency: int = 20  # Empresas extraídas em paralelo
+    
+    # Deduplicação de trechos entre fontes (Jaccard estimada por MinHash)
+    dedup_similarity_threshold: float = 0.8
+    
+    # Tokenização
+    tokenizer_cache_size: int = 10000  # Contagens de tokens memoizadas (LRU por hash do texto)
+    
+    # Processamento CPU-bound (parsing/tokenização fora do event loop)
+    cpu_pool_workers: int = 2  # 0 = desabilitado, tudo inline
+    cpu_offload_threshold_chars: int = 100000  # Abaixo disso roda inline
     
     # Paths
     csv_file_path: str = "companies.csv"
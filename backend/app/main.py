@@ -4,6 +4,13 @@ from app.api.routes import companies, scraping, usage, auto_setup
 from app.core.database import engine, Base
 # Importar modelos para criação das tabelas
 from app.models import Company, ScrapeLog, AUMSnapshot, Usage
+from app.utils.cpu_pool import shutdown_cpu_pool
+from app.utils import tokenizer
+from app.services.openai_client import close_openai_client
+from app.services.log_retention import retention_loop
+from app.services.export_jobs import shutdown_export_jobs
+from app.core.config import settings
+import asyncio
 import logging
 
 # Configurar logging
@@ -52,11 +59,24 @@ async def startup():
     except Exception as e:
         logger.error(f"Erro ao criar tabelas: {str(e)}")
         raise
+    
+    # Carregar os encodings do tokenizer antes da primeira extração
+    await asyncio.to_thread(tokenizer.warm_up, [settings.openai_model])
+    
+    # Job periódico de retenção/compactação dos scrape_logs
+    app.state.retention_task = None
+    if settings.log_retention_interval_hours > 0:
+        app.state.retention_task = asyncio.create_task(retention_loop())
 
 @app.on_event("shutdown")
 async def shutdown():
     """Executado no shutdown da aplicação"""
     logger.info("Encerrando aplicação AUM Scraper")
+    if getattr(app.state, "retention_task", None):
+        app.state.retention_task.cancel()
+    shutdown_cpu_pool()
+    shutdown_export_jobs()
+    await close_openai_client()
     await engine.dispose()
 
 @app.get("/")
@@ -142,11 +162,24 @@ async def startup():
     except Exception as e:
         logger.error(f"Erro ao criar tabelas: {str(e)}")
         raise
+    
+    # Carregar os encodings do tokenizer antes da primeira extração
+    await asyncio.to_thread(tokenizer.warm_up, [settings.openai_model])
+    
+    # Job periódico de retenção/compactação dos scrape_logs
+    app.state.retention_task = None
+    if settings.log_retention_interval_hours > 0:
+        app.state.retention_task = asyncio.create_task(retention_loop())
 
 @app.on_event("shutdown")
 async def shutdown():
     """Executado no shutdown da aplicação"""
     logger.info("Encerrando aplicação AUM Scraper")
+    if getattr(app.state, "retention_task", None):
+        app.state.retention_task.cancel()
+    shutdown_cpu_pool()
+    shutdown_export_jobs()
+    await close_openai_client()
     await engine.dispose()
 
 @app.get("/")
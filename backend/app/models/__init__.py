@@ -1,8 +1,13 @@
 # Importar todos os modelos para garantir que os relacionamentos sejam registrados
 from app.models.company import Company
+from app.models.content_blob import ContentBlob
 from app.models.scrape_log import ScrapeLog
 from app.models.aum_snapshot import AUMSnapshot
 from app.models.usage import Usage
+from app.models.domain_fetch_strategy import DomainFetchStrategy
+from app.models.url_negative_cache import URLNegativeCache
+from app.models.source_yield_stat import SourceYieldStat
+from app.models.scrape_log_summary import ScrapeLogDailySummary
 
 # Adicionar relacionamentos
 from sqlalchemy.orm import relationship
@@ -15,4 +20,4 @@ Company.aum_snapshots = relationship("AUMSnapshot", back_populates="company")
 # ScrapeLog.company já está definido
 # AUMSnapshot.company já está definido
 
-__all__ = ["Company", "ScrapeLog", "AUMSnapshot", "Usage"]
\ No newline at end of file
+__all__ = ["Company", "ScrapeLog", "AUMSnapshot", "Usage", "DomainFetchStrategy", "URLNegativeCache", "SourceYieldStat", "ContentBlob", "ScrapeLogDailySummary"]
\ No newline at end of file
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.models.content_blob import ContentBlob, BlobText
 
 class AUMSnapshot(Base):
     __tablename__ = "aum_snapshots"
@@ -11,9 +12,19 @@ class AUMSnapshot(Base):
     aum_raw_text = Column(String)  # Ex: "R$ 2,3 bi"
     aum_normalized = Column(Float)  # Ex: 2.3e9
     source_url = Column(String)
-    source_content = Column(Text)
+    source_type = Column(String)  # content_type do trecho onde o AUM foi encontrado
+    source_content_hash = Column(String(64), ForeignKey("content_blobs.hash"), index=True)
+    # Blob só é carregado sob pedido (selectinload) onde o texto é lido
+    source_content_blob = relationship(ContentBlob, lazy="raise")
+    source_content = BlobText("source_content_hash", "source_content_blob")
     extraction_method = Column(String)  # gpt4o, regex
     confidence_score = Column(Float, default=0.0)
+    evidence_fingerprints = Column(JSON)  # Hashes dos trechos enviados ao modelo
+    answer_fingerprints = Column(JSON)  # Hashes dos trechos que contêm o AUM respondido
     extracted_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Validade do valor: repetições do mesmo AUM estendem o snapshot em vez de criar outro
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    observation_count = Column(Integer, default=1, server_default="1")
     
     company = relationship("Company", back_populates="aum_snapshots")
\ No newline at end of file
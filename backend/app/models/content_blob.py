@@ -0,0 +1,100 @@
+"""
+Textos grandes (conteúdo coletado, evidência dos snapshots) fora das tabelas
+quentes: comprimidos e deduplicados pelo sha256 do texto
+"""
+import hashlib
+import zlib
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ContentBlob(Base):
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)  # sha256 do texto
+    data = Column(LargeBinary, nullable=False)  # Texto utf-8 comprimido (zlib)
+    size = Column(Integer, nullable=False)  # Caracteres do texto original
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def text(self) -> str:
+        return decompress_text(self.data)
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+class BlobText:
+    """
+    Atributo de texto guardado em content_blobs: o modelo persiste só o hash
+    (hash_attr) e lê o texto pelo relacionamento com o blob (blob_attr)
+    """
+
+    def __init__(self, hash_attr: str, blob_attr: str):
+        self.hash_attr = hash_attr
+        self.blob_attr = blob_attr
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        # Texto atribuído nesta sessão (ainda sem blob carregado)
+        pending = obj.__dict__.get("_blob_texts", {})
+        if self.name in pending:
+            return pending[self.name]
+
+        blob = getattr(obj, self.blob_attr)
+        return blob.text if blob is not None else None
+
+    def __set__(self, obj, value):
+        obj.__dict__.setdefault("_blob_texts", {})[self.name] = value
+        setattr(obj, self.hash_attr, content_hash(value) if value is not None else None)
+
+@event.listens_for(Session, "before_flush")
+def _store_blob_texts(session, flush_context, instances):
+    """Grava os blobs dos textos atribuídos antes das linhas que os referenciam"""
+    blobs = {}
+    for obj in list(session.new) + list(session.dirty):
+        pending = obj.__dict__.get("_blob_texts")
+        if not pending:
+            continue
+        for value in pending.values():
+            if value is not None:
+                blobs.setdefault(content_hash(value), value)
+
+    if not blobs:
+        return
+
+    # Blobs com o mesmo hash já existentes (deduplicação) são mantidos
+    existing = set(session.execute(
+        ContentBlob.__table__.select()
+        .with_only_columns(ContentBlob.hash)
+        .where(ContentBlob.hash.in_(list(blobs)))
+    ).scalars())
+    rows = [
+        {"hash": digest, "data": compress_text(text), "size": len(text)}
+        for digest, text in blobs.items() if digest not in existing
+    ]
+    if not rows:
+        return
+
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # Outra sessão pode gravar o mesmo texto ao mesmo tempo
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(ContentBlob.__table__).on_conflict_do_nothing(index_elements=["hash"])
+    else:
+        statement = insert(ContentBlob.__table__)
+    session.connection().execute(statement, rows)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class DomainFetchStrategy(Base):
+    __tablename__ = "domain_fetch_strategies"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    domain = Column(String, nullable=False, unique=True, index=True)
+    strategy = Column(String, nullable=False)  # http, browser
+    success_count = Column(Integer, default=0)
+    escalation_count = Column(Integer, default=0)  # Vezes que HTTP devolveu shell JS
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    probed_at = Column(DateTime(timezone=True), server_default=func.now())  # Último teste com HTTP
@@ -1,18 +1,29 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.models.content_blob import ContentBlob, BlobText
 
 class ScrapeLog(Base):
+    # No PostgreSQL a tabela é particionada por mês em scraped_at (migração 0002):
+    # filtrar por scraped_at faz a consulta tocar só as partições necessárias
     __tablename__ = "scrape_logs"
+    __table_args__ = (
+        Index("ix_scrape_logs_company_id_scraped_at", "company_id", "scraped_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
     url = Column(String, nullable=False)
     status = Column(String, nullable=False)  # success, failed, blocked
     content_type = Column(String)  # site, linkedin, instagram, x, news
-    scraped_content = Column(Text)
+    scraped_content_hash = Column(String(64), ForeignKey("content_blobs.hash"), index=True)
+    # Blob só é carregado sob pedido (selectinload) onde o texto é lido
+    scraped_content_blob = relationship(ContentBlob, lazy="raise")
+    scraped_content = BlobText("scraped_content_hash", "scraped_content_blob")  # Só quando a página não foi arquivada
+    archive_ref = Column(String(64), index=True)  # sha256 do corpo no arquivo de páginas
+    content_size = Column(Integer)  # Caracteres do texto extraído (arquivado ou não)
     error_message = Column(Text)
-    scraped_at = Column(DateTime(timezone=True), server_default=func.now())
+    scraped_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     company = relationship("Company", back_populates="scrape_logs")
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ScrapeLogDailySummary(Base):
+    """ScrapeLogs antigos compactados: uma linha por empresa/dia/fonte/status"""
+    __tablename__ = "scrape_log_daily_summaries"
+    __table_args__ = (
+        UniqueConstraint("company_id", "day", "content_type", "status", name="uq_scrape_log_daily_summary"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
+    content_type = Column(String)  # site, linkedin, instagram, x, news
+    status = Column(String, nullable=False)  # success, failed, blocked
+    log_count = Column(Integer, default=0)
+    url_count = Column(Integer, default=0)  # URLs distintas no dia
+    first_scraped_at = Column(DateTime(timezone=True))
+    last_scraped_at = Column(DateTime(timezone=True))
+    compacted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class SourceYieldStat(Base):
+    __tablename__ = "source_yield_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_type = Column(String, nullable=False, unique=True, index=True)  # site, linkedin, instagram, x, news
+    fetch_count = Column(Integer, default=0)
+    success_count = Column(Integer, default=0)
+    aum_hits = Column(Integer, default=0)  # Vezes em que a fonte continha o AUM da resposta final
+    total_latency = Column(Float, default=0.0)  # Segundos gastos em fetch
+    total_bytes = Column(Integer, default=0)
+    total_tokens = Column(Integer, default=0)  # Tokens enviados ao modelo vindos da fonte
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
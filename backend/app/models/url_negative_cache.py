@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class URLNegativeCache(Base):
+    __tablename__ = "url_negative_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False, unique=True, index=True)
+    reason = Column(Text)  # dns, http_404, connection_error...
+    checked_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
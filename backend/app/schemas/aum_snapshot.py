@@ -17,6 +17,9 @@ class AUMSnapshotCreate(AUMSnapshotBase):
 class AUMSnapshot(AUMSnapshotBase):
     id: int
     extracted_at: datetime
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None  # Última execução que observou o mesmo valor
+    observation_count: Optional[int] = 1
     
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -15,6 +15,8 @@ class ScrapeLogCreate(ScrapeLogBase):
 
 class ScrapeLog(ScrapeLogBase):
     id: int
+    archive_ref: Optional[str] = None
+    content_size: Optional[int] = None
     scraped_at: datetime
     
     class Config:
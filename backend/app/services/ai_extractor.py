@@ -1,72 +1,154 @@
-import openai
-from typing import Optional, Dict, List
+import json
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app.models.aum_snapshot import AUMSnapshot
 from app.models.company import Company
 from app.services.budget_controller import BudgetController
-from app.utils.text_processing import extract_relevant_chunks, count_tokens
+from app.services.openai_client import get_openai_client, hedged_call
+from app.services.source_planner import SourceYieldTracker, find_answer_chunks
+from app.utils.text_processing import (
+    split_passages, select_relevant_passages, count_tokens, aum_evidence_score,
+    aum_candidates, PASSAGE_SEPARATOR
+)
 from app.utils.unit_converter import convert_aum_to_float, validate_aum_value
+from app.utils.cpu_pool import run_cpu_bound
+from app.utils.dedup import deduplicate_passages, chunk_fingerprint
 from app.core.config import settings
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Tokens reservados para a resposta do modelo
+RESPONSE_TOKEN_RESERVE = 200
+
+# Extração incremental contra a evidência do snapshot anterior
+PLAN_FULL = "full"
+PLAN_INCREMENTAL = "incremental"
+PLAN_CARRY_FORWARD = "carry_forward"
+CARRY_FORWARD_METHOD = "carry_forward"
+NEW_CHUNK_MIN_EVIDENCE = 0.3  # Trecho novo com valor monetário pode mudar o AUM
+
+# Diferença relativa aceita entre a resposta e um candidato por regra
+CANDIDATE_TOLERANCE = 0.05
+
+# Tokens de resposta por empresa no modo em lote ("12": "R$ 2,3 bi",)
+BATCH_RESPONSE_TOKENS_PER_COMPANY = 20
+
 class AIExtractor:
-    def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+    def __init__(self, persist: bool = True, record_source_yield: bool = True, incremental: bool = None,
+                 interactive: bool = False):
+        """
+        persist=False não grava snapshots (simulação); record_source_yield=False
+        não conta o rendimento das fontes (ex: replay de conteúdo já contado);
+        interactive=True (só o pedido de uma empresa) permite chamadas com hedge
+        """
+        self.persist = persist
+        self.interactive = interactive
+        self.record_source_yield = record_source_yield
+        self.incremental_enabled = settings.incremental_extraction_enabled if incremental is None else incremental
+        self.client = get_openai_client()
         self.model = settings.openai_model
         self.max_tokens_per_request = settings.max_tokens_per_request
+        self.cheap_model = settings.openai_cheap_model
+        self.cascade_enabled = settings.cascade_enabled and self.cheap_model != self.model
         self.budget_controller = BudgetController()
+        self.yield_tracker = SourceYieldTracker()
     
     async def extract_aum_from_content(
         self, 
         company: Company, 
         scraped_data: List[Dict], 
-        db: AsyncSession
+        db: AsyncSession,
+        skip_cheap_model: bool = False
     ) -> Optional[AUMSnapshot]:
-        """Extrai AUM usando GPT-4o a partir dos dados coletados"""
+        """
+        Extrai AUM a partir dos dados coletados: modelo barato primeiro,
+        escalando para o modelo configurado quando a resposta é duvidosa
+        """
         
-        # Combinar todo o conteúdo relevante
-        all_content = []
-        sources = []
+        # Budget de tokens do conteúdo, calculado uma vez: limite - resposta - instruções
+        content_budget = (
+            self.max_tokens_per_request - RESPONSE_TOKEN_RESERVE
+            - count_tokens(self._create_extraction_prompt(company.name, ""), self.model)
+        )
         
-        for data in scraped_data:
-            if data["status"] == "success" and data["content"]:
-                # Extrair chunks relevantes
-                chunks = extract_relevant_chunks(data["content"], max_tokens=400)
-                if chunks:
-                    all_content.extend(chunks)
-                    sources.append(f"{data['content_type']}: {data['url']}")
+        all_content, chunk_sources = await self._select_content(company, scraped_data, content_budget)
         
         if not all_content:
             logger.warning(f"Nenhum conteúdo relevante encontrado para {company.name}")
             return await self._create_empty_snapshot(company, db)
         
-        # Preparar prompt
-        content_text = "\n\n".join(all_content)
-        prompt = self._create_extraction_prompt(company.name, content_text)
+        # Evidência já vista em execuções anteriores: reaproveitar ou enviar só o novo
+        previous = await self._previous_snapshot(company, db) if self.incremental_enabled else None
+        plan, new_indices = plan_incremental(previous, all_content)
         
-        # Verificar limite de tokens
-        prompt_tokens = count_tokens(prompt, self.model)
-        if prompt_tokens > self.max_tokens_per_request - 200:  # Reservar espaço para resposta
-            # Truncar conteúdo
-            content_text = content_text[:int(len(content_text) * 0.7)]
+        if plan == PLAN_CARRY_FORWARD:
+            logger.info(f"Evidência de AUM inalterada para {company.name}, reaproveitando {previous.aum_raw_text}")
+            return await self._finish_extraction(
+                company, previous.aum_raw_text, all_content, chunk_sources, db,
+                extraction_method=CARRY_FORWARD_METHOD, carried_from=previous
+            )
+        
+        # Preparar prompt
+        if plan == PLAN_INCREMENTAL:
+            content_text = PASSAGE_SEPARATOR.join(all_content[index] for index in new_indices)
+            prompt = self._create_incremental_prompt(company.name, previous.aum_raw_text, content_text)
+            logger.info(f"Enviando só {len(new_indices)}/{len(all_content)} trechos novos para {company.name}")
+        else:
+            content_text = PASSAGE_SEPARATOR.join(all_content)
             prompt = self._create_extraction_prompt(company.name, content_text)
-            prompt_tokens = count_tokens(prompt, self.model)
         
-        # Verificar budget
-        estimated_cost = self.budget_controller.estimate_task_cost(
-            prompt_tokens + 200  # Estimativa da resposta
-        )
+        try:
+            answer = await self._ask_models(company, prompt, content_text, db, skip_cheap_model)
+            if answer is None:
+                return await self._create_empty_snapshot(company, db, error="Budget insuficiente")
+            
+            aum_text, answer_model = answer
+            return await self._finish_extraction(
+                company, aum_text, all_content, chunk_sources, db, model=answer_model
+            )
+            
+        except Exception as e:
+            logger.error(f"Erro na extração de AUM para {company.name}: {str(e)}")
+            return await self._create_empty_snapshot(company, db, error=str(e))
+    
+    async def _ask_models(
+        self,
+        company: Company,
+        prompt: str,
+        content_text: str,
+        db: AsyncSession,
+        skip_cheap_model: bool = False
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Cascata de modelos para um prompt: retorna (resposta, modelo que
+        respondeu), ou None se não há budget nem para a primeira chamada
+        """
+        prompt_tokens = await run_cpu_bound(count_tokens, prompt, self.model, size=len(prompt))
         
-        if not await self.budget_controller.check_budget_and_run(estimated_cost, db):
-            logger.error(f"Budget insuficiente para processar {company.name}")
-            return await self._create_empty_snapshot(company, db, error="Budget insuficiente")
+        tiers = [self.model]
+        if self.cascade_enabled and not skip_cheap_model:
+            tiers.insert(0, self.cheap_model)
         
-        try:
+        answer = None
+        for model in tiers:
+            # Verificar budget
+            estimated_cost = self.budget_controller.estimate_task_cost(
+                prompt_tokens + RESPONSE_TOKEN_RESERVE,  # Estimativa da resposta
+                model=model
+            )
+            
+            if not await self.budget_controller.check_budget_and_run(estimated_cost, db):
+                logger.error(f"Budget insuficiente para processar {company.name} com {model}")
+                break
+            
             # Fazer chamada para OpenAI
-            response = await self._call_openai(prompt)
+            response = await self._call_openai(
+                prompt, model=model, db=db, company_id=company.id, hedge=self.interactive
+            )
             
             # Registrar uso
             await self.budget_controller.record_usage(
@@ -74,24 +156,142 @@ class AIExtractor:
                 company_id=company.id,
                 prompt_tokens=response.usage.prompt_tokens,
                 completion_tokens=response.usage.completion_tokens,
-                model=self.model,
+                model=model,
                 request_type="aum_extraction"
             )
             
             # Processar resposta
-            aum_text = response.choices[0].message.content.strip()
-            
-            return await self._create_aum_snapshot(
-                company=company,
-                aum_text=aum_text,
-                sources=sources,
-                content_text=content_text,
-                db=db
-            )
+            answer = (response.choices[0].message.content.strip(), model)
             
+            if model == self.model:
+                break
+            
+            reason = needs_escalation(answer[0], content_text)
+            if reason is None:
+                break
+            logger.info(f"Escalando {company.name} para {self.model}: {reason}")
+        
+        return answer
+    
+    async def _previous_snapshot(self, company: Company, db: AsyncSession) -> Optional[AUMSnapshot]:
+        """Último snapshot da empresa com as impressões digitais da evidência"""
+        result = await db.execute(
+            select(AUMSnapshot)
+            .where(
+                AUMSnapshot.company_id == company.id,
+                AUMSnapshot.evidence_fingerprints.isnot(None)
+            )
+            .order_by(AUMSnapshot.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def _select_content(
+        self,
+        company: Company,
+        scraped_data: List[Dict],
+        content_budget: int
+    ) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """Trechos mais relevantes (e a origem de cada um) que cabem em content_budget tokens"""
+        
+        # Dividir todo o conteúdo em trechos, guardando a origem de cada um
+        passages = []
+        passage_sources = []
+        
+        for data in scraped_data:
+            if data["status"] == "success" and data["content"]:
+                parts = await run_cpu_bound(split_passages, data["content"], size=len(data["content"]))
+                passages.extend(parts)
+                passage_sources.extend((data["content_type"], data["url"]) for _ in parts)
+        
+        if not passages:
+            return [], []
+        
+        # Remover parágrafos repetidos entre fontes (fica a primeira cópia, com sua origem)
+        kept = await run_cpu_bound(
+            deduplicate_passages, passages, settings.dedup_similarity_threshold,
+            size=sum(len(passage) for passage in passages)
+        )
+        if len(kept) < len(passages):
+            logger.info(f"{len(passages) - len(kept)} trechos duplicados removidos para {company.name}")
+            passages = [passages[index] for index in kept]
+            passage_sources = [passage_sources[index] for index in kept]
+        
+        # Melhores trechos de todas as fontes que cabem no budget
+        selected = await run_cpu_bound(
+            select_relevant_passages, passages, content_budget, self.model,
+            size=sum(len(passage) for passage in passages)
+        )
+        return [passages[index] for index in selected], [passage_sources[index] for index in selected]
+    
+    async def _finish_extraction(
+        self,
+        company: Company,
+        aum_text: str,
+        all_content: List[str],
+        chunk_sources: List[Tuple[str, str]],
+        db: AsyncSession,
+        model: str = None,
+        extraction_method: str = None,
+        carried_from: AUMSnapshot = None
+    ) -> AUMSnapshot:
+        """
+        Atribui a resposta às fontes, atualiza o rendimento e cria o snapshot;
+        carried_from é o snapshot cuja resposta foi reaproveitada (sem chamada ao modelo)
+        """
+        sources = list(dict.fromkeys(f"{content_type}: {url}" for content_type, url in chunk_sources))
+        
+        # Proveniência: trechos (e fontes) que contêm o valor respondido
+        answer_indices = []
+        if carried_from is not None:
+            # Resposta reaproveitada: os trechos da resposta já estão nas impressões digitais
+            stored = set(carried_from.answer_fingerprints or [])
+            answer_indices = [
+                index for index, chunk in enumerate(all_content) if chunk_fingerprint(chunk) in stored
+            ]
+        elif aum_text != "NAO_DISPONIVEL":
+            answer_indices = find_answer_chunks(aum_text, all_content)
+        answer_sources = list(dict.fromkeys(chunk_sources[index] for index in answer_indices))
+        
+        if self.record_source_yield:
+            # A latência dos fetches é sempre somada: os acertos reaproveitados
+            # também contam (sem tokens, nada foi enviado ao modelo)
+            await self._record_source_yield(
+                db, all_content, chunk_sources, answer_sources, tokens_sent=carried_from is None
+            )
+        
+        return await self._create_aum_snapshot(
+            company=company,
+            aum_text=aum_text,
+            sources=[f"{content_type}: {url}" for content_type, url in answer_sources] or sources,
+            content_text=PASSAGE_SEPARATOR.join(all_content),
+            db=db,
+            source_type=answer_sources[0][0] if answer_sources else None,
+            extraction_method=extraction_method or extraction_method_for(model or self.model),
+            evidence_fingerprints=[chunk_fingerprint(chunk) for chunk in all_content],
+            answer_fingerprints=[chunk_fingerprint(all_content[index]) for index in answer_indices]
+        )
+    
+    async def _record_source_yield(
+        self,
+        db: AsyncSession,
+        chunks: List[str],
+        chunk_sources: List[Tuple[str, str]],
+        answer_sources: List[Tuple[str, str]],
+        tokens_sent: bool = True
+    ):
+        """Atualiza tokens enviados e acertos de AUM por tipo de fonte"""
+        tokens_by_type: Dict[str, int] = {}
+        if tokens_sent:
+            for chunk, (content_type, _) in zip(chunks, chunk_sources):
+                tokens_by_type[content_type] = tokens_by_type.get(content_type, 0) + count_tokens(chunk, self.model)
+        
+        try:
+            await self.yield_tracker.record_extraction(
+                db, tokens_by_type, {content_type for content_type, _ in answer_sources}
+            )
         except Exception as e:
-            logger.error(f"Erro na extração de AUM para {company.name}: {str(e)}")
-            return await self._create_empty_snapshot(company, db, error=str(e))
+            logger.warning(f"Falha ao registrar rendimento das fontes: {str(e)}")
     
     def _create_extraction_prompt(self, company_name: str, content: str) -> str:
         """Cria prompt otimizado para extração de AUM"""
@@ -109,23 +309,91 @@ CONTEÚDO PARA ANÁLISE:
 
 RESPOSTA (apenas o valor do AUM ou NAO_DISPONIVEL):"""
     
-    async def _call_openai(self, prompt: str):
-        """Faz chamada para a API OpenAI"""
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
+    def _create_incremental_prompt(self, company_name: str, previous_answer: str, new_content: str) -> str:
+        """Prompt só com os trechos novos, usando a resposta anterior como contexto"""
+        return f"""Você é um especialista em análise de informações financeiras. Já sabemos que o Patrimônio Sob Gestão (AUM) da empresa {company_name} era: {previous_answer}
+
+INSTRUÇÕES:
+1. Analise APENAS o conteúdo novo abaixo procurando por um AUM (Assets Under Management, Patrimônio Sob Gestão) mais recente ou diferente
+2. Se o conteúdo novo trouxer um valor de AUM, responda APENAS com o número e unidade (ex: "R$ 2,3 bi", "US$ 500 mi")
+3. Se o conteúdo novo não trouxer AUM, responda exatamente com a resposta anterior: "{previous_answer}"
+4. NÃO adicione explicações, contexto ou outras informações
+
+CONTEÚDO NOVO PARA ANÁLISE:
+{new_content}
+
+RESPOSTA (apenas o valor do AUM):"""
+    
+    def _create_batch_prompt(self, company_blocks: List[str]) -> str:
+        """Prompt de várias empresas com resposta JSON indexada pelo id"""
+        blocks = "\n\n".join(company_blocks)
+        return f"""Você é um especialista em análise de informações financeiras. Sua tarefa é encontrar o Patrimônio Sob Gestão (AUM) de cada empresa abaixo.
+
+INSTRUÇÕES:
+1. Cada empresa tem seu próprio bloco de conteúdo, iniciado por "### EMPRESA <id>"; use apenas o bloco da empresa
+2. Procure por AUM, Assets Under Management ou Patrimônio Sob Gestão, em reais (R$) ou dólares (US$), bilhões (bi) ou milhões (mi)
+3. Para cada empresa, o valor é APENAS o número e unidade (ex: "R$ 2,3 bi", "US$ 500 mi"), ou exatamente "NAO_DISPONIVEL"
+4. Responda APENAS com um objeto JSON com uma chave por id de empresa, ex: {{"12": "R$ 2,3 bi", "15": "NAO_DISPONIVEL"}}
+
+{blocks}
+
+RESPOSTA (objeto JSON):"""
+    
+    def _create_company_block(self, company: Company, content: str) -> str:
+        return f"### EMPRESA {company.id} ({company.name})\n{content}"
+    
+    async def _call_openai(
+        self,
+        prompt: str,
+        max_tokens: int = 100,
+        json_mode: bool = False,
+        model: str = None,
+        db: AsyncSession = None,
+        company_id: int = None,
+        hedge: bool = False
+    ):
+        """
+        Faz chamada para a API OpenAI; com hedge (pedidos interativos) e db,
+        chamadas lentas podem ganhar uma cópia cujo custo é reservado no budget
+        """
+        model = model or self.model
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        
+        def call():
+            return self.client.chat.completions.create(
+                model=model,
                 messages=[
                     {
                         "role": "user", 
                         "content": prompt
                     }
                 ],
-                max_tokens=100,  # Resposta curta
+                max_tokens=max_tokens,  # Resposta curta
                 temperature=0,  # Determinística
-                timeout=30
+                timeout=settings.openai_timeout,
+                **extra
             )
-            
-            return response
+        
+        async def allow_hedge() -> bool:
+            if not hedge or db is None:
+                return False
+            # A cópia é cobrada mesmo se perder: reservar o custo do prompt
+            prompt_tokens = count_tokens(prompt, model)
+            estimated_cost = self.budget_controller.estimate_task_cost(prompt_tokens + max_tokens, model=model)
+            if not await self.budget_controller.check_budget_and_run(estimated_cost, db):
+                return False
+            await self.budget_controller.record_usage(
+                db=db,
+                company_id=company_id,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=0,
+                model=model,
+                request_type="aum_extraction_hedge"
+            )
+            return True
+        
+        try:
+            return await hedged_call(call, model, allow_hedge)
             
         except Exception as e:
             logger.error(f"Erro na chamada OpenAI: {str(e)}")
@@ -137,7 +405,11 @@ RESPOSTA (apenas o valor do AUM ou NAO_DISPONIVEL):"""
         aum_text: str, 
         sources: List[str],
         content_text: str,
-        db: AsyncSession
+        db: AsyncSession,
+        source_type: str = None,
+        extraction_method: str = "gpt4o",
+        evidence_fingerprints: List[str] = None,
+        answer_fingerprints: List[str] = None
     ) -> AUMSnapshot:
         """Cria snapshot do AUM extraído"""
         
@@ -155,14 +427,16 @@ RESPOSTA (apenas o valor do AUM ou NAO_DISPONIVEL):"""
             company_id=company.id,
             aum_raw_text=aum_text,
             aum_normalized=aum_normalized,
-            source_url="; ".join(sources[:3]),  # Primeiras 3 fontes
+            source_url="; ".join(sources[:3]),  # Primeiras 3 fontes (as que contêm o AUM primeiro)
+            source_type=source_type,
             source_content=content_text[:5000],  # Limitar tamanho
-            extraction_method="gpt4o",
-            confidence_score=confidence_score
+            extraction_method=extraction_method,
+            confidence_score=confidence_score,
+            evidence_fingerprints=evidence_fingerprints,
+            answer_fingerprints=answer_fingerprints
         )
         
-        db.add(snapshot)
-        await db.commit()
+        snapshot = await self._save_snapshot(snapshot, db)
         
         logger.info(f"AUM extraído para {company.name}: {aum_text}")
         return snapshot
@@ -185,6 +459,44 @@ RESPOSTA (apenas o valor do AUM ou NAO_DISPONIVEL):"""
             confidence_score=0.0
         )
         
+        return await self._save_snapshot(snapshot, db)
+    
+    async def _save_snapshot(self, snapshot: AUMSnapshot, db: AsyncSession) -> AUMSnapshot:
+        """
+        Grava o snapshot; no modo só-mudanças, valor igual ao do último snapshot
+        da empresa apenas estende a validade dele (last_seen_at, observation_count)
+        """
+        if not self.persist:
+            return snapshot
+        
+        now = datetime.now(timezone.utc)
+        
+        if settings.snapshot_change_only:
+            result = await db.execute(
+                select(AUMSnapshot)
+                .where(AUMSnapshot.company_id == snapshot.company_id)
+                .order_by(AUMSnapshot.id.desc())
+                .limit(1)
+            )
+            previous = result.scalar_one_or_none()
+            
+            if previous is not None and same_aum_value(previous, snapshot):
+                previous.last_seen_at = now
+                previous.observation_count = (previous.observation_count or 1) + 1
+                # Fonte e confiança da observação mais recente
+                previous.source_url = snapshot.source_url
+                previous.source_type = snapshot.source_type
+                previous.confidence_score = snapshot.confidence_score
+                # Evidência mais recente, base da extração incremental
+                if snapshot.evidence_fingerprints is not None:
+                    previous.evidence_fingerprints = snapshot.evidence_fingerprints
+                    previous.answer_fingerprints = snapshot.answer_fingerprints
+                await db.commit()
+                return previous
+        
+        snapshot.first_seen_at = now
+        snapshot.last_seen_at = now
+        snapshot.observation_count = 1
         db.add(snapshot)
         await db.commit()
         
@@ -193,9 +505,17 @@ RESPOSTA (apenas o valor do AUM ou NAO_DISPONIVEL):"""
     async def batch_extract_aum(
         self, 
         companies_data: List[Dict], 
-        db: AsyncSession
+        db: AsyncSession,
+        batched: bool = None
     ) -> List[AUMSnapshot]:
-        """Processa múltiplas empresas em lote"""
+        """
+        Processa múltiplas empresas em lote; com batched, várias empresas vão
+        num mesmo prompt (as que falharem caem na extração individual)
+        """
+        if batched is None:
+            batched = settings.batched_extraction_enabled
+        if batched:
+            return await self._batch_extract_packed(companies_data, db)
         
         results = []
         
@@ -211,15 +531,252 @@ RESPOSTA (apenas o valor do AUM ou NAO_DISPONIVEL):"""
                 logger.error("Budget quase esgotado, parando processamento")
                 break
             
-            try:
-                snapshot = await self.extract_aum_from_content(company, scraped_data, db)
-                results.append(snapshot)
+            results.append(await self._extract_single(company, scraped_data, db))
+        
+        return results
+    
+    async def _extract_single(
+        self,
+        company: Company,
+        scraped_data: List[Dict],
+        db: AsyncSession,
+        skip_cheap_model: bool = False
+    ) -> AUMSnapshot:
+        try:
+            return await self.extract_aum_from_content(company, scraped_data, db, skip_cheap_model)
+        except Exception as e:
+            logger.error(f"Erro ao processar {company.name}: {str(e)}")
+            return await self._create_empty_snapshot(company, db, error=str(e))
+    
+    async def _batch_extract_packed(self, companies_data: List[Dict], db: AsyncSession) -> List[AUMSnapshot]:
+        """Empacota as empresas em prompts conjuntos respeitando o limite de tokens"""
+        request_budget = (
+            settings.batch_max_tokens_per_request
+            - count_tokens(self._create_batch_prompt([]), self.model)
+        )
+        
+        snapshots: Dict[int, AUMSnapshot] = {}
+        pending = []
+        
+        for company_data in companies_data:
+            company = company_data["company"]
+            content, content_sources = await self._select_content(
+                company, company_data["scraped_data"], settings.batch_company_token_budget
+            )
+            if not content:
+                logger.warning(f"Nenhum conteúdo relevante encontrado para {company.name}")
+                snapshots[company.id] = await self._create_empty_snapshot(company, db)
+                continue
+            
+            # Evidência inalterada: reaproveita o AUM anterior sem entrar no pacote
+            previous = await self._previous_snapshot(company, db) if self.incremental_enabled else None
+            if plan_incremental(previous, content)[0] == PLAN_CARRY_FORWARD:
+                snapshots[company.id] = await self._finish_extraction(
+                    company, previous.aum_raw_text, content, content_sources, db,
+                    extraction_method=CARRY_FORWARD_METHOD, carried_from=previous
+                )
+                continue
+            
+            block = self._create_company_block(company, PASSAGE_SEPARATOR.join(content))
+            pending.append({
+                "company": company,
+                "scraped_data": company_data["scraped_data"],
+                "content": content,
+                "content_sources": content_sources,
+                "block": block,
+                "tokens": count_tokens(block, self.model)
+            })
+        
+        # Grupos sequenciais que cabem no budget do request
+        groups: List[List[Dict]] = []
+        used_tokens = 0
+        for item in pending:
+            cost = item["tokens"] + BATCH_RESPONSE_TOKENS_PER_COMPANY
+            if (not groups or len(groups[-1]) >= settings.batch_max_companies
+                    or used_tokens + cost > request_budget):
+                groups.append([])
+                used_tokens = 0
+            groups[-1].append(item)
+            used_tokens += cost
+        
+        for group in groups:
+            usage_summary = await self.budget_controller.get_usage_summary(db)
+            if usage_summary["budget_used_percentage"] >= 95:
+                logger.error("Budget quase esgotado, parando processamento")
+                break
+            
+            if len(group) == 1:
+                item = group[0]
+                snapshots[item["company"].id] = await self._extract_single(item["company"], item["scraped_data"], db)
+                continue
+            
+            answers = await self._extract_group(group, db)
+            
+            for item in group:
+                company = item["company"]
+                aum_text = answers.get(company.id)
+                if aum_text is None:
+                    # Resposta ausente ou inválida: extração individual
+                    logger.warning(f"Resposta em lote inválida para {company.name}, extraindo individualmente")
+                    snapshots[company.id] = await self._extract_single(
+                        company, item["scraped_data"], db, skip_cheap_model=item.get("escalate", False)
+                    )
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Erro ao processar {company.name}: {str(e)}")
-                empty_snapshot = await self._create_empty_snapshot(
-                    company, db, error=str(e)
+                snapshots[company.id] = await self._finish_extraction(
+                    company, aum_text, item["content"], item["content_sources"], db,
+                    model=self.cheap_model if self.cascade_enabled else self.model
                 )
-                results.append(empty_snapshot)
         
-        return results
\ No newline at end of file
+        return [
+            snapshots[company_data["company"].id]
+            for company_data in companies_data
+            if company_data["company"].id in snapshots
+        ]
+    
+    async def _extract_group(self, group: List[Dict], db: AsyncSession) -> Dict[int, str]:
+        """
+        Uma chamada para o grupo; retorna {company_id: aum_text} só com as
+        respostas válidas e registra o uso rateado por empresa
+        """
+        model = self.cheap_model if self.cascade_enabled else self.model
+        prompt = self._create_batch_prompt([item["block"] for item in group])
+        prompt_tokens = count_tokens(prompt, self.model)
+        completion_budget = BATCH_RESPONSE_TOKENS_PER_COMPANY * len(group)
+        
+        estimated_cost = self.budget_controller.estimate_task_cost(prompt_tokens + completion_budget, model=model)
+        if not await self.budget_controller.check_budget_and_run(estimated_cost, db):
+            logger.error(f"Budget insuficiente para lote de {len(group)} empresas")
+            return {}
+        
+        try:
+            response = await self._call_openai(prompt, max_tokens=completion_budget, json_mode=True, model=model)
+            raw_answers = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Erro na extração em lote: {str(e)}")
+            return {}
+        
+        if not isinstance(raw_answers, dict):
+            raw_answers = {}
+        answers = {}
+        for item in group:
+            aum_text = _validate_answer(raw_answers.get(str(item["company"].id)))
+            if aum_text is None:
+                continue
+            # Resposta do modelo barato duvidosa: vai para a extração individual no modelo grande
+            if self.cascade_enabled and needs_escalation(aum_text, PASSAGE_SEPARATOR.join(item["content"])):
+                item["escalate"] = True
+                continue
+            answers[item["company"].id] = aum_text
+        
+        # Rateio do uso: instruções divididas igualmente, conteúdo pelo tamanho de cada bloco
+        overhead = max(0, response.usage.prompt_tokens - sum(item["tokens"] for item in group)) / len(group)
+        prompt_shares = allocate_tokens(
+            response.usage.prompt_tokens, [item["tokens"] + overhead for item in group]
+        )
+        completion_shares = allocate_tokens(
+            response.usage.completion_tokens,
+            [count_tokens(answers.get(item["company"].id, ""), self.model) + 1 for item in group]
+        )
+        
+        for item, prompt_share, completion_share in zip(group, prompt_shares, completion_shares):
+            await self.budget_controller.record_usage(
+                db=db,
+                company_id=item["company"].id,
+                prompt_tokens=prompt_share,
+                completion_tokens=completion_share,
+                model=model,
+                request_type="aum_extraction_batch"
+            )
+        
+        logger.info(f"Lote de {len(group)} empresas: {len(answers)} respostas válidas")
+        return answers
+
+def needs_escalation(aum_text: str, content: str) -> Optional[str]:
+    """
+    Motivo para refazer a extração no modelo grande (None se a resposta do
+    modelo barato é aceitável)
+    """
+    if aum_text == "NAO_DISPONIVEL":
+        if aum_evidence_score(content) >= settings.aum_evidence_stop_score:
+            return "NAO_DISPONIVEL com evidência forte de AUM no conteúdo"
+        return None
+    
+    aum_normalized = convert_aum_to_float(aum_text)
+    if not aum_normalized or not validate_aum_value(aum_normalized):
+        return f"valor inválido ({aum_text})"
+    
+    # Candidatos por regra: valores monetários perto de termos de AUM
+    candidates = [value for value in map(convert_aum_to_float, aum_candidates(content)) if value]
+    if candidates and not any(
+        abs(candidate - aum_normalized) <= CANDIDATE_TOLERANCE * candidate for candidate in candidates
+    ):
+        return f"diverge dos candidatos do conteúdo ({aum_text})"
+    
+    return None
+
+def plan_incremental(previous: Optional[AUMSnapshot], chunks: List[str]) -> Tuple[str, List[int]]:
+    """
+    Decide como extrair a partir da evidência do snapshot anterior:
+    reaproveitar a resposta, enviar só os trechos novos ou extrair do zero
+    """
+    if previous is None or not previous.evidence_fingerprints:
+        return PLAN_FULL, []
+    
+    fingerprints = [chunk_fingerprint(chunk) for chunk in chunks]
+    
+    # Os trechos que continham o AUM anterior precisam continuar presentes
+    if previous.aum_raw_text != "NAO_DISPONIVEL":
+        answer_fingerprints = set(previous.answer_fingerprints or [])
+        if not answer_fingerprints or not answer_fingerprints <= set(fingerprints):
+            return PLAN_FULL, []
+    
+    known = set(previous.evidence_fingerprints)
+    new_indices = [index for index, fingerprint in enumerate(fingerprints) if fingerprint not in known]
+    
+    # Trechos novos sem nenhum valor monetário não mudam a resposta
+    if not any(aum_evidence_score(chunks[index]) >= NEW_CHUNK_MIN_EVIDENCE for index in new_indices):
+        return PLAN_CARRY_FORWARD, []
+    
+    return PLAN_INCREMENTAL, new_indices
+
+def same_aum_value(previous: AUMSnapshot, current: AUMSnapshot) -> bool:
+    """Mesmo AUM: texto igual ou o mesmo valor normalizado (ex: "R$ 2,3 bi" e "R$ 2,3 bilhões")"""
+    if previous.aum_raw_text == current.aum_raw_text:
+        return True
+    return previous.aum_normalized is not None and previous.aum_normalized == current.aum_normalized
+
+def extraction_method_for(model: str) -> str:
+    """Nome do método gravado no snapshot (gpt-4o -> gpt4o, gpt-4o-mini -> gpt4omini)"""
+    return model.replace("-", "").replace(".", "")
+
+def _validate_answer(value) -> Optional[str]:
+    """Resposta de uma empresa no JSON do lote: valor de AUM conversível ou NAO_DISPONIVEL"""
+    if not isinstance(value, str):
+        return None
+    
+    value = value.strip()
+    if value == "NAO_DISPONIVEL":
+        return value
+    if convert_aum_to_float(value) is not None:
+        return value
+    return None
+
+def allocate_tokens(total: int, weights: List[float]) -> List[int]:
+    """Divide total proporcionalmente aos pesos, em inteiros que somam total (maiores restos)"""
+    weight_sum = sum(weights)
+    if not weights:
+        return []
+    if weight_sum <= 0:
+        weights = [1.0] * len(weights)
+        weight_sum = float(len(weights))
+    
+    exact = [total * weight / weight_sum for weight in weights]
+    shares = [int(value) for value in exact]
+    remainder = total - sum(shares)
+    
+    by_fraction = sorted(range(len(exact)), key=lambda index: exact[index] - shares[index], reverse=True)
+    for index in by_fraction[:remainder]:
+        shares[index] += 1
+    
+    return shares
@@ -0,0 +1,272 @@
+"""
+Extração de AUM via arquivo de lote (JSONL) numa API de batch no formato da OpenAI
+
+Fluxo: monta uma requisição de chat por empresa num arquivo JSONL, envia o
+arquivo (POST /files), cria o lote (POST /batches), consulta até terminar
+(GET /batches/{id}) e baixa o resultado (GET /files/{id}/content) para gerar
+os AUMSnapshot e registrar o Usage de cada empresa. Empresas sem resultado
+válido no lote (linha ausente, com erro ou malformada, ou lote que falhou)
+caem na extração individual.
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.aum_snapshot import AUMSnapshot
+from app.models.company import Company
+from app.services.ai_extractor import (
+    AIExtractor, RESPONSE_TOKEN_RESERVE, CARRY_FORWARD_METHOD, PLAN_CARRY_FORWARD, plan_incremental
+)
+from app.utils.text_processing import count_tokens, PASSAGE_SEPARATOR
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Estados finais de um lote
+BATCH_DONE_STATUS = {"completed", "failed", "expired", "cancelled"}
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+def parse_batch_result(result: Dict) -> Tuple[str, Dict]:
+    """
+    Resposta e corpo de uma linha do resultado do lote; ValueError se a
+    linha veio com erro ou fora do formato esperado
+    """
+    try:
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            raise ValueError((result.get("error") or {}).get("message") or f"Status {response.get('status_code')}")
+        body = response["body"]
+        return body["choices"][0]["message"]["content"].strip(), body
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ValueError(f"Linha malformada no resultado do lote: {type(e).__name__}: {e}")
+
+class BatchExtractionRunner:
+    """Acumula as empresas de uma execução noturna e extrai todas num único lote"""
+
+    def __init__(
+        self,
+        extractor: AIExtractor = None,
+        http_client: httpx.AsyncClient = None,
+        poll_interval: float = None,
+        timeout: float = None
+    ):
+        self.extractor = extractor or AIExtractor()
+        self.model = self.extractor.model
+        self.base_url = settings.openai_batch_base_url.rstrip("/")
+        self.poll_interval = settings.batch_poll_interval_seconds if poll_interval is None else poll_interval
+        self.timeout = settings.batch_timeout_seconds if timeout is None else timeout
+        self._http_client = http_client
+        self._pending: Dict[str, Dict] = {}
+
+    async def add_company(self, company: Company, scraped_data: List[Dict], db: AsyncSession) -> bool:
+        """
+        Seleciona o conteúdo da empresa e enfileira a requisição; sem conteúdo
+        relevante (ou com a evidência inalterada) o snapshot é criado na hora. Retorna True se enfileirou.
+        """
+        content_budget = (
+            self.extractor.max_tokens_per_request - RESPONSE_TOKEN_RESERVE
+            - count_tokens(self.extractor._create_extraction_prompt(company.name, ""), self.model)
+        )
+        content, content_sources = await self.extractor._select_content(company, scraped_data, content_budget)
+
+        if not content:
+            logger.warning(f"Nenhum conteúdo relevante encontrado para {company.name}")
+            await self.extractor._create_empty_snapshot(company, db)
+            return False
+
+        # Evidência inalterada: reaproveita o AUM anterior sem entrar no lote
+        previous = await self.extractor._previous_snapshot(company, db) if self.extractor.incremental_enabled else None
+        if plan_incremental(previous, content)[0] == PLAN_CARRY_FORWARD:
+            await self.extractor._finish_extraction(
+                company, previous.aum_raw_text, content, content_sources, db,
+                extraction_method=CARRY_FORWARD_METHOD, carried_from=previous
+            )
+            return False
+
+        prompt = self.extractor._create_extraction_prompt(company.name, PASSAGE_SEPARATOR.join(content))
+        self._pending[f"company-{company.id}"] = {
+            "company": company,
+            "scraped_data": scraped_data,
+            "content": content,
+            "content_sources": content_sources,
+            "tokens": count_tokens(prompt, self.model) + RESPONSE_TOKEN_RESERVE,  # Estimativa para o budget
+            "request": {
+                "custom_id": f"company-{company.id}",
+                "method": "POST",
+                "url": CHAT_COMPLETIONS_ENDPOINT,
+                "body": {
+                    "model": self.model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": 100,
+                    "temperature": 0
+                }
+            }
+        }
+        return True
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def run(self, db: AsyncSession) -> List[AUMSnapshot]:
+        """Envia o lote, espera o resultado e grava snapshots e uso"""
+        if not self._pending:
+            return []
+
+        # Mesmo controle da extração síncrona, com o desconto da API de batch
+        estimated_cost = self.extractor.budget_controller.estimate_task_cost(
+            sum(item["tokens"] for item in self._pending.values()), model=self.model
+        ) * settings.batch_api_cost_multiplier
+        if not await self.extractor.budget_controller.check_budget_and_run(estimated_cost, db):
+            logger.error(f"Budget insuficiente para o lote de {len(self._pending)} empresas, nada foi enviado")
+            snapshots = [
+                await self.extractor._create_empty_snapshot(item["company"], db, error="Budget insuficiente")
+                for item in self._pending.values()
+            ]
+            self._pending.clear()
+            return snapshots
+
+        path = self.write_batch_file()
+        logger.info(f"Lote de extração com {len(self._pending)} empresas em {path}")
+
+        results = []
+        client = self._http_client or httpx.AsyncClient(timeout=60)
+        try:
+            file_id = await self._upload_file(client, path)
+            batch = await self._create_batch(client, file_id)
+            batch = await self._wait_for_batch(client, batch["id"])
+
+            if batch.get("output_file_id"):
+                results = await self._download_results(client, batch["output_file_id"])
+            if batch["status"] != "completed":
+                logger.error(f"Lote {batch['id']} terminou com status {batch['status']}")
+        except Exception as e:
+            # Lote inteiro falhou: as empresas pendentes caem na extração individual
+            logger.error(f"Erro no lote de extração: {str(e)}")
+        finally:
+            if self._http_client is None:
+                await client.aclose()
+
+        return await self.ingest_results(results, db)
+
+    def write_batch_file(self) -> str:
+        """Grava as requisições pendentes num arquivo JSONL"""
+        os.makedirs(settings.batch_files_dir, exist_ok=True)
+        path = os.path.join(
+            settings.batch_files_dir,
+            f"aum_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        )
+        with open(path, "w", encoding="utf-8") as batch_file:
+            for item in self._pending.values():
+                batch_file.write(json.dumps(item["request"], ensure_ascii=False) + "\n")
+        return path
+
+    async def ingest_results(self, results: List[Dict], db: AsyncSession) -> List[AUMSnapshot]:
+        """
+        Cria os snapshots e registra o uso de cada resultado; pendentes sem
+        resultado válido vão para a extração individual
+        """
+        snapshots = []
+        fallback = []
+
+        for result in results:
+            item = self._pending.pop(result.get("custom_id"), None) if isinstance(result, dict) else None
+            if item is None:
+                continue
+
+            company = item["company"]
+            try:
+                aum_text, body = parse_batch_result(result)
+            except ValueError as e:
+                logger.error(f"Erro no lote para {company.name}: {str(e)}")
+                fallback.append(item)
+                continue
+
+            usage = body.get("usage") or {}
+            await self.extractor.budget_controller.record_usage(
+                db=db,
+                company_id=company.id,
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                model=body.get("model") or self.model,
+                request_type="aum_extraction_batch_file",
+                cost_multiplier=settings.batch_api_cost_multiplier
+            )
+
+            snapshots.append(await self.extractor._finish_extraction(
+                company, aum_text, item["content"], item["content_sources"], db
+            ))
+
+        fallback.extend(self._pending.values())
+        self._pending.clear()
+        if fallback:
+            logger.warning(f"{len(fallback)} empresas sem resultado válido no lote, extraindo individualmente")
+        for item in fallback:
+            snapshots.append(await self.extractor._extract_single(item["company"], item["scraped_data"], db))
+
+        return snapshots
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {settings.openai_api_key}"}
+
+    async def _upload_file(self, client: httpx.AsyncClient, path: str) -> str:
+        with open(path, "rb") as batch_file:
+            response = await client.post(
+                f"{self.base_url}/files",
+                headers=self._headers(),
+                data={"purpose": "batch"},
+                files={"file": (os.path.basename(path), batch_file, "application/jsonl")}
+            )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def _create_batch(self, client: httpx.AsyncClient, file_id: str) -> Dict:
+        response = await client.post(
+            f"{self.base_url}/batches",
+            headers=self._headers(),
+            json={
+                "input_file_id": file_id,
+                "endpoint": CHAT_COMPLETIONS_ENDPOINT,
+                "completion_window": "24h"
+            }
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _wait_for_batch(self, client: httpx.AsyncClient, batch_id: str) -> Dict:
+        """Consulta o lote até um estado final (ou até o timeout)"""
+        started = time.monotonic()
+
+        while True:
+            response = await client.get(f"{self.base_url}/batches/{batch_id}", headers=self._headers())
+            response.raise_for_status()
+            batch = response.json()
+
+            if batch["status"] in BATCH_DONE_STATUS:
+                return batch
+
+            if time.monotonic() - started > self.timeout:
+                raise TimeoutError(f"Lote {batch_id} não terminou em {self.timeout:.0f}s")
+
+            logger.info(f"Lote {batch_id}: {batch['status']}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _download_results(self, client: httpx.AsyncClient, file_id: str) -> List[Dict]:
+        response = await client.get(f"{self.base_url}/files/{file_id}/content", headers=self._headers())
+        response.raise_for_status()
+
+        results = []
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logger.error(f"Linha inválida no resultado do lote {file_id}: {str(e)}")
+        return results
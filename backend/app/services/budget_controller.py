@@ -7,6 +7,23 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Preço por token (prompt, completion) em USD; prefixo mais longo vence
+MODEL_PRICES = {
+    "gpt-4o": (0.00003, 0.00006),  # $0.03 / $0.06 per 1K tokens
+    "gpt-4o-mini": (0.00000015, 0.0000006),  # $0.15 / $0.60 per 1M tokens
+    "gpt-4-turbo": (0.00001, 0.00003),
+    "gpt-3.5-turbo": (0.0000005, 0.0000015),
+}
+
+DEFAULT_MODEL_PRICE = MODEL_PRICES["gpt-4o"]
+
+def get_model_prices(model: str):
+    """(preço por token de prompt, preço por token de completion) do modelo"""
+    matches = [prefix for prefix in MODEL_PRICES if (model or "").startswith(prefix)]
+    if not matches:
+        return DEFAULT_MODEL_PRICE
+    return MODEL_PRICES[max(matches, key=len)]
+
 class BudgetController:
     def __init__(self):
         self.daily_budget = settings.daily_budget_usd
@@ -98,15 +115,17 @@ class BudgetController:
         prompt_tokens: int = 0,
         completion_tokens: int = 0,
         model: str = "gpt-4o",
-        request_type: str = "aum_extraction"
+        request_type: str = "aum_extraction",
+        cost_multiplier: float = 1.0
     ):
-        """Registra uso da API OpenAI"""
+        """Registra uso da API OpenAI (cost_multiplier para descontos, ex: API de batch)"""
         total_tokens = prompt_tokens + completion_tokens
         
-        # Cálculo de custo (preços aproximados para GPT-4o)
-        prompt_cost = prompt_tokens * 0.00003  # $0.03 per 1K tokens
-        completion_cost = completion_tokens * 0.00006  # $0.06 per 1K tokens
-        total_cost = prompt_cost + completion_cost
+        # Cálculo de custo com o preço do modelo usado
+        prompt_price, completion_price = get_model_prices(model)
+        prompt_cost = prompt_tokens * prompt_price
+        completion_cost = completion_tokens * completion_price
+        total_cost = (prompt_cost + completion_cost) * cost_multiplier
         
         usage = Usage(
             company_id=company_id,
@@ -130,15 +149,10 @@ class BudgetController:
     
     def estimate_task_cost(self, estimated_tokens: int, model: str = "gpt-4o") -> float:
         """Estima o custo de uma tarefa baseado no número de tokens"""
-        if model == "gpt-4o":
-            # Assumindo distribuição 60/40 entre prompt e completion
-            prompt_tokens = int(estimated_tokens * 0.6)
-            completion_tokens = int(estimated_tokens * 0.4)
-            
-            prompt_cost = prompt_tokens * 0.00003
-            completion_cost = completion_tokens * 0.00006
-            
-            return prompt_cost + completion_cost
-        
-        # Fallback para outros modelos
-        return estimated_tokens * 0.00004
\ No newline at end of file
+        prompt_price, completion_price = get_model_prices(model)
+        
+        # Assumindo distribuição 60/40 entre prompt e completion
+        prompt_tokens = int(estimated_tokens * 0.6)
+        completion_tokens = int(estimated_tokens * 0.4)
+        
+        return prompt_tokens * prompt_price + completion_tokens * completion_price
@@ -1,227 +1,305 @@
-import pandas as pd
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 from app.models.company import Company
 from app.models.aum_snapshot import AUMSnapshot
 from app.models.scrape_log import ScrapeLog
+from app.models.content_blob import ContentBlob
 from app.utils.unit_converter import format_currency
-from datetime import datetime
-from typing import List, Dict
+from app.core.config import settings
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+import asyncio
+import json
 import logging
-import io
+import os
+import tempfile
 
 logger = logging.getLogger(__name__)
 
+MAIN_SHEET = "Resultados AUM"
+LOGS_SHEET = "Logs de Scraping"
+SUMMARY_SHEET = "Resumo"
+
+MAIN_COLUMNS = [
+    "Empresa", "Site", "LinkedIn", "Instagram", "Twitter/X", "AUM Encontrado", "AUM Normalizado",
+    "AUM Formatado", "Fonte", "Método Extração", "Confiança", "Scrapes Bem-sucedidos",
+    "Scrapes Falharam", "URLs Scrapadas", "Data Extração", "Empresa Criada"
+]
+LOGS_COLUMNS = ["Empresa", "URL", "Tipo Conteúdo", "Status", "Erro", "Tamanho Conteúdo", "Data Scraping"]
+SUMMARY_COLUMNS = ["Métrica", "Valor"]
+
+MAX_COLUMN_WIDTH = 50
+SCRAPED_URLS_SHOWN = 3
+
+class SheetSpool:
+    """Linhas de uma planilha gravadas em disco, com a largura máxima de cada coluna"""
+
+    def __init__(self, headers: List[str]):
+        self.headers = headers
+        self.widths = [len(header) for header in headers]
+        self.row_count = 0
+        self._file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+
+    def append(self, values: List) -> None:
+        for index, value in enumerate(values):
+            if value is not None:
+                self.widths[index] = max(self.widths[index], len(str(value)))
+        self._file.write(json.dumps(values, ensure_ascii=False) + "\n")
+        self.row_count += 1
+
+    def rows(self) -> Iterator[List]:
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def column_widths(self) -> List[int]:
+        return [min(width + 2, MAX_COLUMN_WIDTH) for width in self.widths]
+
+    def close(self) -> None:
+        self._file.close()
+
 class ExcelExporter:
-    def __init__(self):
+    def __init__(self, chunk_size: Optional[int] = None):
         self.output_filename = f"aum_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    async def export_results(self, db: AsyncSession) -> bytes:
-        """Exporta todos os resultados para Excel"""
-        
-        # Buscar dados das empresas com AUM
-        companies_data = await self._get_companies_data(db)
-        
-        # Criar DataFrames
-        main_df = await self._create_main_dataframe(companies_data)
-        logs_df = await self._create_logs_dataframe(db)
-        summary_df = await self._create_summary_dataframe(companies_data)
-        
-        # Criar arquivo Excel em memória
-        excel_buffer = io.BytesIO()
-        
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            # Planilha principal
-            main_df.to_excel(writer, sheet_name='Resultados AUM', index=False)
-            
-            # Planilha de logs
-            logs_df.to_excel(writer, sheet_name='Logs de Scraping', index=False)
-            
-            # Planilha de resumo
-            summary_df.to_excel(writer, sheet_name='Resumo', index=False)
-            
-            # Formatar planilhas
-            await self._format_excel_sheets(writer)
-        
-        excel_buffer.seek(0)
-        return excel_buffer.getvalue()
-    
-    async def _get_companies_data(self, db: AsyncSession) -> List[Dict]:
-        """Busca dados das empresas com seus AUMs"""
-        
+        self.chunk_size = settings.export_chunk_size if chunk_size is None else chunk_size
+
+    async def export_to_file(self, db: AsyncSession) -> str:
+        """Exporta todos os resultados para um arquivo Excel temporário e retorna o caminho
+
+        As linhas são lidas do banco em blocos e gravadas em disco conforme chegam,
+        então a memória usada não cresce com o número de empresas ou de logs.
+        """
+        main = SheetSpool(MAIN_COLUMNS)
+        logs = SheetSpool(LOGS_COLUMNS)
+
+        try:
+            stats = await self._spool_main_rows(db, main)
+            await self._spool_log_rows(db, logs)
+            summary_rows = self._summary_rows(stats)
+
+            return await asyncio.to_thread(self._write_workbook, main, logs, summary_rows)
+        finally:
+            main.close()
+            logs.close()
+
+    def _log_cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=settings.export_log_window_days)
+
+    async def _spool_main_rows(self, db: AsyncSession, spool: SheetSpool) -> Dict:
+        """Grava as linhas da planilha principal (maiores AUMs primeiro) e acumula o resumo"""
+
+        # Snapshot mais recente de cada empresa, só as colunas exportadas (sem textos)
+        latest = (
+            select(AUMSnapshot.company_id, func.max(AUMSnapshot.id).label("snapshot_id"))
+            .group_by(AUMSnapshot.company_id)
+            .subquery()
+        )
+        query = (
+            select(
+                Company.id, Company.name, Company.url_site, Company.url_linkedin,
+                Company.url_instagram, Company.url_x, Company.created_at,
+                AUMSnapshot.id.label("snapshot_id"), AUMSnapshot.aum_raw_text, AUMSnapshot.aum_normalized,
+                AUMSnapshot.source_url, AUMSnapshot.extraction_method, AUMSnapshot.confidence_score,
+                AUMSnapshot.extracted_at, AUMSnapshot.last_seen_at
+            )
+            .outerjoin(latest, latest.c.company_id == Company.id)
+            .outerjoin(AUMSnapshot, AUMSnapshot.id == latest.c.snapshot_id)
+            .order_by(func.coalesce(AUMSnapshot.aum_normalized, 0).desc(), Company.id)
+            .execution_options(yield_per=self.chunk_size)
+        )
+
+        stats = {"total": 0, "with_aum": 0, "aum_sum": 0.0, "aum_max": None, "aum_min": None}
+        result = await db.stream(query)
+
+        async for chunk in result.partitions():
+            scrape_stats = await self._scrape_stats(db, [row.id for row in chunk])
+
+            for row in chunk:
+                counts = scrape_stats.get(row.id, {})
+                spool.append(self._main_row(row, counts))
+
+                stats["total"] += 1
+                if row.aum_normalized:
+                    stats["with_aum"] += 1
+                    stats["aum_sum"] += row.aum_normalized
+                    stats["aum_max"] = row.aum_normalized if stats["aum_max"] is None else max(stats["aum_max"], row.aum_normalized)
+                    stats["aum_min"] = row.aum_normalized if stats["aum_min"] is None else min(stats["aum_min"], row.aum_normalized)
+
+        return stats
+
+    async def _scrape_stats(self, db: AsyncSession, company_ids: List[int]) -> Dict[int, Dict]:
+        """Contagem de scrapes e primeiras URLs com sucesso das empresas de um bloco"""
+
+        # Só os logs da janela de exportação: o filtro em scraped_at limita as partições lidas
+        cutoff = self._log_cutoff()
+        stats = {company_id: {"success": 0, "failed": 0, "urls": []} for company_id in company_ids}
+
         result = await db.execute(
-            select(Company).options(
-                selectinload(Company.aum_snapshots),
-                selectinload(Company.scrape_logs)
+            select(ScrapeLog.company_id, ScrapeLog.status, func.count(ScrapeLog.id))
+            .where(
+                ScrapeLog.company_id.in_(company_ids),
+                ScrapeLog.scraped_at >= cutoff,
+                ScrapeLog.status.in_(["success", "failed"])
             )
+            .group_by(ScrapeLog.company_id, ScrapeLog.status)
+        )
+        for company_id, log_status, count in result.all():
+            stats[company_id][log_status] = count
+
+        ranked = (
+            select(
+                ScrapeLog.company_id,
+                ScrapeLog.url,
+                func.row_number().over(partition_by=ScrapeLog.company_id, order_by=ScrapeLog.id).label("position")
+            )
+            .where(
+                ScrapeLog.company_id.in_(company_ids),
+                ScrapeLog.scraped_at >= cutoff,
+                ScrapeLog.status == "success"
+            )
+            .subquery()
         )
-        
-        companies = result.scalars().all()
-        companies_data = []
-        
-        for company in companies:
-            # Pegar o AUM mais recente
-            latest_aum = None
-            if company.aum_snapshots:
-                latest_aum = max(company.aum_snapshots, key=lambda x: x.extracted_at)
-            
-            companies_data.append({
-                "company": company,
-                "latest_aum": latest_aum,
-                "scrape_logs": company.scrape_logs
-            })
-        
-        return companies_data
-    
-    async def _create_main_dataframe(self, companies_data: List[Dict]) -> pd.DataFrame:
-        """Cria DataFrame principal com resultados"""
-        
-        data = []
-        
-        for item in companies_data:
-            company = item["company"]
-            latest_aum = item["latest_aum"]
-            scrape_logs = item["scrape_logs"]
-            
-            # Contar status dos scrapes
-            successful_scrapes = len([log for log in scrape_logs if log.status == "success"])
-            failed_scrapes = len([log for log in scrape_logs if log.status == "failed"])
-            
-            # URLs que foram scrapadas
-            scraped_urls = [log.url for log in scrape_logs if log.status == "success"]
-            
-            row = {
-                "Empresa": company.name,
-                "Site": company.url_site or "N/A",
-                "LinkedIn": company.url_linkedin or "N/A",
-                "Instagram": company.url_instagram or "N/A",
-                "Twitter/X": company.url_x or "N/A",
-                "AUM Encontrado": latest_aum.aum_raw_text if latest_aum else "NAO_DISPONIVEL",
-                "AUM Normalizado": latest_aum.aum_normalized if latest_aum else None,
-                "AUM Formatado": format_currency(latest_aum.aum_normalized) if latest_aum and latest_aum.aum_normalized else "N/A",
-                "Fonte": latest_aum.source_url if latest_aum else "N/A",
-                "Método Extração": latest_aum.extraction_method if latest_aum else "N/A",
-                "Confiança": f"{latest_aum.confidence_score:.1%}" if latest_aum else "0%",
-                "Scrapes Bem-sucedidos": successful_scrapes,
-                "Scrapes Falharam": failed_scrapes,
-                "URLs Scrapadas": "; ".join(scraped_urls[:3]) if scraped_urls else "Nenhuma",
-                "Data Extração": latest_aum.extracted_at.strftime('%d/%m/%Y %H:%M') if latest_aum else "N/A",
-                "Empresa Criada": company.created_at.strftime('%d/%m/%Y %H:%M')
-            }
-            
-            data.append(row)
-        
-        df = pd.DataFrame(data)
-        
-        # Ordenar por AUM (maiores primeiro)
-        df['AUM_Sort'] = df['AUM Normalizado'].fillna(0)
-        df = df.sort_values('AUM_Sort', ascending=False)
-        df = df.drop('AUM_Sort', axis=1)
-        
-        return df
-    
-    async def _create_logs_dataframe(self, db: AsyncSession) -> pd.DataFrame:
-        """Cria DataFrame com logs de scraping"""
-        
         result = await db.execute(
-            select(ScrapeLog)
-            .join(Company)
+            select(ranked.c.company_id, ranked.c.url)
+            .where(ranked.c.position <= SCRAPED_URLS_SHOWN)
+            .order_by(ranked.c.company_id, ranked.c.position)
+        )
+        for company_id, url in result.all():
+            stats[company_id]["urls"].append(url)
+
+        return stats
+
+    def _main_row(self, row, counts: Dict) -> List:
+        has_aum = row.snapshot_id is not None
+        seen_at = row.last_seen_at or row.extracted_at
+        urls = counts.get("urls", [])
+
+        return [
+            row.name,
+            row.url_site or "N/A",
+            row.url_linkedin or "N/A",
+            row.url_instagram or "N/A",
+            row.url_x or "N/A",
+            row.aum_raw_text if has_aum else "NAO_DISPONIVEL",
+            row.aum_normalized if has_aum else None,
+            format_currency(row.aum_normalized) if has_aum and row.aum_normalized else "N/A",
+            row.source_url if has_aum else "N/A",
+            row.extraction_method if has_aum else "N/A",
+            f"{row.confidence_score or 0:.1%}" if has_aum else "0%",
+            counts.get("success", 0),
+            counts.get("failed", 0),
+            "; ".join(urls) if urls else "Nenhuma",
+            seen_at.strftime('%d/%m/%Y %H:%M') if has_aum and seen_at else "N/A",
+            row.created_at.strftime('%d/%m/%Y %H:%M') if row.created_at else "N/A"
+        ]
+
+    async def _spool_log_rows(self, db: AsyncSession, spool: SheetSpool) -> None:
+        """Grava os logs de scraping da janela de exportação"""
+
+        # Tamanho gravado no log (páginas arquivadas) ou o do blob, sem carregar o texto
+        query = (
+            select(
+                Company.name, ScrapeLog.url, ScrapeLog.content_type, ScrapeLog.status,
+                ScrapeLog.error_message, func.coalesce(ScrapeLog.content_size, ContentBlob.size),
+                ScrapeLog.scraped_at
+            )
+            .join(Company, Company.id == ScrapeLog.company_id)
+            .outerjoin(ContentBlob, ContentBlob.hash == ScrapeLog.scraped_content_hash)
+            .where(ScrapeLog.scraped_at >= self._log_cutoff())
             .order_by(ScrapeLog.scraped_at.desc())
+            .execution_options(yield_per=self.chunk_size)
         )
-        
-        logs = result.scalars().all()
-        
-        data = []
-        for log in logs:
-            data.append({
-                "Empresa": log.company.name,
-                "URL": log.url,
-                "Tipo Conteúdo": log.content_type,
-                "Status": log.status,
-                "Erro": log.error_message or "N/A",
-                "Tamanho Conteúdo": len(log.scraped_content) if log.scraped_content else 0,
-                "Data Scraping": log.scraped_at.strftime('%d/%m/%Y %H:%M:%S')
-            })
-        
-        return pd.DataFrame(data)
-    
-    async def _create_summary_dataframe(self, companies_data: List[Dict]) -> pd.DataFrame:
-        """Cria DataFrame com resumo estatístico"""
-        
-        # Estatísticas gerais
-        total_companies = len(companies_data)
-        companies_with_aum = len([item for item in companies_data 
-                                 if item["latest_aum"] and item["latest_aum"].aum_normalized])
-        
-        aum_values = [item["latest_aum"].aum_normalized 
-                     for item in companies_data 
-                     if item["latest_aum"] and item["latest_aum"].aum_normalized]
-        
-        data = [
-            {"Métrica": "Total de Empresas", "Valor": total_companies},
-            {"Métrica": "Empresas com AUM Encontrado", "Valor": companies_with_aum},
-            {"Métrica": "Taxa de Sucesso", "Valor": f"{companies_with_aum/total_companies:.1%}" if total_companies > 0 else "0%"},
-            {"Métrica": "AUM Total (R$)", "Valor": format_currency(sum(aum_values)) if aum_values else "N/A"},
-            {"Métrica": "AUM Médio (R$)", "Valor": format_currency(sum(aum_values)/len(aum_values)) if aum_values else "N/A"},
-            {"Métrica": "Maior AUM (R$)", "Valor": format_currency(max(aum_values)) if aum_values else "N/A"},
-            {"Métrica": "Menor AUM (R$)", "Valor": format_currency(min(aum_values)) if aum_values else "N/A"},
-            {"Métrica": "Data Geração", "Valor": datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
+
+        result = await db.stream(query)
+        async for chunk in result.partitions():
+            for name, url, content_type, log_status, error_message, content_size, scraped_at in chunk:
+                spool.append([
+                    name,
+                    url,
+                    content_type,
+                    log_status,
+                    error_message or "N/A",
+                    content_size or 0,
+                    scraped_at.strftime('%d/%m/%Y %H:%M:%S')
+                ])
+
+    def _summary_rows(self, stats: Dict) -> List[List]:
+        """Resumo estatístico a partir dos totais acumulados"""
+
+        total_companies = stats["total"]
+        with_aum = stats["with_aum"]
+
+        return [
+            ["Total de Empresas", total_companies],
+            ["Empresas com AUM Encontrado", with_aum],
+            ["Taxa de Sucesso", f"{with_aum/total_companies:.1%}" if total_companies > 0 else "0%"],
+            ["AUM Total (R$)", format_currency(stats["aum_sum"]) if with_aum else "N/A"],
+            ["AUM Médio (R$)", format_currency(stats["aum_sum"]/with_aum) if with_aum else "N/A"],
+            ["Maior AUM (R$)", format_currency(stats["aum_max"]) if with_aum else "N/A"],
+            ["Menor AUM (R$)", format_currency(stats["aum_min"]) if with_aum else "N/A"],
+            ["Data Geração", datetime.now().strftime('%d/%m/%Y %H:%M:%S')]
         ]
-        
-        return pd.DataFrame(data)
-    
-    async def _format_excel_sheets(self, writer):
-        """Formata as planilhas Excel"""
-        
+
+    def _write_workbook(self, main: SheetSpool, logs: SheetSpool, summary_rows: List[List]) -> str:
+        """Monta o Excel em modo write-only (linha a linha) num arquivo temporário"""
+
+        workbook = Workbook(write_only=True)
+
+        # Planilha principal
+        ws = workbook.create_sheet(MAIN_SHEET)
+        self._set_widths(ws, main.column_widths())
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        ws.append(self._header(ws, main.headers, header_font, header_fill, Alignment(horizontal="center")))
+        for row in main.rows():
+            ws.append(row)
+
+        # Planilha de logs
+        ws = workbook.create_sheet(LOGS_SHEET)
+        self._set_widths(ws, logs.column_widths())
+        ws.append(self._header(ws, logs.headers, Font(bold=True)))
+        for row in logs.rows():
+            ws.append(row)
+
+        # Planilha de resumo
+        ws = workbook.create_sheet(SUMMARY_SHEET)
+        self._set_widths(ws, [25, 20])
+        summary_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+        ws.append(self._header(ws, SUMMARY_COLUMNS, Font(bold=True), summary_fill))
+        for row in summary_rows:
+            ws.append(row)
+
+        handle = tempfile.NamedTemporaryFile(prefix="aum_export_", suffix=".xlsx", delete=False)
+        handle.close()
         try:
-            from openpyxl.styles import Font, PatternFill, Alignment
-            from openpyxl.utils.dataframe import dataframe_to_rows
-            
-            workbook = writer.book
-            
-            # Formatar planilha principal
-            if 'Resultados AUM' in workbook.sheetnames:
-                ws = workbook['Resultados AUM']
-                
-                # Header styling
-                header_font = Font(bold=True, color="FFFFFF")
-                header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                
-                for cell in ws[1]:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
-                
-                # Auto-adjust column widths
-                for column in ws.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Formatar planilha de resumo
-            if 'Resumo' in workbook.sheetnames:
-                ws = workbook['Resumo']
-                
-                # Header styling
-                for cell in ws[1]:
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-                
-                # Auto-adjust column widths
-                ws.column_dimensions['A'].width = 25
-                ws.column_dimensions['B'].width = 20
-                
-        except Exception as e:
-            logger.warning(f"Erro ao formatar Excel: {str(e)}")
-    
+            workbook.save(handle.name)
+        except Exception:
+            os.remove(handle.name)
+            raise
+
+        return handle.name
+
+    def _set_widths(self, ws, widths: List[int]) -> None:
+        # No modo write-only as larguras precisam existir antes da primeira linha
+        for index, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(index)].width = width
+
+    def _header(self, ws, headers: List[str], font: Font, fill: PatternFill = None, alignment: Alignment = None) -> List:
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = font
+            if fill is not None:
+                cell.fill = fill
+            if alignment is not None:
+                cell.alignment = alignment
+            cells.append(cell)
+        return cells
+
     def get_filename(self) -> str:
         """Retorna nome do arquivo Excel"""
-        return self.output_filename
\ No newline at end of file
+        return self.output_filename
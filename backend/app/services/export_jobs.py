@@ -0,0 +1,198 @@
+"""
+Exportação do Excel como job em background: roda numa thread com event loop
+e engine próprios, grava em export_dir e reaproveita o arquivo enquanto os
+dados não mudarem
+
+A versão dos dados (watermark) combina os maiores ids/datas de snapshots,
+logs e empresas com o dia da janela de logs; o arquivo gerado fica em
+aum_results_<versão>.xlsx e um novo pedido com a mesma versão não gera nada.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.core.database import engine
+from app.models.aum_snapshot import AUMSnapshot
+from app.models.company import Company
+from app.models.scrape_log import ScrapeLog
+from app.services.excel_exporter import ExcelExporter
+import logging
+
+logger = logging.getLogger(__name__)
+
+FILE_PREFIX = "aum_results_"
+FILE_SUFFIX = ".xlsx"
+MAX_JOBS = 100  # Registros de jobs mantidos em memória
+
+class ExportJobManager:
+    """Fila de exportações do Excel fora do event loop, com cache por versão dos dados"""
+
+    def __init__(self, directory: str = None, database_url: str = None, max_workers: int = None, keep_files: int = None):
+        self.directory = directory or settings.export_dir
+        self.database_url = database_url or engine.url.render_as_string(hide_password=False)
+        self.keep_files = settings.export_keep_files if keep_files is None else keep_files
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.export_workers,
+            thread_name_prefix="excel-export"
+        )
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+        self._futures: Dict[str, Future] = {}
+        self._running: Dict[str, str] = {}  # versão -> job em andamento
+
+    async def data_version(self, db: AsyncSession) -> str:
+        """Watermark dos dados exportados: muda quando algo que entra no Excel muda"""
+        row = (await db.execute(select(
+            select(func.max(AUMSnapshot.id)).scalar_subquery(),
+            select(func.max(AUMSnapshot.last_seen_at)).scalar_subquery(),
+            select(func.max(ScrapeLog.id)).scalar_subquery(),
+            select(func.count(Company.id)).scalar_subquery(),
+            select(func.max(func.coalesce(Company.updated_at, Company.created_at))).scalar_subquery()
+        ))).one()
+
+        # A janela de logs anda com o tempo: o cache vale no máximo até o fim do dia
+        watermark = [str(value) for value in row] + [datetime.now(timezone.utc).date().isoformat(), settings.export_log_window_days]
+        return hashlib.sha256(json.dumps(watermark).encode("utf-8")).hexdigest()[:16]
+
+    def file_path(self, version: str) -> str:
+        return os.path.join(self.directory, f"{FILE_PREFIX}{version}{FILE_SUFFIX}")
+
+    async def submit(self, db: AsyncSession) -> Dict:
+        """Cria um job de exportação (ou reaproveita o arquivo/job da mesma versão)"""
+        version = await self.data_version(db)
+        path = self.file_path(version)
+
+        with self._lock:
+            running = self._running.get(version)
+            if running is not None:
+                return dict(self._jobs[running])
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "job_id": job_id,
+                "version": version,
+                "status": "pending",
+                "cached": False,
+                "filename": os.path.basename(path),
+                "error": None,
+                "created_at": datetime.now().isoformat(),
+                "finished_at": None
+            }
+            if os.path.exists(path):
+                job.update(status="done", cached=True, finished_at=job["created_at"])
+            else:
+                self._running[version] = job_id
+                self._futures[job_id] = self._executor.submit(self._run, job_id, version, path)
+
+            self._jobs[job_id] = job
+            self._evict_jobs()
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_file(self, job_id: str) -> Optional[str]:
+        """Caminho do arquivo de um job concluído (None se ainda não existe)"""
+        job = self.get(job_id)
+        if not job or job["status"] != "done":
+            return None
+        path = self.file_path(job["version"])
+        return path if os.path.exists(path) else None
+
+    async def wait(self, job_id: str) -> Optional[Dict]:
+        """Aguarda o job sem bloquear o event loop"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            await asyncio.wrap_future(future)
+        return self.get(job_id)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, version: str, path: str) -> None:
+        """Executa o job na thread do pool, com um event loop próprio"""
+        self._update(job_id, status="running")
+        try:
+            asyncio.run(self._build(path))
+            self._update(job_id, status="done")
+            self._prune_files()
+        except Exception as e:
+            logger.error(f"Erro na exportação do Excel (job {job_id}): {str(e)}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(version, None)
+                self._futures.pop(job_id, None)
+
+    async def _build(self, path: str) -> None:
+        # Conexões não podem ser compartilhadas entre event loops: engine próprio, sem pool
+        export_engine = create_async_engine(self.database_url, poolclass=NullPool)
+        try:
+            Session = sessionmaker(export_engine, class_=AsyncSession, expire_on_commit=False)
+            async with Session() as db:
+                temp_path = await ExcelExporter().export_to_file(db)
+        finally:
+            await export_engine.dispose()
+
+        # Só o arquivo completo aparece com o nome da versão
+        os.makedirs(self.directory, exist_ok=True)
+        partial = f"{path}.partial"
+        shutil.move(temp_path, partial)
+        os.replace(partial, path)
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if fields.get("status") in ("done", "failed"):
+                job["finished_at"] = datetime.now().isoformat()
+
+    def _evict_jobs(self) -> None:
+        # Descarta os registros concluídos mais antigos (chamado com o lock)
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(self._jobs) - MAX_JOBS)]:
+            del self._jobs[job_id]
+
+    def _prune_files(self) -> None:
+        """Mantém só os keep_files arquivos mais recentes no diretório"""
+        try:
+            files = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+            ]
+            files.sort(key=os.path.getmtime, reverse=True)
+            for path in files[max(1, self.keep_files):]:
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Erro ao limpar exportações antigas: {str(e)}")
+
+_manager: Optional[ExportJobManager] = None
+
+def get_export_jobs() -> ExportJobManager:
+    """Gerenciador compartilhado pelo processo"""
+    global _manager
+
+    if _manager is None:
+        _manager = ExportJobManager()
+    return _manager
+
+def shutdown_export_jobs() -> None:
+    """Encerra o pool de exportação (chamado no shutdown da aplicação)"""
+    global _manager
+
+    if _manager is not None:
+        _manager.close()
+        _manager = None
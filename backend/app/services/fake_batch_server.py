@@ -0,0 +1,118 @@
+"""
+Servidor local com o mesmo contrato da API de batch (files + batches) para
+testes e execuções offline
+
+    uvicorn app.services.fake_batch_server:app --port 8001
+    OPENAI_BATCH_BASE_URL=http://localhost:8001/v1
+
+O lote fica "in_progress" na primeira consulta e é processado na seguinte;
+cada requisição é respondida por um responder(body) -> texto da resposta.
+"""
+import json
+import re
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Callable, Dict
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from app.utils.text_processing import AUM_MONEY_PATTERN
+
+def default_responder(body: Dict) -> str:
+    """Primeiro valor monetário com unidade do prompt, ou NAO_DISPONIVEL"""
+    prompt = body["messages"][-1]["content"]
+    content = prompt.split("CONTEÚDO PARA ANÁLISE:", 1)[-1]
+    match = AUM_MONEY_PATTERN.search(content)
+    return match.group(0) if match else "NAO_DISPONIVEL"
+
+def _parse_multipart(content_type: str, payload: bytes) -> Dict[str, bytes]:
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + payload
+    )
+    return {
+        part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+        for part in message.iter_parts()
+    }
+
+def create_fake_batch_app(responder: Callable[[Dict], str] = default_responder) -> FastAPI:
+    fake_app = FastAPI(title="Fake Batch API")
+    files: Dict[str, bytes] = {}
+    batches: Dict[str, Dict] = {}
+
+    @fake_app.post("/v1/files")
+    async def upload_file(request: Request):
+        fields = _parse_multipart(request.headers.get("content-type", ""), await request.body())
+        if "file" not in fields:
+            raise HTTPException(status_code=400, detail="Campo file ausente")
+
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        files[file_id] = fields["file"]
+        return {"id": file_id, "object": "file", "purpose": (fields.get("purpose") or b"").decode()}
+
+    @fake_app.post("/v1/batches")
+    async def create_batch(payload: Dict):
+        if payload.get("input_file_id") not in files:
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": payload.get("endpoint"),
+            "input_file_id": payload["input_file_id"],
+            "status": "validating",
+            "output_file_id": None
+        }
+        return batches[batch_id]
+
+    @fake_app.get("/v1/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        batch = batches.get(batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail="Lote não encontrado")
+
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress":
+            batch["output_file_id"] = _process(batch)
+            batch["status"] = "completed"
+        return batch
+
+    @fake_app.get("/v1/files/{file_id}/content")
+    async def get_file_content(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        return PlainTextResponse(files[file_id].decode("utf-8"))
+
+    def _process(batch: Dict) -> str:
+        lines = []
+        for line in files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            answer = responder(request["body"])
+            prompt = request["body"]["messages"][-1]["content"]
+            lines.append(json.dumps({
+                "id": f"req-{uuid.uuid4().hex[:8]}",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "model": request["body"].get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}}],
+                        "usage": {
+                            "prompt_tokens": len(re.findall(r"\S+", prompt)),
+                            "completion_tokens": len(answer.split())
+                        }
+                    }
+                },
+                "error": None
+            }, ensure_ascii=False))
+
+        output_id = f"file-{uuid.uuid4().hex[:12]}"
+        files[output_id] = ("\n".join(lines) + "\n").encode("utf-8")
+        return output_id
+
+    return fake_app
+
+app = create_fake_batch_app()
@@ -0,0 +1,130 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+from typing import Dict, Optional
+from app.models.domain_fetch_strategy import DomainFetchStrategy
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_HTTP = "http"
+STRATEGY_BROWSER = "browser"
+
+# Marcadores de páginas que só renderizam conteúdo via JavaScript
+SPA_MARKERS = [
+    'id="root"></div>', "id='root'></div>", 'id="app"></div>', "id='app'></div>",
+    'id="__next"', '__NEXT_DATA__', 'ng-version=', 'data-reactroot',
+    'window.__INITIAL_STATE__', 'window.__NUXT__',
+    'enable javascript', 'habilite o javascript', 'ative o javascript'
+]
+
+def get_domain(url: str) -> str:
+    """Extrai o domínio de uma URL, sem o prefixo www."""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def looks_like_js_shell(html: str, text: str) -> bool:
+    """
+    Detecta páginas-casca de SPA: pouco texto visível e marcadores de
+    frameworks JavaScript (ou quase nenhum texto em um HTML grande)
+    """
+    text_length = len(text or "")
+    if text_length >= settings.js_shell_min_text_chars:
+        return False
+
+    html_lower = (html or "").lower()
+    if any(marker.lower() in html_lower for marker in SPA_MARKERS):
+        return True
+
+    # HTML grande com quase nenhum texto: conteúdo montado por scripts
+    return text_length < 200 and len(html_lower) > 20 * max(text_length, 1)
+
+class FetchStrategyStore:
+    """Estratégia de fetch aprendida por domínio, persistida em domain_fetch_strategies"""
+
+    def __init__(self):
+        self.ttl = timedelta(days=settings.fetch_strategy_ttl_days)
+        self._cache: Dict[str, DomainFetchStrategy] = {}
+
+    async def get_strategy(self, db: AsyncSession, domain: str) -> Optional[str]:
+        """Retorna a estratégia conhecida para o domínio (None se nunca visto ou expirada)"""
+        record = await self._load(db, domain)
+        if record is None:
+            return None
+
+        # A estratégia é re-testada após o TTL, contado do último teste
+        # (fetches que só reutilizam a estratégia não renovam o prazo)
+        probed_at = record.probed_at or record.created_at
+        if probed_at is not None:
+            if probed_at.tzinfo is None:
+                probed_at = probed_at.replace(tzinfo=timezone.utc)
+            if datetime.now(timezone.utc) - probed_at > self.ttl:
+                return None
+
+        return record.strategy
+
+    async def record_result(
+        self,
+        db: AsyncSession,
+        domain: str,
+        strategy: str,
+        escalated: bool = False,
+        probed: bool = True
+    ):
+        """
+        Registra a estratégia vencedora para o domínio; probed=False quando a
+        estratégia conhecida foi só reutilizada (sem testar HTTP de novo)
+        """
+        record = await self._load(db, domain)
+        now = datetime.now(timezone.utc)
+
+        if record is None:
+            record = DomainFetchStrategy(
+                domain=domain,
+                strategy=strategy,
+                success_count=1,
+                escalation_count=1 if escalated else 0,
+                updated_at=now,
+                probed_at=now
+            )
+            try:
+                # Savepoint: outra sessão pode ter inserido o mesmo domínio
+                async with db.begin_nested():
+                    db.add(record)
+            except IntegrityError:
+                self._cache.pop(domain, None)
+                record = await self._load(db, domain)
+                if record is None:
+                    return
+            else:
+                self._cache[domain] = record
+                logger.info(f"Estratégia de fetch para {domain}: {strategy}")
+                return
+
+        if record.strategy != strategy:
+            logger.info(f"Estratégia de fetch para {domain}: {record.strategy} -> {strategy}")
+
+        record.strategy = strategy
+        record.success_count = (record.success_count or 0) + 1
+        if escalated:
+            record.escalation_count = (record.escalation_count or 0) + 1
+        record.updated_at = now
+        if probed:
+            record.probed_at = now
+
+    async def _load(self, db: AsyncSession, domain: str) -> Optional[DomainFetchStrategy]:
+        cached = self._cache.get(domain)
+        if cached is not None and cached in db:
+            return cached
+
+        result = await db.execute(
+            select(DomainFetchStrategy).where(DomainFetchStrategy.domain == domain)
+        )
+        record = result.scalar_one_or_none()
+
+        if record is not None:
+            self._cache[domain] = record
+        return record
@@ -0,0 +1,196 @@
+"""
+Retenção dos scrape_logs: partições mensais, compactação dos logs antigos em
+resumos diários por empresa e remoção barata das partições expiradas
+"""
+import asyncio
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from sqlalchemy import select, delete, func, distinct, text, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.models.aum_snapshot import AUMSnapshot
+from app.models.content_blob import ContentBlob
+from app.models.scrape_log import ScrapeLog
+from app.models.scrape_log_summary import ScrapeLogDailySummary
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PATTERN = re.compile(r"^scrape_logs_y(\d{4})m(\d{2})$")
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def partition_name(month: date) -> str:
+    return f"scrape_logs_y{month.year}m{month.month:02d}"
+
+class LogRetentionManager:
+    """Mantém os logs recentes brutos e compacta/descarta os antigos"""
+
+    def __init__(self, retention_days: int = None, months_ahead: int = None):
+        self.retention_days = settings.scrape_log_retention_days if retention_days is None else retention_days
+        self.months_ahead = settings.scrape_log_partition_months_ahead if months_ahead is None else months_ahead
+
+    def cutoff(self) -> datetime:
+        """Início do dia mais antigo mantido bruto (dias inteiros são compactados)"""
+        oldest_day = datetime.now(timezone.utc).date() - timedelta(days=self.retention_days)
+        return datetime.combine(oldest_day, datetime.min.time(), tzinfo=timezone.utc)
+
+    async def run(self, db: AsyncSession) -> Dict:
+        """Executa o ciclo completo de retenção numa transação"""
+        cutoff = self.cutoff()
+        partitioned = _is_postgres(db) and await self._is_partitioned(db)
+
+        report = {"cutoff": cutoff.isoformat(), "partitions_created": [], "partitions_dropped": []}
+        if partitioned:
+            report["partitions_created"] = await self.ensure_partitions(db)
+
+        report["summary_rows"] = await self.compact(db, cutoff)
+
+        if partitioned:
+            report["partitions_dropped"] = await self.drop_expired_partitions(db, cutoff)
+
+        # Restante (partição parcial, default ou banco sem partições)
+        result = await db.execute(delete(ScrapeLog).where(ScrapeLog.scraped_at < cutoff))
+        report["logs_deleted"] = result.rowcount
+        report["blobs_deleted"] = await self.purge_orphan_blobs(db)
+
+        await db.commit()
+        logger.info(f"Retenção dos scrape_logs concluída: {report}")
+        return report
+
+    async def compact(self, db: AsyncSession, cutoff: datetime) -> int:
+        """Soma os logs anteriores ao cutoff nos resumos por empresa/dia/fonte/status"""
+        day = func.date(ScrapeLog.scraped_at)
+        result = await db.execute(
+            select(
+                ScrapeLog.company_id,
+                day.label("day"),
+                ScrapeLog.content_type,
+                ScrapeLog.status,
+                func.count(ScrapeLog.id).label("log_count"),
+                func.count(distinct(ScrapeLog.url)).label("url_count"),
+                func.min(ScrapeLog.scraped_at).label("first_scraped_at"),
+                func.max(ScrapeLog.scraped_at).label("last_scraped_at")
+            )
+            .where(ScrapeLog.scraped_at < cutoff)
+            .group_by(ScrapeLog.company_id, day, ScrapeLog.content_type, ScrapeLog.status)
+        )
+        groups = result.all()
+        if not groups:
+            return 0
+
+        # Resumos já existentes (ex: logs do mesmo dia gravados depois da última compactação)
+        days = {_as_date(group.day) for group in groups}
+        existing: Dict[Tuple, ScrapeLogDailySummary] = {
+            (summary.company_id, summary.day, summary.content_type, summary.status): summary
+            for summary in (await db.execute(
+                select(ScrapeLogDailySummary).where(ScrapeLogDailySummary.day.in_(days))
+            )).scalars()
+        }
+
+        for group in groups:
+            key = (group.company_id, _as_date(group.day), group.content_type, group.status)
+            summary = existing.get(key)
+            if summary is None:
+                summary = ScrapeLogDailySummary(
+                    company_id=group.company_id, day=key[1], content_type=group.content_type,
+                    status=group.status, log_count=0, url_count=0,
+                    first_scraped_at=group.first_scraped_at, last_scraped_at=group.last_scraped_at
+                )
+                db.add(summary)
+                existing[key] = summary
+
+            summary.log_count += group.log_count
+            summary.url_count = max(summary.url_count, group.url_count)
+            summary.first_scraped_at = min(summary.first_scraped_at, group.first_scraped_at)
+            summary.last_scraped_at = max(summary.last_scraped_at, group.last_scraped_at)
+
+        await db.flush()
+        return len(groups)
+
+    async def ensure_partitions(self, db: AsyncSession) -> List[str]:
+        """Cria as partições do mês atual e dos próximos (PostgreSQL)"""
+        existing = set(await self._partitions(db))
+        created = []
+
+        month = month_start(datetime.now(timezone.utc).date())
+        for _ in range(self.months_ahead + 1):
+            name = partition_name(month)
+            if name not in existing:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(text(
+                            f"CREATE TABLE {name} PARTITION OF scrape_logs "
+                            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+                        ))
+                    created.append(name)
+                except Exception as e:
+                    # Ex: a partição default já tem linhas desse mês
+                    logger.warning(f"Não foi possível criar a partição {name}: {str(e)}")
+            month = next_month(month)
+
+        return created
+
+    async def drop_expired_partitions(self, db: AsyncSession, cutoff: datetime) -> List[str]:
+        """Descarta (DROP) as partições inteiramente anteriores ao cutoff, já compactadas"""
+        dropped = []
+        for name in await self._partitions(db):
+            match = PARTITION_PATTERN.match(name)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if datetime.combine(next_month(month), datetime.min.time(), tzinfo=timezone.utc) <= cutoff:
+                await db.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        return dropped
+
+    async def purge_orphan_blobs(self, db: AsyncSession) -> int:
+        """Remove textos de content_blobs que nenhum log ou snapshot referencia mais"""
+        result = await db.execute(
+            delete(ContentBlob).where(
+                ~exists().where(ScrapeLog.scraped_content_hash == ContentBlob.hash),
+                ~exists().where(AUMSnapshot.source_content_hash == ContentBlob.hash)
+            )
+        )
+        return result.rowcount
+
+    async def _partitions(self, db: AsyncSession) -> List[str]:
+        result = await db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'scrape_logs'"
+        ))
+        return sorted(result.scalars())
+
+    async def _is_partitioned(self, db: AsyncSession) -> bool:
+        result = await db.execute(text("SELECT relkind FROM pg_class WHERE relname = 'scrape_logs'"))
+        return result.scalar() == "p"
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def _as_date(value) -> date:
+    # SQLite devolve func.date() como texto
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+async def retention_loop(interval_hours: float = None, session_factory=AsyncSessionLocal):
+    """Job periódico de retenção (iniciado no startup da aplicação)"""
+    interval = (settings.log_retention_interval_hours if interval_hours is None else interval_hours) * 3600
+    manager = LogRetentionManager()
+
+    while True:
+        try:
+            async with session_factory() as db:
+                await manager.run(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro na retenção dos scrape_logs: {str(e)}")
+        await asyncio.sleep(interval)
@@ -1,8 +1,14 @@
 import aiohttp
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import quote
 from bs4 import BeautifulSoup
+from app.utils.text_processing import clean_html
+from app.utils.cpu_pool import run_cpu_bound
+from app.utils.http_reader import read_html_capped
+from app.core.config import settings
+from app.services.fetch_strategy import get_domain
+from app.services.resilience import domain_circuit_breaker, BLOCKING_STATUS, MISSING_STATUS
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,6 +16,7 @@ logger = logging.getLogger(__name__)
 class NewsScaper:
     def __init__(self):
         self.timeout = 30
+        self.max_response_bytes = settings.max_response_bytes
         
     async def search_company_news(self, company_name: str) -> List[Dict]:
         """Busca notícias sobre a empresa com foco em AUM"""
@@ -60,11 +67,12 @@ class NewsScaper:
                     
                     # Buscar conteúdo das notícias
                     for link in news_links[:3]:  # Máximo 3 por site
-                        news_content = await self._fetch_news_content(link)
+                        news_content, news_html = await self._fetch_news_content(link)
                         if news_content:
                             results.append({
                                 "url": link,
                                 "content": news_content,
+                                "html": news_html,  # Página bruta para o arquivo de páginas
                                 "source": "news",
                                 "site": self._get_site_name(site_url)
                             })
@@ -83,13 +91,35 @@ class NewsScaper:
         
         timeout = aiohttp.ClientTimeout(total=self.timeout)
         
-        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.text()
-                else:
-                    logger.warning(f"Status {response.status} para {url}")
-                    return None
+        domain = get_domain(url)
+        if not domain_circuit_breaker.allow_request(domain):
+            logger.info(f"Circuit breaker aberto para {domain}, pulando {url}")
+            return None
+        
+        try:
+            async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        html = await read_html_capped(response, self.max_response_bytes)
+                        domain_circuit_breaker.record_success(domain)
+                        return html
+                    else:
+                        logger.warning(f"Status {response.status} para {url}")
+                        if response.status in MISSING_STATUS:
+                            # O servidor respondeu: 404 não conta para abrir o circuito
+                            domain_circuit_breaker.record_success(domain)
+                        elif response.status in BLOCKING_STATUS or response.status >= 500:
+                            domain_circuit_breaker.record_failure(
+                                domain, blocked=response.status in BLOCKING_STATUS
+                            )
+                        return None
+        except Exception:
+            domain_circuit_breaker.record_failure(domain)
+            raise
+        finally:
+            # Saídas sem sucesso/falha registrados (outros status, cancelamento)
+            # não podem deixar o half-open preso
+            domain_circuit_breaker.release_trial(domain)
     
     def _extract_news_links(self, html: str, base_url: str) -> List[str]:
         """Extrai links de notícias dos resultados de busca"""
@@ -127,29 +157,24 @@ class NewsScaper:
         # Remover duplicatas e limitar
         return list(set(links))[:5]
     
-    async def _fetch_news_content(self, url: str) -> str:
-        """Busca o conteúdo completo de uma notícia"""
+    async def _fetch_news_content(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """Busca uma notícia: (texto principal, HTML bruto)"""
         try:
             content = await self._fetch_search_results(url)
             if content:
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Remover elementos desnecessários
-                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                    element.decompose()
-                
-                # Extrair texto principal
-                article_text = soup.get_text(separator=' ', strip=True)
+                # Extrair texto principal (fora do event loop se a página for grande)
+                article_text = await run_cpu_bound(clean_html, content, size=len(content))
                 
                 # Limitar tamanho
                 if len(article_text) > 5000:
                     article_text = article_text[:5000] + "..."
                 
-                return article_text
+                return article_text, content
                 
         except Exception as e:
             logger.error(f"Erro ao buscar conteúdo de {url}: {str(e)}")
-            return None
+        
+        return None, None
     
     def _get_site_name(self, url: str) -> str:
         """Extrai nome do site da URL"""
@@ -0,0 +1,105 @@
+"""
+Cliente OpenAI compartilhado pela aplicação (pool de conexões com keep-alive)
+e chamadas com hedge para reduzir a latência de cauda
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import httpx
+import openai
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_client: Optional[openai.AsyncOpenAI] = None
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """Cliente único por processo; as conexões HTTP são reaproveitadas entre requests"""
+    global _client
+
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(settings.openai_timeout, connect=5.0)
+        )
+        _client = openai.AsyncOpenAI(api_key=settings.openai_api_key, http_client=http_client)
+        logger.info(f"Cliente OpenAI criado (até {settings.openai_max_connections} conexões)")
+
+    return _client
+
+async def close_openai_client():
+    """Fecha o cliente compartilhado (chamado no shutdown da aplicação)"""
+    global _client
+
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+class LatencyTracker:
+    """Janela móvel das latências das chamadas por modelo, para estimar o p95"""
+
+    def __init__(self, window: int = 200, min_samples: int = None):
+        self.window = window
+        self.min_samples = settings.openai_hedge_min_samples if min_samples is None else min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, latency: float):
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(latency)
+
+    def p95(self, model: str) -> Optional[float]:
+        """p95 das latências recentes (None enquanto há poucas amostras)"""
+        samples = self._samples.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+# Compartilhado pelo processo, como o cliente
+latency_tracker = LatencyTracker()
+
+async def hedged_call(
+    call: Callable[[], Awaitable[T]],
+    model: str,
+    allow_hedge: Callable[[], Awaitable[bool]] = None,
+    tracker: LatencyTracker = None
+) -> T:
+    """
+    Executa call(); se não responder até o p95 do modelo, dispara uma cópia
+    (se allow_hedge autorizar, ex: budget) e usa a primeira resposta
+    """
+    tracker = tracker or latency_tracker
+    delay = tracker.p95(model) if settings.openai_hedging_enabled else None
+
+    started = time.monotonic()
+    primary = asyncio.ensure_future(call())
+    tasks = {primary}
+
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and (allow_hedge is None or await allow_hedge()):
+                logger.info(f"Chamada {model} passou do p95 ({delay:.1f}s), enviando cópia")
+                tasks.add(asyncio.ensure_future(call()))
+
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.record(model, time.monotonic() - started)
+                    return task.result()
+
+            # Falhou e não há outra em andamento: propaga o erro
+            if not tasks:
+                raise next(iter(done)).exception()
+    finally:
+        for task in tasks:
+            task.cancel()
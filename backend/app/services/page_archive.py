@@ -0,0 +1,218 @@
+"""
+Arquivo local das páginas brutas coletadas (no estilo WARC): comprimido,
+só de acréscimo e endereçado pelo conteúdo
+
+Layout em archive_dir:
+    segment-00001.arc   registros "ARC <sha256> <media_type> <tamanho>\\n" + corpo zlib + "\\n"
+    index.jsonl         uma linha por coleta: url, fetched_at e a posição do corpo
+
+Corpos iguais (mesmo sha256) são gravados uma única vez; o ScrapeLog guarda
+o sha256 como referência. A leitura usa mmap dos segmentos.
+
+Vários processos (workers) podem usar o mesmo diretório: as gravações são
+serializadas por um lock de arquivo (archive.lock) e cada processo lê do
+índice as linhas gravadas pelos outros antes de gravar e quando uma
+referência não é encontrada.
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".arc"
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = "archive.lock"
+
+class PageArchive:
+    """Arquivo de páginas brutas com índice por URL e data da coleta"""
+
+    def __init__(self, directory: str = None, segment_max_bytes: int = None):
+        self.directory = directory or settings.archive_dir
+        self.segment_max_bytes = segment_max_bytes or settings.archive_segment_max_bytes
+        self._lock = threading.Lock()
+        self._blobs: Dict[str, Tuple[int, int, int, str]] = {}  # sha256 -> (segmento, offset, tamanho, tipo)
+        self._by_url: Dict[str, List[Tuple[str, str]]] = {}  # url -> [(fetched_at, sha256)]
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._segment = 1
+        self._index_offset = 0  # Bytes do índice já lidos
+
+        with self._lock:
+            self._refresh_index()
+
+    def put(self, url: str, body: bytes, media_type: str = "text/html", fetched_at: datetime = None) -> str:
+        """Arquiva o corpo coletado de url e retorna a referência (sha256)"""
+        digest = hashlib.sha256(body).hexdigest()
+        fetched_at = (fetched_at or datetime.now(timezone.utc)).isoformat()
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._file_lock():
+                # Linhas gravadas por outros processos: deduplicação e segmento atual
+                self._refresh_index()
+                if digest not in self._blobs:
+                    self._blobs[digest] = self._append_blob(digest, body, media_type)
+
+                segment, offset, length, stored_type = self._blobs[digest]
+                entry = {
+                    "url": url,
+                    "fetched_at": fetched_at,
+                    "digest": digest,
+                    "media_type": stored_type,
+                    "segment": segment,
+                    "offset": offset,
+                    "length": length
+                }
+                with open(self._index_path(), "a", encoding="utf-8") as index_file:
+                    # Bytes não lidos aqui só podem ser uma linha truncada por queda: encerrá-la
+                    prefix = "\n" if index_file.tell() > self._index_offset else ""
+                    index_file.write(prefix + json.dumps(entry, ensure_ascii=False) + "\n")
+                    self._index_offset = index_file.tell()
+            self._by_url.setdefault(url, []).append((fetched_at, digest))
+
+        return digest
+
+    def get(self, digest: str) -> Tuple[bytes, str]:
+        """Corpo descomprimido e tipo de mídia de uma referência"""
+        with self._lock:
+            location = self._blobs.get(digest)
+            if location is None:
+                # Pode ter sido gravada por outro processo depois da última leitura do índice
+                self._refresh_index()
+                location = self._blobs.get(digest)
+            if location is None:
+                raise KeyError(f"Referência não encontrada no arquivo: {digest}")
+
+            # Cópia dos bytes com o lock: outra thread pode refazer (fechar) o mmap
+            segment, offset, length, media_type = location
+            data = self._map(segment, offset + length)[offset:offset + length]
+
+        return zlib.decompress(data), media_type
+
+    def get_text(self, digest: str) -> Tuple[str, str]:
+        body, media_type = self.get(digest)
+        return body.decode("utf-8", errors="replace"), media_type
+
+    def history(self, url: str) -> List[Dict]:
+        """Coletas arquivadas de uma URL, da mais antiga para a mais recente"""
+        with self._lock:
+            self._refresh_index()
+            return [
+                {"fetched_at": fetched_at, "digest": digest, "media_type": self._blobs[digest][3]}
+                for fetched_at, digest in sorted(self._by_url.get(url, []))
+            ]
+
+    def latest(self, url: str) -> Optional[str]:
+        with self._lock:
+            self._refresh_index()
+            history = self._by_url.get(url)
+            return max(history)[1] if history else None
+
+    def close(self):
+        with self._lock:
+            for view in self._maps.values():
+                view.close()
+            self._maps.clear()
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock exclusivo entre processos para as gravações"""
+        if fcntl is None:
+            yield
+            return
+
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _append_blob(self, digest: str, body: bytes, media_type: str) -> Tuple[int, int, int, str]:
+        # Chamado com o lock de arquivo
+        compressed = zlib.compress(body, settings.archive_compression_level)
+        header = f"ARC {digest} {media_type} {len(compressed)}\n".encode()
+
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(header) + len(compressed) > self.segment_max_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+
+        with open(path, "ab") as segment_file:
+            offset = segment_file.tell() + len(header)
+            segment_file.write(header + compressed + b"\n")
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+
+        return self._segment, offset, len(compressed), media_type
+
+    def _map(self, segment: int, min_size: int) -> mmap.mmap:
+        """mmap do segmento (chamado com o lock); refeito quando o arquivo cresceu depois do mapeamento"""
+        view = self._maps.get(segment)
+        if view is None or len(view) < min_size:
+            if view is not None:
+                view.close()
+            with open(self._segment_path(segment), "rb") as segment_file:
+                view = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = view
+        return view
+
+    def _refresh_index(self):
+        """Lê as linhas do índice gravadas desde a última leitura (chamado com o lock)"""
+        path = self._index_path()
+        if not os.path.exists(path) or os.path.getsize(path) <= self._index_offset:
+            return
+
+        with open(path, "rb") as index_file:
+            index_file.seek(self._index_offset)
+            for raw_line in index_file:
+                if not raw_line.endswith(b"\n"):
+                    # Linha ainda sendo gravada por outro processo: lida na próxima vez
+                    break
+                self._index_offset += len(raw_line)
+                line = raw_line.decode("utf-8", errors="replace")
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Linha truncada (queda durante a escrita)
+                    logger.warning(f"Linha inválida ignorada no índice do arquivo: {line[:80]}")
+                    continue
+                self._blobs.setdefault(entry["digest"], (
+                    entry["segment"], entry["offset"], entry["length"], entry["media_type"]
+                ))
+                self._by_url.setdefault(entry["url"], []).append((entry["fetched_at"], entry["digest"]))
+                self._segment = max(self._segment, entry["segment"])
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:05d}{SEGMENT_SUFFIX}")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE)
+
+_archive: Optional[PageArchive] = None
+
+def get_page_archive() -> Optional[PageArchive]:
+    """Arquivo compartilhado pelo processo (None se desabilitado)"""
+    global _archive
+
+    if not settings.archive_enabled:
+        return None
+    if _archive is None:
+        _archive = PageArchive()
+    return _archive
@@ -0,0 +1,189 @@
+"""
+Replay da extração de AUM a partir do conteúdo já salvo nos ScrapeLogs
+
+Reconstrói o scraped_data de cada empresa com os últimos logs de sucesso
+(um por URL) dentro da janela de frescor — páginas arquivadas são lidas do
+arquivo e limpas de novo a partir do HTML — e roda só as etapas de extração,
+sem acessar a rede. Útil para iterar em prompt, chunking e modelo; com
+dry_run os snapshots não são gravados e o relatório compara o resultado
+com o último snapshot existente.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.models.aum_snapshot import AUMSnapshot
+from app.models.company import Company
+from app.models.content_blob import ContentBlob, decompress_text
+from app.models.scrape_log import ScrapeLog
+from app.services.ai_extractor import AIExtractor
+from app.services.page_archive import get_page_archive
+from app.utils.text_processing import clean_html
+from app.utils.cpu_pool import run_cpu_bound
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ReplayPipeline:
+    """Reexecuta a extração sobre o conteúdo salvo, com alta concorrência"""
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        max_age_hours: int = None,
+        concurrency: int = None,
+        session_factory=AsyncSessionLocal,
+        extractor: AIExtractor = None
+    ):
+        self.dry_run = dry_run
+        self.max_age_hours = settings.replay_max_age_hours if max_age_hours is None else max_age_hours
+        self.concurrency = settings.replay_concurrency if concurrency is None else concurrency
+        self.session_factory = session_factory
+        self.archive = get_page_archive()
+        # Replay sempre extrai do zero (sem carry forward) e não recontabiliza as fontes
+        self.extractor = extractor or AIExtractor(
+            persist=not dry_run, record_source_yield=False, incremental=False
+        )
+
+    async def load_scraped_data(
+        self,
+        db: AsyncSession,
+        company_ids: Optional[List[int]] = None
+    ) -> Dict[int, List[Dict]]:
+        """scraped_data por empresa: o log de sucesso mais recente de cada URL na janela"""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self.max_age_hours)
+
+        query = (
+            select(
+                ScrapeLog.company_id, ScrapeLog.url, ScrapeLog.content_type,
+                ContentBlob.data, ScrapeLog.archive_ref
+            )
+            .outerjoin(ContentBlob, ContentBlob.hash == ScrapeLog.scraped_content_hash)
+            .where(
+                ScrapeLog.status == "success",
+                or_(ScrapeLog.scraped_content_hash.isnot(None), ScrapeLog.archive_ref.isnot(None)),
+                ScrapeLog.scraped_at >= cutoff
+            )
+            .order_by(ScrapeLog.scraped_at.desc(), ScrapeLog.id.desc())
+        )
+        if company_ids:
+            query = query.where(ScrapeLog.company_id.in_(company_ids))
+
+        scraped: Dict[int, List[Dict]] = {}
+        seen = set()
+        for row in await db.execute(query):
+            if (row.company_id, row.url) in seen:
+                continue
+            seen.add((row.company_id, row.url))
+
+            if row.data is not None:
+                content = decompress_text(row.data)
+            else:
+                content = await self._load_archived(row.url, row.archive_ref)
+                if content is None:
+                    continue
+
+            scraped.setdefault(row.company_id, []).append({
+                "content_type": row.content_type,
+                "url": row.url,
+                "content": content,
+                "status": "success"
+            })
+
+        return scraped
+
+    async def run(self, company_ids: Optional[List[int]] = None) -> Dict:
+        """Executa o replay e retorna o relatório comparativo"""
+        async with self.session_factory() as db:
+            scraped = await self.load_scraped_data(db, company_ids)
+            companies = (await db.execute(
+                select(Company).where(Company.id.in_(list(scraped)))
+            )).scalars().all()
+            previous = await self._latest_snapshots(db, [company.id for company in companies])
+
+        logger.info(
+            f"Replay de {len(companies)} empresas (janela de {self.max_age_hours}h, "
+            f"{'simulação' if self.dry_run else 'gravando snapshots'})"
+        )
+
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def replay(company: Company) -> Dict:
+            async with semaphore:
+                return await self._replay_company(company, scraped[company.id], previous.get(company.id))
+
+        results = await asyncio.gather(*(replay(company) for company in companies))
+
+        return {
+            "dry_run": self.dry_run,
+            "max_age_hours": self.max_age_hours,
+            "companies": len(results),
+            "changed": sum(1 for result in results if result["changed"]),
+            "found": sum(1 for result in results if result["replayed_aum"] != "NAO_DISPONIVEL"),
+            "failed": sum(1 for result in results if result.get("error")),
+            "results": sorted(results, key=lambda result: result["company_id"])
+        }
+
+    async def _replay_company(
+        self,
+        company: Company,
+        scraped_data: List[Dict],
+        previous: Optional[AUMSnapshot]
+    ) -> Dict:
+        """Extração de uma empresa em sessão própria, comparada ao snapshot anterior"""
+        result = {
+            "company_id": company.id,
+            "company_name": company.name,
+            "sources": len(scraped_data),
+            "previous_aum": previous.aum_raw_text if previous else None,
+            "previous_normalized": previous.aum_normalized if previous else None
+        }
+
+        try:
+            async with self.session_factory() as db:
+                snapshot = await self.extractor.extract_aum_from_content(company, scraped_data, db)
+            result["replayed_aum"] = snapshot.aum_raw_text
+            result["replayed_normalized"] = snapshot.aum_normalized
+        except Exception as e:
+            logger.error(f"Erro no replay de {company.name}: {str(e)}")
+            result.update(replayed_aum="NAO_DISPONIVEL", replayed_normalized=None, error=str(e))
+
+        result["changed"] = (
+            result["previous_aum"] != result["replayed_aum"]
+            and result["previous_normalized"] != result["replayed_normalized"]
+        )
+        return result
+
+    async def _load_archived(self, url: str, archive_ref: str) -> Optional[str]:
+        """Texto da página arquivada, limpo de novo a partir do HTML bruto"""
+        if self.archive is None:
+            logger.warning(f"Arquivo de páginas desabilitado, pulando {url}")
+            return None
+
+        try:
+            body, media_type = self.archive.get_text(archive_ref)
+        except KeyError:
+            logger.warning(f"Página de {url} não encontrada no arquivo ({archive_ref})")
+            return None
+
+        if media_type == "text/html":
+            return await run_cpu_bound(clean_html, body, size=len(body))
+        return body
+
+    async def _latest_snapshots(self, db: AsyncSession, company_ids: List[int]) -> Dict[int, AUMSnapshot]:
+        """Último snapshot de cada empresa (antes do replay)"""
+        latest: Dict[int, AUMSnapshot] = {}
+        if not company_ids:
+            return latest
+
+        result = await db.execute(
+            select(AUMSnapshot)
+            .where(AUMSnapshot.company_id.in_(company_ids))
+            .order_by(AUMSnapshot.company_id, AUMSnapshot.id.desc())
+        )
+        for snapshot in result.scalars():
+            latest.setdefault(snapshot.company_id, snapshot)
+        return latest
@@ -0,0 +1,175 @@
+"""
+Retry com backoff exponencial e circuit breaker por domínio para os fetches
+"""
+import asyncio
+import random
+import socket
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import aiohttp
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status que indicam bloqueio/rate limit pelo servidor
+BLOCKING_STATUS = {403, 429}
+
+# Status que valem uma nova tentativa
+TRANSIENT_STATUS = {408, 425, 500, 502, 503, 504}
+
+# Página inexistente: o servidor respondeu, não indica domínio com problema
+MISSING_STATUS = {404, 410}
+
+class FetchStatusError(Exception):
+    """Resposta HTTP com status de erro (usado no caminho do Playwright)"""
+    def __init__(self, status: int, url: str):
+        self.status = status
+        self.url = url
+        super().__init__(f"Status {status} para {url}")
+
+class CircuitOpenError(Exception):
+    """Domínio com circuito aberto: requisição nem é enviada"""
+    def __init__(self, domain: str):
+        self.domain = domain
+        super().__init__(f"Circuit breaker aberto para {domain}")
+
+def get_http_status(exc: BaseException) -> Optional[int]:
+    """Extrai o status HTTP de uma exceção de fetch, se houver"""
+    if isinstance(exc, (aiohttp.ClientResponseError, FetchStatusError)):
+        return exc.status
+    return None
+
+def is_blocking_error(exc: BaseException) -> bool:
+    """Servidor recusou ativamente (403/429) ou circuito já aberto"""
+    return isinstance(exc, CircuitOpenError) or get_http_status(exc) in BLOCKING_STATUS
+
+def is_missing_page(exc: BaseException) -> bool:
+    """Servidor respondeu que a página não existe (404/410)"""
+    return get_http_status(exc) in MISSING_STATUS
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Erros temporários que valem nova tentativa"""
+    status = get_http_status(exc)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+
+    # Falha de DNS não se resolve tentando de novo
+    if isinstance(exc, aiohttp.ClientConnectorError) and isinstance(exc.os_error, socket.gaierror):
+        return False
+
+    if isinstance(exc, (asyncio.TimeoutError, aiohttp.ServerDisconnectedError, aiohttp.ClientConnectionError)):
+        return True
+
+    # playwright.async_api.TimeoutError
+    return type(exc).__name__ == "TimeoutError"
+
+async def retry_with_backoff(
+    func: Callable[[], Awaitable[T]],
+    attempts: int = None,
+    base_delay: float = None,
+    max_delay: float = None,
+    should_retry: Callable[[BaseException], bool] = is_transient_error
+) -> T:
+    """Executa func com retries e backoff exponencial com jitter (full jitter)"""
+    attempts = attempts or settings.fetch_retry_attempts
+    base_delay = settings.fetch_retry_base_delay if base_delay is None else base_delay
+    max_delay = settings.fetch_retry_max_delay if max_delay is None else max_delay
+
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt == attempts - 1 or not should_retry(e):
+                raise
+
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            logger.warning(
+                f"Tentativa {attempt + 1}/{attempts} falhou ({str(e) or type(e).__name__}), "
+                f"nova tentativa em {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+@dataclass
+class _DomainCircuit:
+    failures: int = 0
+    blocks: int = 0
+    opened_at: Optional[float] = None
+    half_open_trial: bool = False
+
+class CircuitBreaker:
+    """
+    Circuit breaker por domínio
+
+    Abre após failure_threshold falhas consecutivas ou block_threshold
+    respostas 403/429; depois de reset_timeout segundos deixa passar uma
+    requisição de teste (half-open) que fecha ou reabre o circuito.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = None,
+        block_threshold: int = None,
+        reset_timeout: float = None
+    ):
+        self.failure_threshold = failure_threshold or settings.circuit_failure_threshold
+        self.block_threshold = block_threshold or settings.circuit_block_threshold
+        self.reset_timeout = settings.circuit_reset_seconds if reset_timeout is None else reset_timeout
+        self._circuits: Dict[str, _DomainCircuit] = {}
+
+    def allow_request(self, domain: str) -> bool:
+        """Indica se uma requisição para o domínio pode ser enviada"""
+        circuit = self._circuits.get(domain)
+        if circuit is None or circuit.opened_at is None:
+            return True
+
+        if time.monotonic() - circuit.opened_at < self.reset_timeout:
+            return False
+
+        # Half-open: apenas uma requisição de teste por vez
+        if circuit.half_open_trial:
+            return False
+        circuit.half_open_trial = True
+        return True
+
+    def record_success(self, domain: str):
+        """Fecha o circuito do domínio"""
+        self._circuits.pop(domain, None)
+
+    def record_failure(self, domain: str, blocked: bool = False):
+        """Registra falha; abre o circuito quando atinge o limite"""
+        circuit = self._circuits.setdefault(domain, _DomainCircuit())
+
+        if blocked:
+            circuit.blocks += 1
+        else:
+            circuit.failures += 1
+
+        reopen = circuit.half_open_trial
+        if reopen or circuit.failures >= self.failure_threshold or circuit.blocks >= self.block_threshold:
+            if circuit.opened_at is None or reopen:
+                logger.warning(
+                    f"Circuit breaker aberto para {domain} "
+                    f"({circuit.failures} falhas, {circuit.blocks} bloqueios)"
+                )
+            circuit.opened_at = time.monotonic()
+            circuit.half_open_trial = False
+
+    def release_trial(self, domain: str):
+        """
+        Libera a requisição de teste do half-open se ela terminou sem registrar
+        sucesso ou falha (ex.: cancelada), para o domínio não ficar bloqueado
+        """
+        circuit = self._circuits.get(domain)
+        if circuit is not None:
+            circuit.half_open_trial = False
+
+    def is_open(self, domain: str) -> bool:
+        circuit = self._circuits.get(domain)
+        return circuit is not None and circuit.opened_at is not None
+
+# Compartilhado pelo processo: WebScraper é instanciado por requisição
+domain_circuit_breaker = CircuitBreaker()
@@ -1,25 +1,68 @@
 import asyncio
 import aiohttp
-from playwright.async_api import async_playwright, Browser, Page
-from bs4 import BeautifulSoup
-from typing import Optional, Dict, List
+from playwright.async_api import async_playwright, Page
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.scrape_log import ScrapeLog
 from app.models.company import Company
 from app.services.news_scraper import NewsScaper  # Nova importação
+from app.services.fetch_strategy import (
+    FetchStrategyStore, get_domain, looks_like_js_shell,
+    STRATEGY_HTTP, STRATEGY_BROWSER
+)
+from app.services.resilience import (
+    domain_circuit_breaker, retry_with_backoff, is_blocking_error, is_missing_page,
+    CircuitOpenError, FetchStatusError
+)
+from app.services.url_validator import NegativeURLCache, dead_url_reason
+from app.services.site_crawler import SiteCrawler
+from app.services.source_planner import SourcePlanner, SourceYieldTracker, has_enough_evidence
+from app.services.page_archive import get_page_archive
 from app.core.config import settings
+from app.utils.text_processing import clean_html, aum_evidence_score
+from app.utils.cpu_pool import run_cpu_bound
+from app.utils.http_reader import read_html_capped
+from urllib.parse import urlparse
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+# Recursos que não contribuem para o texto da página (Playwright)
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+
+# Domínios de analytics/trackers de terceiros
+BLOCKED_TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "hotjar.com", "clarity.ms",
+    "segment.io", "mixpanel.com", "nr-data.net", "taboola.com", "outbrain.com",
+    "scorecardresearch.com", "analytics.tiktok.com", "ads-twitter.com"
+)
+
+def should_block_request(resource_type: str, url: str) -> bool:
+    """Decide se uma requisição do navegador deve ser abortada"""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in BLOCKED_TRACKER_DOMAINS)
+
 class WebScraper:
     def __init__(self):
         self.max_concurrent = settings.max_concurrent_requests
         self.request_delay = settings.request_delay
         self.timeout = 30
+        self.max_response_bytes = settings.max_response_bytes
+        self.ready_timeout = settings.playwright_ready_timeout_ms / 1000
+        self.ready_poll_interval = settings.playwright_ready_poll_ms / 1000
         self.semaphore = asyncio.Semaphore(self.max_concurrent)
         self.news_scraper = NewsScaper()  # Adicionar news scraper
+        self.strategy_store = FetchStrategyStore()
+        self.circuit_breaker = domain_circuit_breaker
+        self.negative_cache = NegativeURLCache()
+        self.source_planner = SourcePlanner()
+        self.yield_tracker = SourceYieldTracker()
+        self.archive = get_page_archive()
     
     async def scrape_company_urls(
         self, 
@@ -28,109 +71,347 @@ class WebScraper:
         use_playwright: bool = False,
         include_news: bool = True  # Novo parâmetro
     ) -> List[Dict]:
-        """Scrapa todas as URLs de uma empresa + notícias"""
+        """
+        Scrapa as URLs de uma empresa + notícias, na ordem de rendimento
+        histórico das fontes, parando quando já há evidência forte de AUM
+        """
         results = []
         
         # URLs tradicionais da empresa
-        urls_to_scrape = [
-            ("site", company.url_site),
-            ("linkedin", company.url_linkedin),
-            ("instagram", company.url_instagram),
-            ("x", company.url_x)
-        ]
+        urls_to_scrape = {
+            "site": company.url_site,
+            "linkedin": company.url_linkedin,
+            "instagram": company.url_instagram,
+            "x": company.url_x
+        }
         
         # Filtrar URLs válidas
-        valid_urls = [(content_type, url) for content_type, url in urls_to_scrape 
-                     if url and url.strip() and url.startswith(('http://', 'https://'))]
-        
-        # Scraping das URLs da empresa
-        for content_type, url in valid_urls:
-            async with self.semaphore:
-                try:
-                    if use_playwright or content_type in ['instagram', 'x']:
-                        content = await self._scrape_with_playwright(url)
-                    else:
-                        content = await self._scrape_with_requests(url)
-                    
-                    # Salvar log de sucesso
-                    scrape_log = ScrapeLog(
-                        company_id=company.id,
-                        url=url,
-                        status="success",
-                        content_type=content_type,
-                        scraped_content=content[:10000]  # Limitar tamanho
-                    )
-                    
-                    db.add(scrape_log)
-                    results.append({
-                        "content_type": content_type,
-                        "url": url,
-                        "content": content,
-                        "status": "success"
-                    })
-                    
-                    logger.info(f"Scraping bem-sucedido: {url}")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Erro ao fazer scraping de {url}: {error_msg}")
-                    
-                    # Salvar log de erro
-                    scrape_log = ScrapeLog(
-                        company_id=company.id,
-                        url=url,
-                        status="failed",
-                        content_type=content_type,
-                        error_message=error_msg
+        valid_urls = {content_type: url for content_type, url in urls_to_scrape.items()
+                      if url and url.strip() and url.startswith(('http://', 'https://'))}
+        
+        # Pular URLs sabidamente mortas (cache negativo)
+        dead_urls = await self.negative_cache.get_dead_urls(db, valid_urls.values())
+        if dead_urls:
+            logger.info(f"Pulando {len(dead_urls)} URLs inválidas em cache para {company.name}")
+            valid_urls = {content_type: url for content_type, url in valid_urls.items()
+                          if url not in dead_urls}
+        
+        source_order = await self.source_planner.get_source_order(db)
+        low_yield = [content_type for content_type in valid_urls if content_type not in source_order]
+        if low_yield:
+            logger.info(f"Pulando fontes de baixo rendimento para {company.name}: {low_yield}")
+        
+        best_evidence = 0.0
+        
+        for position, content_type in enumerate(source_order):
+            if content_type == "news":
+                if not include_news:
+                    continue
+                source_results = await self._scrape_news(company, db)
+            elif content_type in valid_urls:
+                source_results = await self._scrape_source(
+                    company, content_type, valid_urls[content_type], db, use_playwright
+                )
+            else:
+                continue
+            
+            results.extend(source_results)
+            
+            # Checagem barata: valor monetário perto de termos de AUM
+            for result in source_results:
+                if result["status"] == "success":
+                    best_evidence = max(best_evidence, aum_evidence_score(result["content"]))
+            
+            if has_enough_evidence(best_evidence):
+                skipped = [remaining for remaining in source_order[position + 1:]
+                           if remaining in valid_urls or (remaining == "news" and include_news)]
+                if skipped:
+                    logger.info(
+                        f"Evidência forte de AUM para {company.name} em {content_type}, "
+                        f"pulando fontes: {skipped}"
                     )
-                    
-                    db.add(scrape_log)
-                    results.append({
-                        "content_type": content_type,
-                        "url": url,
-                        "content": None,
-                        "status": "failed",
-                        "error": error_msg
-                    })
-                
-                # Delay entre requests
-                await asyncio.sleep(self.request_delay)
-        
-        # NOVO: Buscar notícias sobre a empresa
-        if include_news:
+                break
+        
+        await db.commit()
+        return results
+    
+    async def _scrape_source(
+        self,
+        company: Company,
+        content_type: str,
+        url: str,
+        db: AsyncSession,
+        use_playwright: bool = False
+    ) -> List[Dict]:
+        """Scrapa uma URL da empresa (e o crawl do site, se for o caso)"""
+        results = []
+        
+        async with self.semaphore:
+            started = time.monotonic()
             try:
-                logger.info(f"Buscando notícias sobre {company.name}")
-                news_results = await self.news_scraper.search_company_news(company.name)
-                
-                for news in news_results:
-                    # Salvar log de notícia
-                    scrape_log = ScrapeLog(
-                        company_id=company.id,
-                        url=news["url"],
-                        status="success",
-                        content_type="news",
-                        scraped_content=news["content"][:10000]
-                    )
-                    
-                    db.add(scrape_log)
-                    results.append({
-                        "content_type": "news",
-                        "url": news["url"],
-                        "content": news["content"],
-                        "status": "success",
-                        "source": news.get("site", "Notícias")
-                    })
-                
-                logger.info(f"Encontradas {len(news_results)} notícias para {company.name}")
+                content, html = await self._fetch_with_resilience(url, db, use_playwright)
+                
+                # Salvar log de sucesso
+                scrape_log = ScrapeLog(
+                    company_id=company.id,
+                    url=url,
+                    status="success",
+                    content_type=content_type,
+                    **await self._stored_content(url, content, html)
+                )
+                
+                db.add(scrape_log)
+                results.append({
+                    "content_type": content_type,
+                    "url": url,
+                    "content": content,
+                    "status": "success"
+                })
+                
+                logger.info(f"Scraping bem-sucedido: {url}")
+                
+                # Home sem AUM: procurar páginas institucionais no site
+                if content_type == "site" and html:
+                    results.extend(await self._crawl_site(company, url, content, html, db))
+                
+                await self.yield_tracker.record_fetch(
+                    db, content_type, True, time.monotonic() - started,
+                    sum(len(result["content"] or "") for result in results)
+                )
+                
+            except Exception as e:
+                error_msg = str(e) or type(e).__name__
+                logger.error(f"Erro ao fazer scraping de {url}: {error_msg}")
+                
+                # 403/429 ou circuito aberto contam como bloqueio
+                status = "blocked" if is_blocking_error(e) else "failed"
+                
+                # DNS inexistente ou 404/410: não tentar de novo até o TTL
+                dead_reason = dead_url_reason(e)
+                if dead_reason:
+                    await self.negative_cache.mark_dead(db, url, dead_reason)
                 
+                # Salvar log de erro
+                scrape_log = ScrapeLog(
+                    company_id=company.id,
+                    url=url,
+                    status=status,
+                    content_type=content_type,
+                    error_message=error_msg
+                )
+                
+                db.add(scrape_log)
+                results.append({
+                    "content_type": content_type,
+                    "url": url,
+                    "content": None,
+                    "status": status,
+                    "error": error_msg
+                })
+                
+                # Nenhuma requisição foi feita, não precisa de delay
+                if isinstance(e, CircuitOpenError):
+                    return results
+                
+                await self.yield_tracker.record_fetch(db, content_type, False, time.monotonic() - started)
+            
+            # Delay entre requests
+            await asyncio.sleep(self.request_delay)
+        
+        return results
+    
+    async def _stored_content(self, url: str, content: str, html: str = None) -> Dict:
+        """
+        Campos de conteúdo do ScrapeLog: a página bruta vai para o arquivo e o
+        log guarda a referência e o tamanho; sem arquivo, o texto truncado fica no log
+        """
+        content_size = len(content or "")
+        if self.archive is not None:
+            body, media_type = (html, "text/html") if html else (content or "", "text/plain")
+            try:
+                archive_ref = await asyncio.to_thread(self.archive.put, url, body.encode("utf-8"), media_type)
+                return {"archive_ref": archive_ref, "scraped_content": None, "content_size": content_size}
             except Exception as e:
-                logger.error(f"Erro ao buscar notícias para {company.name}: {str(e)}")
+                logger.warning(f"Falha ao arquivar {url}, guardando texto no log: {str(e)}")
+        
+        return {"scraped_content": (content or "")[:10000], "content_size": content_size}  # Limitar tamanho
+    
+    async def _scrape_news(self, company: Company, db: AsyncSession) -> List[Dict]:
+        """Busca notícias sobre a empresa"""
+        results = []
+        
+        started = time.monotonic()
+        try:
+            logger.info(f"Buscando notícias sobre {company.name}")
+            news_results = await self.news_scraper.search_company_news(company.name)
+            
+            for news in news_results:
+                # Salvar log de notícia
+                scrape_log = ScrapeLog(
+                    company_id=company.id,
+                    url=news["url"],
+                    status="success",
+                    content_type="news",
+                    **await self._stored_content(news["url"], news["content"], news.get("html"))
+                )
+                
+                db.add(scrape_log)
+                results.append({
+                    "content_type": "news",
+                    "url": news["url"],
+                    "content": news["content"],
+                    "status": "success",
+                    "source": news.get("site", "Notícias")
+                })
+            
+            logger.info(f"Encontradas {len(news_results)} notícias para {company.name}")
+            
+            await self.yield_tracker.record_fetch(
+                db, "news", bool(news_results), time.monotonic() - started,
+                sum(len(news["content"] or "") for news in news_results)
+            )
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar notícias para {company.name}: {str(e)}")
+            await self.yield_tracker.record_fetch(db, "news", False, time.monotonic() - started)
         
-        await db.commit()
         return results
     
-    async def _scrape_with_requests(self, url: str) -> str:
-        """Scraping com aiohttp para conteúdo estático"""
+    async def _fetch_with_resilience(
+        self,
+        url: str,
+        db: AsyncSession,
+        force_browser: bool = False
+    ) -> Tuple[str, Optional[str]]:
+        """Fetch com retries para erros transitórios e circuit breaker por domínio"""
+        return await self._with_resilience(url, lambda: self._fetch_adaptive(url, db, force_browser))
+    
+    async def _with_resilience(self, url: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa fetch com retries e sob o circuit breaker do domínio da URL"""
+        domain = get_domain(url)
+        
+        if not self.circuit_breaker.allow_request(domain):
+            raise CircuitOpenError(domain)
+        
+        try:
+            result = await retry_with_backoff(fetch)
+        except Exception as e:
+            if is_missing_page(e):
+                # O servidor respondeu: 404 não conta para abrir o circuito
+                self.circuit_breaker.record_success(domain)
+            else:
+                self.circuit_breaker.record_failure(domain, blocked=is_blocking_error(e))
+            raise
+        finally:
+            # Cancelamento (CancelledError) não passa pelo except acima
+            self.circuit_breaker.release_trial(domain)
+        
+        self.circuit_breaker.record_success(domain)
+        return result
+    
+    async def _fetch_adaptive(
+        self,
+        url: str,
+        db: AsyncSession,
+        force_browser: bool = False
+    ) -> Tuple[str, str]:
+        """
+        HTTP primeiro; escala para o navegador só quando a página é uma casca
+        de SPA. A estratégia vencedora fica registrada por domínio.
+        Retorna (texto limpo, HTML bruto).
+        """
+        domain = get_domain(url)
+        
+        if force_browser:
+            html = await self._render_with_playwright(url)
+            return await self._clean_html(html), html
+        
+        known_strategy = await self.strategy_store.get_strategy(db, domain)
+        if known_strategy == STRATEGY_BROWSER:
+            html = await self._render_with_playwright(url)
+            await self.strategy_store.record_result(db, domain, STRATEGY_BROWSER, probed=False)
+            return await self._clean_html(html), html
+        
+        html = await self._fetch_html(url)
+        content = await self._clean_html(html)
+        
+        if not looks_like_js_shell(html, content):
+            await self.strategy_store.record_result(db, domain, STRATEGY_HTTP)
+            return content, html
+        
+        if known_strategy == STRATEGY_HTTP:
+            # Navegador já não trouxe ganho neste domínio dentro do TTL (páginas
+            # curtas, telas de login): não abrir o Chromium a cada fetch
+            await self.strategy_store.record_result(db, domain, STRATEGY_HTTP, probed=False)
+            return content, html
+        
+        logger.info(f"Página parece depender de JavaScript, usando navegador: {url}")
+        try:
+            browser_html = await self._render_with_playwright(url)
+            browser_content = await self._clean_html(browser_html)
+        except Exception as e:
+            logger.warning(f"Navegador falhou para {url}, mantendo conteúdo HTTP: {str(e)}")
+            return content, html
+        
+        # Só vale o navegador se ele trouxe conteúdo significativamente maior
+        if len(browser_content) > len(content) * 1.5:
+            await self.strategy_store.record_result(db, domain, STRATEGY_BROWSER, escalated=True)
+            return browser_content, browser_html
+        
+        await self.strategy_store.record_result(db, domain, STRATEGY_HTTP, escalated=True)
+        return content, html
+    
+    async def _crawl_site(
+        self,
+        company: Company,
+        url: str,
+        content: str,
+        html: str,
+        db: AsyncSession
+    ) -> List[Dict]:
+        """Crawl das páginas internas quando a home não traz evidência forte de AUM"""
+        if not settings.site_crawl_enabled:
+            return []
+        
+        if aum_evidence_score(content) >= settings.aum_evidence_stop_score:
+            return []
+        
+        async def fetch(page_url: str, require_html: bool = True) -> str:
+            # Sitemap não é HTML: vai direto no aiohttp, mas sob o mesmo circuit breaker
+            if not require_html:
+                return await self._with_resilience(
+                    page_url, lambda: self._fetch_html(page_url, require_html=False)
+                )
+            _, page_html = await self._fetch_with_resilience(page_url, db)
+            return page_html
+        
+        crawler = SiteCrawler(fetch)
+        try:
+            pages = await crawler.crawl(url, html)
+        except Exception as e:
+            logger.error(f"Erro no crawl de {url}: {str(e)}")
+            return []
+        
+        results = []
+        for page in pages:
+            db.add(ScrapeLog(
+                company_id=company.id,
+                url=page["url"],
+                status="success",
+                content_type="site",
+                **await self._stored_content(page["url"], page["content"], page.get("html"))
+            ))
+            results.append({
+                "content_type": "site",
+                "url": page["url"],
+                "content": page["content"],
+                "status": "success"
+            })
+        
+        return results
+    
+    async def _fetch_html(self, url: str, require_html: bool = True) -> str:
+        """Busca o HTML bruto com aiohttp"""
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -145,15 +426,11 @@ class WebScraper:
             async with session.get(url) as response:
                 response.raise_for_status()
                 
-                content_type = response.headers.get('content-type', '').lower()
-                if 'text/html' not in content_type:
-                    raise ValueError(f"Conteúdo não é HTML: {content_type}")
-                
-                html = await response.text()
-                return self._clean_html(html)
+                # Valida Content-Type antes de ler e limita o tamanho do corpo
+                return await read_html_capped(response, self.max_response_bytes, require_html)
     
-    async def _scrape_with_playwright(self, url: str) -> str:
-        """Scraping com Playwright para conteúdo dinâmico"""
+    async def _render_with_playwright(self, url: str) -> str:
+        """Renderiza a página no Chromium e retorna o HTML final"""
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
             page = await browser.new_page()
@@ -163,34 +440,74 @@ class WebScraper:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             })
             
+            # Bloquear imagens, fontes, vídeos e trackers
+            await page.route("**/*", self._route_request)
+            
             try:
                 # Navegar para a página
-                await page.goto(url, wait_until='domcontentloaded', timeout=self.timeout * 1000)
+                response = await page.goto(url, wait_until='domcontentloaded', timeout=self.timeout * 1000)
+                if response is not None and response.status >= 400:
+                    raise FetchStatusError(response.status, url)
                 
-                # Aguardar um pouco para conteúdo dinâmico carregar
-                await page.wait_for_timeout(3000)
+                # Aguardar conteúdo dinâmico (rede ociosa ou texto estável)
+                await self._wait_until_ready(page)
                 
                 # Obter conteúdo HTML
-                html = await page.content()
-                
-                return self._clean_html(html)
+                return await page.content()
                 
             finally:
                 await browser.close()
     
-    def _clean_html(self, html: str) -> str:
-        """Limpa HTML e extrai texto relevante"""
-        soup = BeautifulSoup(html, 'html.parser')
+    async def _route_request(self, route):
+        """Aborta requisições de recursos que não são necessários para o texto"""
+        request = route.request
+        if should_block_request(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _wait_until_ready(self, page: Page):
+        """
+        Espera a página ficar pronta: rede ociosa ou comprimento do texto
+        estável entre duas leituras, limitado a ready_timeout
+        """
+        network_idle = asyncio.create_task(
+            page.wait_for_load_state('networkidle', timeout=self.ready_timeout * 1000)
+        )
+        text_stable = asyncio.create_task(self._wait_for_stable_text(page))
         
-        # Remover elementos desnecessários
-        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-            element.decompose()
+        done, pending = await asyncio.wait(
+            {network_idle, text_stable},
+            timeout=self.ready_timeout,
+            return_when=asyncio.FIRST_COMPLETED
+        )
         
-        # Extrair texto
-        text = soup.get_text(separator=' ', strip=True)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
         
-        # Limpeza básica
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        cleaned_text = ' '.join(lines)
+        # Timeout de networkidle não é erro: usamos o que já carregou
+        for task in done:
+            if not task.cancelled() and task.exception():
+                logger.debug(f"Espera de carregamento encerrada: {task.exception()}")
+    
+    async def _wait_for_stable_text(self, page: Page):
+        """Retorna quando o tamanho do texto visível para de mudar"""
+        last_length = -1
+        stable_reads = 0
         
-        return cleaned_text
\ No newline at end of file
+        while stable_reads < 2:
+            await asyncio.sleep(self.ready_poll_interval)
+            length = await page.evaluate(
+                "() => document.body ? document.body.innerText.length : 0"
+            )
+            
+            if length > 0 and length == last_length:
+                stable_reads += 1
+            else:
+                stable_reads = 0
+            last_length = length
+    
+    async def _clean_html(self, html: str) -> str:
+        """Limpa HTML e extrai texto relevante (no pool de processos se for grande)"""
+        return await run_cpu_bound(clean_html, html, size=len(html))
@@ -0,0 +1,75 @@
+"""
+Single-flight: chamadas concorrentes com a mesma chave compartilham uma única
+execução em andamento (ex: scraping + extração da mesma empresa)
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Registro das execuções em andamento por chave"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()  # Referência forte até terminar
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def start(self, key: Hashable) -> Tuple[asyncio.Future, bool]:
+        """
+        Retorna (future, dono). Se dono, quem chamou executa o trabalho e deve
+        chamar finish(); senão basta aguardar o future da execução existente.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            logger.info(f"Execução em andamento para {key}, aguardando resultado compartilhado")
+            return future, False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future, True
+
+    def finish(self, key: Hashable, result: Any = None, error: BaseException = None):
+        """Publica o resultado (ou erro) para quem aguarda e libera a chave"""
+        future = self._inflight.pop(key, None)
+        if future is None or future.done():
+            return
+
+        if error is not None:
+            future.set_exception(error)
+            # Sem ninguém aguardando, evita o aviso de exceção não lida
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Executa func() uma única vez por chave entre chamadas concorrentes
+
+        A execução roda numa task própria: se quem a iniciou for cancelado
+        (ex: cliente desconectou), os demais continuam recebendo o resultado.
+        """
+        future, owner = self.start(key)
+        if owner:
+            task = asyncio.ensure_future(func())
+            self._tasks.add(task)
+            task.add_done_callback(lambda done: self._finish_from_task(key, done))
+
+        return await asyncio.shield(future)
+
+    def _finish_from_task(self, key: Hashable, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.finish(key, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self.finish(key, error=task.exception())
+        else:
+            self.finish(key, result=task.result())
+
+# Compartilhado pelo processo: scraping + extração por company_id
+company_flight = SingleFlight()
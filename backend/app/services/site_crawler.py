@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import re
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+from urllib.parse import urljoin, urlparse, urldefrag
+from bs4 import BeautifulSoup
+from app.utils.text_processing import clean_html, aum_evidence_score
+from app.utils.cpu_pool import run_cpu_bound
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Palavras no texto do link ou no caminho que costumam levar à página com o AUM
+LINK_KEYWORDS = {
+    'quem-somos': 5, 'quem somos': 5, 'sobre': 4, 'institucional': 4, 'a-gestora': 4,
+    'a gestora': 4, 'about': 3, 'gestora': 3, 'nossa-historia': 3, 'historia': 2,
+    'empresa': 2, 'numeros': 3, 'números': 3, 'lamina': 3, 'lâmina': 3,
+    'fact-sheet': 3, 'factsheet': 3, 'relatorio': 2, 'relatório': 2, 'fundos': 2,
+    'investidores': 2, 'ri': 1, 'overview': 2, 'who-we-are': 4, 'patrimonio': 4,
+    'patrimônio': 4, 'aum': 4
+}
+
+# Caminhos que não vale a pena visitar
+SKIP_PATH_KEYWORDS = [
+    'login', 'signin', 'cadastro', 'trabalhe', 'carreira', 'vagas', 'contato',
+    'privacidade', 'privacy', 'cookies', 'termos', 'blog/page', 'wp-admin',
+    'ouvidoria', 'whatsapp', 'area-do-cliente'
+]
+
+SKIP_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.xlsx',
+    '.xls', '.doc', '.docx', '.mp4', '.mp3', '.css', '.js', '.xml'
+)
+
+_SITEMAP_LOC_PATTERN = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+
+def normalize_url(url: str) -> str:
+    """Remove fragmento e barra final para deduplicar URLs"""
+    url, _ = urldefrag(url)
+    return url.rstrip('/')
+
+def score_link(url: str, anchor_text: str = "") -> int:
+    """Prioridade de um link interno pela âncora e pelo caminho"""
+    path = urlparse(url).path.lower()
+    anchor = (anchor_text or "").lower()
+
+    if any(skip in path for skip in SKIP_PATH_KEYWORDS) or path.endswith(SKIP_EXTENSIONS):
+        return -1
+
+    score = 0
+    for keyword, weight in LINK_KEYWORDS.items():
+        if keyword in anchor:
+            score += weight
+        # Palavras curtas só contam como segmento inteiro do caminho
+        if (len(keyword) > 3 and keyword in path) or keyword in path.strip('/').split('/'):
+            score += weight
+
+    # Páginas rasas tendem a ser institucionais
+    depth = len([segment for segment in path.split('/') if segment])
+    return score - max(0, depth - 2)
+
+def extract_links(html: str, base_url: str) -> List[Tuple[str, str]]:
+    """Extrai links (url absoluta, texto da âncora) do mesmo host"""
+    soup = BeautifulSoup(html, 'html.parser')
+    base_host = (urlparse(base_url).hostname or "").lower().removeprefix("www.")
+    links = []
+
+    for anchor in soup.find_all('a', href=True):
+        href = anchor['href'].strip()
+        if not href or href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+            continue
+
+        url = urljoin(base_url, href)
+        parsed = urlparse(url)
+        host = (parsed.hostname or "").lower().removeprefix("www.")
+        if parsed.scheme not in ('http', 'https') or host != base_host:
+            continue
+
+        links.append((url, anchor.get_text(separator=' ', strip=True)[:100]))
+
+    return links
+
+def parse_page(html: str, base_url: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Texto limpo e links internos de uma página (executado no pool de CPU)"""
+    return clean_html(html), extract_links(html, base_url)
+
+class SiteCrawler:
+    """
+    Crawl limitado e priorizado no site da gestora em busca da página com o AUM
+
+    Os links internos e as URLs do sitemap.xml entram numa fila de prioridade
+    pontuada por âncora/caminho; o crawl respeita limites de páginas e de
+    profundidade e para assim que uma página tem evidência forte de AUM.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[..., Awaitable[str]],
+        max_pages: int = None,
+        max_depth: int = None,
+        stop_score: float = None,
+        delay: float = None
+    ):
+        # fetch(url, require_html=True) -> HTML/XML bruto
+        self.fetch = fetch
+        self.max_pages = settings.site_crawl_max_pages if max_pages is None else max_pages
+        self.max_depth = settings.site_crawl_max_depth if max_depth is None else max_depth
+        self.stop_score = settings.aum_evidence_stop_score if stop_score is None else stop_score
+        self.delay = settings.request_delay if delay is None else delay
+
+    async def crawl(self, start_url: str, start_html: str) -> List[Dict]:
+        """
+        Visita páginas internas a partir da home já baixada
+
+        Retorna as páginas visitadas (sem a home) com url, content, html
+        (bruto, para o arquivo de páginas) e score, na ordem de visita.
+        """
+        queued: Set[str] = {normalize_url(start_url)}
+        frontier: List[Tuple[int, int, str, int]] = []
+        sequence = 0
+
+        def enqueue(links: List[Tuple[str, str]], depth: int):
+            nonlocal sequence
+            if depth > self.max_depth:
+                return
+            for url, anchor in links:
+                key = normalize_url(url)
+                if key in queued:
+                    continue
+                priority = score_link(url, anchor)
+                if priority <= 0:
+                    continue
+                queued.add(key)
+                sequence += 1
+                heapq.heappush(frontier, (-priority, sequence, url, depth))
+
+        _, home_links = await run_cpu_bound(parse_page, start_html, start_url, size=len(start_html))
+        enqueue(home_links, 1)
+        enqueue([(url, "") for url in await self._sitemap_urls(start_url)], 1)
+
+        pages = []
+        while frontier and len(pages) < self.max_pages:
+            _, _, url, depth = heapq.heappop(frontier)
+
+            await asyncio.sleep(self.delay)
+            try:
+                html = await self.fetch(url)
+            except Exception as e:
+                logger.info(f"Crawl: falha em {url}: {str(e)}")
+                continue
+
+            text, links = await run_cpu_bound(parse_page, html, url, size=len(html))
+            score = aum_evidence_score(text)
+            pages.append({"url": url, "content": text, "html": html, "score": score, "depth": depth})
+
+            if score >= self.stop_score:
+                logger.info(f"Crawl: evidência forte de AUM em {url}, encerrando")
+                break
+
+            enqueue(links, depth + 1)
+
+        logger.info(f"Crawl de {start_url}: {len(pages)} páginas visitadas")
+        return pages
+
+    async def _sitemap_urls(self, start_url: str) -> List[str]:
+        """URLs do sitemap.xml (apenas as pontuadas como promissoras)"""
+        parsed = urlparse(start_url)
+        sitemap_url = f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"
+
+        try:
+            xml = await self.fetch(sitemap_url, require_html=False)
+        except Exception as e:
+            logger.debug(f"Sem sitemap em {sitemap_url}: {str(e)}")
+            return []
+
+        base_host = (parsed.hostname or "").lower().removeprefix("www.")
+        urls = []
+        for loc in _SITEMAP_LOC_PATTERN.findall(xml or "")[:500]:
+            host = (urlparse(loc).hostname or "").lower().removeprefix("www.")
+            if host == base_host and score_link(loc) > 0:
+                urls.append(loc)
+        return urls
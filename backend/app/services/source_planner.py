@@ -0,0 +1,153 @@
+import random
+import re
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Iterable, List, Optional
+from app.models.source_yield_stat import SourceYieldStat
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ordem padrão enquanto não há histórico suficiente
+DEFAULT_SOURCE_ORDER = ["site", "news", "linkedin", "x", "instagram"]
+
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)*')
+
+def find_answer_chunks(aum_text: str, chunks: List[str]) -> List[int]:
+    """
+    Índices dos trechos que contêm o número da resposta do modelo
+    (ex: "R$ 2,3 bi" casa com trechos que mencionam "2,3" ou "2.3")
+    """
+    match = _NUMBER_PATTERN.search(aum_text or "")
+    if not match:
+        return []
+
+    number = match.group(0)
+    variants = {number, number.replace(',', '#').replace('.', ',').replace('#', '.')}
+    patterns = [re.compile(r'(?<![\d.,])' + re.escape(variant) + r'(?![\d]|[.,]\d)') for variant in variants]
+
+    return [
+        index for index, chunk in enumerate(chunks)
+        if any(pattern.search(chunk) for pattern in patterns)
+    ]
+
+class SourceYieldTracker:
+    """Acumula custo (latência, bytes, tokens) e rendimento de AUM por content_type"""
+
+    async def record_fetch(
+        self,
+        db: AsyncSession,
+        content_type: str,
+        success: bool,
+        latency: float,
+        size: int = 0
+    ):
+        await self._increment(
+            db, content_type,
+            fetch_count=1,
+            success_count=1 if success else 0,
+            total_latency=latency,
+            total_bytes=size
+        )
+
+    async def record_extraction(
+        self,
+        db: AsyncSession,
+        tokens_by_type: Dict[str, int],
+        hit_types: Iterable[str]
+    ):
+        """Registra os tokens enviados por fonte e as fontes que continham o AUM"""
+        hit_types = set(hit_types)
+        for content_type in set(tokens_by_type) | hit_types:
+            await self._increment(
+                db, content_type,
+                aum_hits=1 if content_type in hit_types else 0,
+                total_tokens=tokens_by_type.get(content_type, 0)
+            )
+
+    async def _increment(self, db: AsyncSession, content_type: str, **deltas):
+        # UPDATE atômico: outras sessões podem estar somando na mesma linha
+        values = {
+            column: getattr(SourceYieldStat, column) + delta
+            for column, delta in deltas.items()
+        }
+        values["updated_at"] = datetime.now(timezone.utc)
+
+        statement = (
+            update(SourceYieldStat)
+            .where(SourceYieldStat.content_type == content_type)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(statement)
+        if result.rowcount:
+            return
+
+        try:
+            # Savepoint: outra sessão pode ter criado a linha
+            async with db.begin_nested():
+                db.add(SourceYieldStat(
+                    content_type=content_type,
+                    fetch_count=deltas.get("fetch_count", 0),
+                    success_count=deltas.get("success_count", 0),
+                    aum_hits=deltas.get("aum_hits", 0),
+                    total_latency=deltas.get("total_latency", 0.0),
+                    total_bytes=deltas.get("total_bytes", 0),
+                    total_tokens=deltas.get("total_tokens", 0),
+                    updated_at=datetime.now(timezone.utc)
+                ))
+        except IntegrityError:
+            await db.execute(statement)
+
+class SourcePlanner:
+    """
+    Define quais fontes buscar, e em que ordem, pelo rendimento histórico de
+    cada content_type: AUMs encontrados por segundo de fetch (source_yield_stats)
+    """
+
+    def __init__(self):
+        self.min_samples = settings.source_yield_min_samples
+        self.min_yield_per_second = settings.source_min_yield_per_second
+        self.explore_rate = settings.source_explore_rate
+        self._yields: Optional[Dict[str, float]] = None
+
+    async def get_source_order(self, db: AsyncSession) -> List[str]:
+        """
+        Fontes da mais para a menos produtiva; fontes com rendimento ruim ficam
+        de fora (exceto numa fração explore_rate das vezes)
+        """
+        if self._yields is None:
+            self._yields = await self._yield_per_second(db)
+            logger.info(f"Rendimento das fontes (AUM/s): {self._yields}")
+
+        order = sorted(
+            DEFAULT_SOURCE_ORDER,
+            key=lambda content_type: (
+                -self._yields.get(content_type, float("inf")),
+                DEFAULT_SOURCE_ORDER.index(content_type)
+            )
+        )
+
+        return [
+            content_type for content_type in order
+            if self._yields.get(content_type, float("inf")) >= self.min_yield_per_second
+            or random.random() < self.explore_rate
+        ]
+
+    async def _yield_per_second(self, db: AsyncSession) -> Dict[str, float]:
+        """AUMs por segundo de fetch; tipos com poucas amostras ficam de fora"""
+        result = await db.execute(
+            select(SourceYieldStat).where(SourceYieldStat.fetch_count >= self.min_samples)
+        )
+
+        return {
+            stat.content_type: (stat.aum_hits or 0) / max(stat.total_latency or 0.0, 1e-3)
+            for stat in result.scalars().all()
+        }
+
+def has_enough_evidence(best_score: float) -> bool:
+    """Evidência de AUM já coletada é suficiente para pular as fontes restantes"""
+    return settings.early_stop_enabled and best_score >= settings.aum_evidence_stop_score
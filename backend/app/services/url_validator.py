@@ -0,0 +1,230 @@
+import asyncio
+import socket
+import aiohttp
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from app.models.url_negative_cache import URLNegativeCache
+from app.services.resilience import get_http_status
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Status que indicam que a URL não existe
+DEAD_STATUS = {404, 410}
+
+# Servidores que recusam HEAD ou bloqueiam bots, mas a página existe
+ALIVE_BLOCKED_STATUS = {401, 403, 429, 999}
+
+# Erros de DNS que significam "o domínio não existe" (os demais podem ser passageiros)
+NXDOMAIN_ERRNOS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+# Falhas definitivas: só estas vão para o cache negativo ou justificam trocar uma URL
+DEFINITIVE_FAILURES = {"dns", "http_404", "http_410", "negative_cache"}
+
+def is_definitive_failure(reason: Optional[str]) -> bool:
+    return reason in DEFINITIVE_FAILURES
+
+def dead_url_reason(exc: BaseException) -> Optional[str]:
+    """Retorna o motivo se a exceção indica URL inexistente (DNS, 404/410)"""
+    if isinstance(exc, aiohttp.ClientConnectorError) and isinstance(exc.os_error, socket.gaierror):
+        return "dns" if exc.os_error.errno in NXDOMAIN_ERRNOS else None
+
+    status = get_http_status(exc)
+    if status in DEAD_STATUS:
+        return f"http_{status}"
+
+    return None
+
+class NegativeURLCache:
+    """URLs sabidamente mortas (DNS inexistente, 404/410), com TTL, persistidas em url_negative_cache"""
+
+    def __init__(self):
+        self.ttl = timedelta(hours=settings.url_negative_cache_ttl_hours)
+
+    async def get_dead_urls(self, db: AsyncSession, urls: Iterable[str]) -> Set[str]:
+        """Filtra as URLs que estão no cache negativo e ainda não expiraram"""
+        urls = [url for url in urls if url]
+        if not urls:
+            return set()
+
+        result = await db.execute(
+            select(URLNegativeCache.url).where(
+                URLNegativeCache.url.in_(urls),
+                URLNegativeCache.expires_at > datetime.now(timezone.utc)
+            )
+        )
+        return set(result.scalars().all())
+
+    async def is_dead(self, db: AsyncSession, url: str) -> bool:
+        return url in await self.get_dead_urls(db, [url])
+
+    async def mark_dead(self, db: AsyncSession, url: str, reason: str):
+        """Adiciona ou renova a URL no cache negativo"""
+        now = datetime.now(timezone.utc)
+
+        result = await db.execute(
+            select(URLNegativeCache).where(URLNegativeCache.url == url)
+        )
+        entry = result.scalar_one_or_none()
+
+        if entry is None:
+            try:
+                # Savepoint: outra sessão pode ter marcado a mesma URL
+                async with db.begin_nested():
+                    db.add(URLNegativeCache(
+                        url=url, reason=reason, checked_at=now, expires_at=now + self.ttl
+                    ))
+            except IntegrityError:
+                pass
+            return
+
+        entry.reason = reason
+        entry.checked_at = now
+        entry.expires_at = now + self.ttl
+
+    async def mark_alive(self, db: AsyncSession, url: str):
+        """Remove a URL do cache negativo"""
+        await db.execute(delete(URLNegativeCache).where(URLNegativeCache.url == url))
+
+class URLValidator:
+    """
+    Valida URLs candidatas concorrentemente (DNS + HEAD/GET com timeout curto)
+    e escolhe a primeira válida de cada lista de alternativas
+    """
+
+    def __init__(self):
+        self.timeout = settings.url_validation_timeout
+        self.semaphore = asyncio.Semaphore(settings.url_validation_concurrency)
+        self.negative_cache = NegativeURLCache()
+        self._dns_cache: Dict[str, bool] = {}
+
+    async def choose_urls(
+        self,
+        db: AsyncSession,
+        candidates: Dict[str, List[str]]
+    ) -> Dict[str, Optional[str]]:
+        """
+        Para cada tipo (site, linkedin, ...) retorna a primeira candidata válida,
+        na ordem de preferência. Candidatas mortas vão para o cache negativo.
+        """
+        chosen = await self.choose_urls_many(db, {None: candidates})
+        return chosen[None]
+
+    async def choose_urls_many(
+        self,
+        db: AsyncSession,
+        candidates_by_company: Dict[Any, Dict[str, List[str]]]
+    ) -> Dict[Any, Dict[str, Optional[str]]]:
+        """Versão em lote de choose_urls: todas as URLs são verificadas em paralelo"""
+        checks = await self.check_urls_cached(db, (
+            url
+            for candidates in candidates_by_company.values()
+            for urls in candidates.values()
+            for url in urls
+        ))
+
+        chosen = {}
+        for key, candidates in candidates_by_company.items():
+            chosen[key] = {
+                content_type: next(
+                    (url for url in urls if url and checks.get(url, (False, None))[0]),
+                    None
+                )
+                for content_type, urls in candidates.items()
+            }
+        return chosen
+
+    async def check_urls_cached(self, db: AsyncSession, urls: Iterable[str]) -> Dict[str, Tuple[bool, str]]:
+        """
+        Verifica URLs consultando e alimentando o cache negativo; só falhas
+        definitivas são cacheadas (timeouts e erros de conexão são refeitos)
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        known_dead = await self.negative_cache.get_dead_urls(db, urls)
+        to_check = [url for url in urls if url not in known_dead]
+
+        logger.info(
+            f"Validando {len(to_check)} URLs candidatas "
+            f"({len(known_dead)} já conhecidas como inválidas)"
+        )
+        checks = await self.check_urls(to_check)
+
+        for url, (alive, reason) in checks.items():
+            if not alive and is_definitive_failure(reason):
+                await self.negative_cache.mark_dead(db, url, reason)
+
+        checks.update({url: (False, "negative_cache") for url in known_dead})
+        return checks
+
+    async def check_urls(self, urls: List[str]) -> Dict[str, Tuple[bool, str]]:
+        """Verifica várias URLs em paralelo; retorna {url: (viva, motivo)}"""
+        if not urls:
+            return {}
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+
+        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+            results = await asyncio.gather(
+                *(self._check_url(session, url) for url in urls)
+            )
+
+        return dict(zip(urls, results))
+
+    async def _check_url(self, session: aiohttp.ClientSession, url: str) -> Tuple[bool, str]:
+        async with self.semaphore:
+            host = urlparse(url).hostname
+            resolves = await self._resolves(host) if host else False
+            if resolves is None:
+                return False, "dns_error"
+            if not resolves:
+                return False, "dns"
+
+            try:
+                async with session.head(url, allow_redirects=True) as response:
+                    status = response.status
+
+                # Alguns servidores não implementam HEAD
+                if status in (405, 501) or status >= 500:
+                    async with session.get(url, allow_redirects=True) as response:
+                        status = response.status
+
+            except asyncio.TimeoutError:
+                return False, "timeout"
+            except aiohttp.ClientError as e:
+                return False, dead_url_reason(e) or "connection_error"
+
+            if status < 400 or status in ALIVE_BLOCKED_STATUS:
+                return True, f"http_{status}"
+
+            return False, f"http_{status}"
+
+    async def _resolves(self, host: str) -> Optional[bool]:
+        """
+        Resolve o host via DNS (com cache por execução): False só para domínio
+        inexistente, None quando a resolução falhou por outro motivo
+        """
+        if host in self._dns_cache:
+            return self._dns_cache[host]
+
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(
+                loop.getaddrinfo(host, 443, type=socket.SOCK_STREAM),
+                timeout=self.timeout
+            )
+            resolves = True
+        except socket.gaierror as e:
+            resolves = False if e.errno in NXDOMAIN_ERRNOS else None
+        except (asyncio.TimeoutError, OSError):
+            resolves = None
+
+        self._dns_cache[host] = resolves
+        return resolves
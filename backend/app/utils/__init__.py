@@ -1,10 +1,11 @@
 # Utils package for AUM Scraper
-from .text_processing import extract_relevant_chunks, clean_text, count_tokens
+from .text_processing import extract_relevant_chunks, clean_text, clean_html, count_tokens
 from .unit_converter import convert_aum_to_float, format_currency, validate_aum_value
 
 __all__ = [
     "extract_relevant_chunks",
     "clean_text", 
+    "clean_html",
     "count_tokens",
     "convert_aum_to_float",
     "format_currency",
@@ -0,0 +1,67 @@
+"""
+Execução de tarefas CPU-bound (limpeza de HTML, chunking, contagem de tokens)
+fora do event loop, em um pool de processos
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from app.core.config import settings
+from app.utils import tokenizer
+import logging
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def get_cpu_executor() -> Optional[ProcessPoolExecutor]:
+    """Retorna o pool de processos compartilhado (None se desabilitado)"""
+    global _executor
+
+    if settings.cpu_pool_workers <= 0:
+        return None
+
+    if _executor is None:
+        # spawn evita herdar o event loop e threads do processo pai
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.cpu_pool_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=tokenizer.warm_up,
+            initargs=([settings.openai_model],)
+        )
+        logger.info(f"Pool de processos iniciado com {settings.cpu_pool_workers} workers")
+
+    return _executor
+
+async def run_cpu_bound(func: Callable, *args: Any, size: int = 0) -> Any:
+    """
+    Executa func(*args) no pool de processos quando a entrada é grande
+
+    Entradas menores que cpu_offload_threshold_chars rodam inline, já que o
+    custo de serializar para outro processo não compensa. func e args precisam
+    ser picklable (funções de módulo recebendo/retornando str, list, int).
+    """
+    if size < settings.cpu_offload_threshold_chars:
+        return func(*args)
+
+    executor = get_cpu_executor()
+    if executor is None:
+        return func(*args)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        # Worker morreu (ex: OOM); recriar o pool na próxima chamada e seguir inline
+        logger.error("Pool de processos quebrado, executando inline")
+        shutdown_cpu_pool(wait=False)
+        return func(*args)
+
+def shutdown_cpu_pool(wait: bool = True):
+    """Encerra o pool de processos (chamado no shutdown da aplicação)"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,91 @@
+"""
+Detecção de parágrafos quase duplicados (shingles de palavras + MinHash/LSH)
+"""
+import hashlib
+import re
+from typing import Dict, List, Set, Tuple
+
+# Primo de Mersenne 2^61 - 1 para as permutações (a*x + b) mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bandas de 4 linhas: pares com Jaccard ~0.5+ viram candidatos
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+def _permutations(count: int) -> List[Tuple[int, int]]:
+    # Coeficientes fixos: assinaturas comparáveis entre chamadas e processos
+    coefficients = []
+    for seed in range(count):
+        digest = hashlib.blake2b(f"minhash-{seed}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE_PRIME
+        coefficients.append((a, b))
+    return coefficients
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+def chunk_fingerprint(text: str) -> str:
+    """Hash de um trecho normalizado (caixa e espaços não importam)"""
+    normalized = " ".join(_WORD_PATTERN.findall((text or "").lower()))
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+def shingles(text: str, k: int = 5) -> Set[int]:
+    """Conjunto de k-shingles de palavras (normalizadas), como hashes de 64 bits"""
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if not words:
+        return set()
+
+    k = min(k, len(words))
+    return {
+        int.from_bytes(
+            hashlib.blake2b(" ".join(words[i:i + k]).encode(), digest_size=8).digest(), "big"
+        )
+        for i in range(len(words) - k + 1)
+    }
+
+def minhash_signature(shingle_set: Set[int]) -> Tuple[int, ...]:
+    """Assinatura MinHash do conjunto de shingles"""
+    if not shingle_set:
+        return tuple([_MERSENNE_PRIME] * NUM_PERMUTATIONS)
+
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME for value in shingle_set)
+        for a, b in _PERMUTATIONS
+    )
+
+def estimated_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Jaccard estimada pela fração de posições iguais nas assinaturas"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+def deduplicate_passages(passages: List[str], threshold: float = 0.8) -> List[int]:
+    """
+    Índices dos trechos mantidos: de cada grupo de quase duplicados
+    (Jaccard estimada >= threshold) fica só a primeira ocorrência
+    """
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    signatures: Dict[int, Tuple[int, ...]] = {}
+    kept = []
+
+    for index, passage in enumerate(passages):
+        shingle_set = shingles(passage)
+        if not shingle_set:
+            continue
+
+        signature = minhash_signature(shingle_set)
+        band_keys = [
+            (band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)
+        ]
+
+        # Só compara com trechos mantidos que caíram em alguma banda igual
+        candidates = {kept_index for key in band_keys for kept_index in buckets.get(key, [])}
+        if any(estimated_similarity(signature, signatures[other]) >= threshold for other in candidates):
+            continue
+
+        kept.append(index)
+        signatures[index] = signature
+        for key in band_keys:
+            buckets.setdefault(key, []).append(index)
+
+    return kept
@@ -0,0 +1,78 @@
+"""
+Leitura em streaming de respostas HTTP com limite de bytes
+"""
+import codecs
+import re
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+CHUNK_SIZE = 64 * 1024
+
+# <meta charset="..."> ou <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w\-]+)', re.IGNORECASE)
+
+def is_html_content_type(content_type: str) -> bool:
+    """Verifica se o Content-Type é de uma página HTML"""
+    content_type = (content_type or '').lower()
+    return any(html_type in content_type for html_type in HTML_CONTENT_TYPES)
+
+def _sniff_charset(first_chunk: bytes) -> Optional[str]:
+    """Procura declaração de charset nos primeiros bytes do HTML"""
+    match = _META_CHARSET_PATTERN.search(first_chunk[:4096])
+    if match:
+        return match.group(1).decode('ascii', errors='ignore')
+    return None
+
+def _get_decoder(encoding: Optional[str]):
+    """Cria decoder incremental, caindo para UTF-8 se o charset for desconhecido"""
+    try:
+        return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    except LookupError:
+        logger.warning(f"Charset desconhecido '{encoding}', usando utf-8")
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+async def read_html_capped(response, max_bytes: int, require_html: bool = True) -> str:
+    """
+    Lê o corpo de uma resposta aiohttp em chunks, decodificando incrementalmente
+
+    Aborta antes de ler o corpo se o Content-Type não for HTML e para de ler
+    ao atingir max_bytes, devolvendo o que foi lido até ali.
+    """
+    content_type = response.headers.get('content-type', '').lower()
+    if require_html and not is_html_content_type(content_type):
+        raise ValueError(f"Conteúdo não é HTML: {content_type}")
+
+    if response.content_length and response.content_length > max_bytes:
+        logger.info(
+            f"Resposta de {response.content_length} bytes em {response.url}, "
+            f"lendo apenas {max_bytes}"
+        )
+
+    decoder = None
+    parts = []
+    received = 0
+
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        if decoder is None:
+            decoder = _get_decoder(response.charset or _sniff_charset(chunk))
+
+        remaining = max_bytes - received
+        truncated = len(chunk) >= remaining
+        if truncated:
+            chunk = chunk[:remaining]
+
+        received += len(chunk)
+        parts.append(decoder.decode(chunk))
+
+        if truncated:
+            logger.info(f"Limite de {max_bytes} bytes atingido para {response.url}")
+            break
+
+    if decoder is not None:
+        parts.append(decoder.decode(b'', final=True))
+
+    return ''.join(parts)
@@ -1,11 +1,28 @@
+import math
 import re
 from typing import List, Tuple
 from bs4 import BeautifulSoup
-import tiktoken
+from app.utils import tokenizer
+
+def clean_html(html: str) -> str:
+    """Limpa HTML e extrai texto relevante"""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remover elementos desnecessários
+    for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
+        element.decompose()
+    
+    # Extrair texto
+    text = soup.get_text(separator=' ', strip=True)
+    
+    # Limpeza básica
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    
+    return ' '.join(lines)
 
 def extract_relevant_chunks(html: str, max_tokens: int = 1200) -> List[str]:
     """
-    Extrai apenas os parágrafos relevantes que podem conter informações de AUM
+    Extrai os trechos mais prováveis de conter o AUM, dentro de max_tokens
     """
     # Parse HTML
     soup = BeautifulSoup(html, 'html.parser')
@@ -14,57 +31,131 @@ def extract_relevant_chunks(html: str, max_tokens: int = 1200) -> List[str]:
     for script in soup(["script", "style", "nav", "header", "footer"]):
         script.decompose()
     
-    # Pega todo o texto
-    text = soup.get_text()
+    passages = split_passages(soup.get_text())
+    return [passages[index] for index in select_relevant_passages(passages, max_tokens)]
+
+def split_passages(text: str, max_words: int = 60) -> List[str]:
+    """
+    Divide o texto em trechos curtos (parágrafos, ou grupos de frases
+    quando o texto vem numa linha só) de até ~max_words palavras
+    """
+    passages = []
     
-    # Keywords para identificar conteúdo relevante
-    aum_keywords = [
-        'aum', 'assets under management', 'patrimônio sob gestão', 
-        'patrimônio', 'gestão', 'bilhões', 'milhões', 'bi', 'mi',
-        'r$', 'reais', 'usd', 'dólares', 'fundos', 'carteira'
-    ]
+    for block in (text or "").split('\n'):
+        block = block.strip()
+        if len(block) <= 20:
+            continue
+        
+        current: List[str] = []
+        for sentence in re.split(r'(?<=[.!?;])\s+', block):
+            words = sentence.split()
+            if current and len(current) + len(words) > max_words:
+                passages.append(' '.join(current))
+                current = []
+            current.extend(words)
+            
+            # Frase enorme (tabela, lista sem pontuação): corta em janelas
+            while len(current) > 2 * max_words:
+                passages.append(' '.join(current[:max_words]))
+                current = current[max_words:]
+        
+        if current:
+            passages.append(' '.join(current))
     
-    # Regex para valores monetários
-    money_pattern = r'[R$US$]?\s*\d+[,.]\d+\s*[bmk]?[iI]?[lhões]*'
+    return [passage for passage in passages if len(passage) > 20]
+
+# Separador entre trechos no prompt
+PASSAGE_SEPARATOR = "\n\n"
+
+# Consulta BM25: termos que aparecem em frases sobre AUM
+AUM_QUERY_TERMS = [
+    'patrimônio', 'patrimonio', 'sob', 'gestão', 'gestao', 'administração', 'aum',
+    'assets', 'under', 'management', 'ativos', 'recursos', 'bilhões', 'bilhoes',
+    'bilhão', 'bi', 'milhões', 'milhoes', 'mi', 'r$', 'us$', 'reais', 'fundos'
+]
+
+_WORD_PATTERN = re.compile(r'[\w$]+')
+
+# Pesos dos componentes do score de um trecho
+BM25_K1 = 1.2
+BM25_B = 0.75
+PROXIMITY_WEIGHT = 3.0
+MONEY_DENSITY_WEIGHT = 1.0
+
+def score_passages(passages: List[str]) -> List[float]:
+    """
+    Score de relevância para AUM de cada trecho: BM25 contra a consulta de
+    AUM (estatísticas do próprio documento), proximidade valor/termo de AUM
+    e densidade de valores monetários
+    """
+    if not passages:
+        return []
     
-    # Dividir em parágrafos
-    paragraphs = [p.strip() for p in text.split('\n') if len(p.strip()) > 20]
+    tokenized = [_WORD_PATTERN.findall(passage.lower()) for passage in passages]
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
     
-    relevant_chunks = []
+    # Termos presentes em quase todo trecho (ex: "gestão" num site de gestora) pesam pouco
+    document_frequency = {
+        term: sum(1 for tokens in tokenized if term in tokens) for term in AUM_QUERY_TERMS
+    }
+    idf = {
+        term: math.log(1 + (len(passages) - df + 0.5) / (df + 0.5))
+        for term, df in document_frequency.items()
+    }
     
-    for paragraph in paragraphs:
-        paragraph_lower = paragraph.lower()
+    scores = []
+    for passage, tokens in zip(passages, tokenized):
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / average_length)
+        bm25 = 0.0
+        for term in AUM_QUERY_TERMS:
+            frequency = tokens.count(term)
+            if frequency:
+                bm25 += idf[term] * frequency * (BM25_K1 + 1) / (frequency + length_norm)
         
-        # Verificar se contém keywords ou padrões monetários
-        has_keywords = any(keyword in paragraph_lower for keyword in aum_keywords)
-        has_money_pattern = re.search(money_pattern, paragraph)
+        money_count = len(AUM_MONEY_PATTERN.findall(passage))
+        money_density = money_count / max(1.0, len(tokens) / 50)
         
-        if has_keywords or has_money_pattern:
-            relevant_chunks.append(paragraph)
-    
-    # Se não encontrou nada relevante, pega os primeiros parágrafos
-    if not relevant_chunks:
-        relevant_chunks = paragraphs[:5]  # Primeiros 5 parágrafos
-    
-    # Limitar por tokens
-    encoding = tiktoken.get_encoding("cl100k_base")
-    final_chunks = []
-    total_tokens = 0
-    
-    for chunk in relevant_chunks:
-        chunk_tokens = len(encoding.encode(chunk))
-        if total_tokens + chunk_tokens <= max_tokens:
-            final_chunks.append(chunk)
-            total_tokens += chunk_tokens
-        else:
-            # Adicionar parcialmente se couber
-            remaining_tokens = max_tokens - total_tokens
-            if remaining_tokens > 50:  # Mínimo útil
-                truncated = encoding.decode(encoding.encode(chunk)[:remaining_tokens])
-                final_chunks.append(truncated + "...")
-            break
-    
-    return final_chunks
+        scores.append(
+            bm25
+            + PROXIMITY_WEIGHT * aum_evidence_score(passage)
+            + MONEY_DENSITY_WEIGHT * min(money_density, 3.0)
+        )
+    
+    return scores
+
+def select_relevant_passages(
+    passages: List[str],
+    max_tokens: int,
+    model: str = "gpt-4"
+) -> List[int]:
+    """
+    Índices (em ordem do documento) dos trechos de maior score que cabem
+    exatamente em max_tokens, contando o separador entre trechos
+    """
+    scores = score_passages(passages)
+    
+    candidates = [index for index, score in enumerate(scores) if score > 0]
+    if not candidates:
+        # Nada relevante: primeiros trechos como contexto
+        candidates = list(range(min(5, len(passages))))
+    candidates.sort(key=lambda index: (-scores[index], index))
+    
+    # Soma por trecho é um limite superior: juntar textos não cria tokens novos
+    separator_tokens = count_tokens(PASSAGE_SEPARATOR, model)
+    token_counts = dict(zip(
+        candidates,
+        tokenizer.count_tokens_batch([passages[index] for index in candidates], model)
+    ))
+    selected = []
+    used_tokens = 0
+    
+    for index in candidates:
+        cost = token_counts[index] + (separator_tokens if selected else 0)
+        if used_tokens + cost <= max_tokens:
+            selected.append(index)
+            used_tokens += cost
+    
+    return sorted(selected)
 
 def clean_text(text: str) -> str:
     """Limpa e normaliza texto"""
@@ -93,15 +184,61 @@ def extract_money_values(text: str) -> List[str]:
     
     return values
 
+# Termos que indicam explicitamente patrimônio sob gestão
+AUM_STRONG_KEYWORDS = [
+    'patrimônio sob gestão', 'patrimonio sob gestao', 'patrimônio sob administração',
+    'recursos sob gestão', 'ativos sob gestão', 'sob gestão', 'assets under management',
+    'aum', 'patrimônio líquido sob gestão', 'sob nossa gestão'
+]
+
+# Palavras inteiras: 'aum' não pode casar com "aumento", "aumentou"...
+AUM_KEYWORD_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(keyword) for keyword in AUM_STRONG_KEYWORDS) + r')\b',
+    re.IGNORECASE
+)
+
+# Valor monetário com unidade (R$ 2,5 bi, US$ 300 milhões, 12 bilhões de reais)
+AUM_MONEY_PATTERN = re.compile(
+    r'(?:(?:R\$|US\$|USD|BRL)\s*\d+(?:[.,]\d+)*\s*(?:bi|bilh[õo]es|bilh[ãa]o|mi|milh[õo]es|milh[ãa]o|tri|trilh[õo]es|billion|million)\b'
+    r'|\d+(?:[.,]\d+)*\s*(?:bilh[õo]es|bilh[ãa]o|milh[õo]es|milh[ãa]o)\s+de\s+(?:reais|d[óo]lares))',
+    re.IGNORECASE
+)
+
+def aum_evidence_score(text: str, window: int = 150) -> float:
+    """
+    Pontua (0 a 1) a evidência de AUM num texto: valor monetário perto de
+    termos de AUM vale 1.0; só valor monetário 0.3; só o termo 0.2
+    """
+    if not text:
+        return 0.0
+    
+    text_lower = text.lower()
+    has_keyword = AUM_KEYWORD_PATTERN.search(text_lower) is not None
+    
+    money_matches = list(AUM_MONEY_PATTERN.finditer(text))
+    if not money_matches:
+        return 0.2 if has_keyword else 0.0
+    
+    if has_keyword:
+        for match in money_matches:
+            context = text_lower[max(0, match.start() - window):match.end() + window]
+            if AUM_KEYWORD_PATTERN.search(context):
+                return 1.0
+    
+    return 0.3
+
+def aum_candidates(text: str, window: int = 150) -> List[str]:
+    """Valores monetários com unidade que aparecem perto de termos de AUM"""
+    text_lower = (text or "").lower()
+    candidates = []
+    
+    for match in AUM_MONEY_PATTERN.finditer(text or ""):
+        context = text_lower[max(0, match.start() - window):match.end() + window]
+        if AUM_KEYWORD_PATTERN.search(context):
+            candidates.append(match.group(0))
+    
+    return candidates
+
 def count_tokens(text: str, model: str = "gpt-4") -> int:
-    """Conta tokens usando tiktoken"""
-    try:
-        if model.startswith("gpt-4"):
-            encoding = tiktoken.get_encoding("cl100k_base")
-        else:
-            encoding = tiktoken.get_encoding("p50k_base")
-        
-        return len(encoding.encode(text))
-    except Exception:
-        # Fallback: estimativa aproximada
-        return len(text.split()) * 1.3
\ No newline at end of file
+    """Conta tokens usando o tokenizer com cache"""
+    return tokenizer.count_tokens(text, model)
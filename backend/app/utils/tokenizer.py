@@ -0,0 +1,139 @@
+"""
+Tokenização com encodings carregados uma vez e contagens memoizadas
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import tiktoken
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prefixo do modelo -> encoding (o mais específico primeiro)
+MODEL_ENCODINGS: List[Tuple[str, str]] = [
+    ("gpt-4o", "o200k_base"),
+    ("o1", "o200k_base"),
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+    ("text-embedding-3", "cl100k_base"),
+    ("text-embedding-ada", "cl100k_base"),
+    ("text-davinci", "p50k_base"),
+]
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Encoding alternativo quando a versão instalada do tiktoken não conhece o pedido
+ENCODING_FALLBACKS = {"o200k_base": "cl100k_base"}
+
+_encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+_encodings_lock = threading.Lock()
+
+_count_cache: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+def encoding_name_for_model(model: str) -> str:
+    """Nome do encoding usado pelo modelo"""
+    model = (model or "").lower()
+    for prefix, name in MODEL_ENCODINGS:
+        if model.startswith(prefix):
+            return name
+    return DEFAULT_ENCODING
+
+def get_encoding(model: str) -> Optional[tiktoken.Encoding]:
+    """
+    Encoding do modelo, carregado uma vez por processo; None se não puder
+    ser carregado (a falha também fica em cache, para não repetir o download)
+    """
+    name = encoding_name_for_model(model)
+    if name in _encodings:
+        return _encodings[name]
+
+    with _encodings_lock:
+        if name not in _encodings:
+            _encodings[name] = _load_encoding(name)
+        return _encodings[name]
+
+def _load_encoding(name: str) -> Optional[tiktoken.Encoding]:
+    for candidate in (name, ENCODING_FALLBACKS.get(name)):
+        if candidate is None:
+            continue
+        try:
+            return tiktoken.get_encoding(candidate)
+        except Exception as e:
+            logger.warning(f"Não foi possível carregar o encoding {candidate}: {str(e)}")
+    logger.warning(f"Usando estimativa de tokens por palavras no lugar de {name}")
+    return None
+
+def warm_up(models: Iterable[str]):
+    """Carrega os encodings dos modelos (chamado no startup e nos workers do pool)"""
+    for model in models:
+        get_encoding(model)
+
+def _estimate_tokens(text: str) -> int:
+    # Fallback: estimativa aproximada
+    return math.ceil(len(text.split()) * 1.3)
+
+def _cache_key(encoding_name: str, text: str) -> Tuple[str, bytes]:
+    return encoding_name, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def _cache_get(key: Tuple[str, bytes]) -> Optional[int]:
+    with _count_cache_lock:
+        count = _count_cache.get(key)
+        if count is not None:
+            _count_cache.move_to_end(key)
+        return count
+
+def _cache_put(key: Tuple[str, bytes], count: int):
+    with _count_cache_lock:
+        _count_cache[key] = count
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > settings.tokenizer_cache_size:
+            _count_cache.popitem(last=False)
+
+def encode(text: str, model: str = "gpt-4") -> List[int]:
+    """Tokens do texto (lista vazia se o encoding não estiver disponível)"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return []
+    return encoding.encode(text or "", disallowed_special=())
+
+def encode_batch(texts: List[str], model: str = "gpt-4") -> List[List[int]]:
+    """Tokeniza vários textos de uma vez (tiktoken paraleliza em threads)"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [[] for _ in texts]
+    return encoding.encode_batch([text or "" for text in texts], disallowed_special=())
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Número de tokens do texto, memoizado pelo hash do conteúdo"""
+    return count_tokens_batch([text], model)[0]
+
+def count_tokens_batch(texts: List[str], model: str = "gpt-4") -> List[int]:
+    """Contagem de tokens de vários textos; só os ausentes do cache são tokenizados"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [_estimate_tokens(text or "") for text in texts]
+
+    keys = [_cache_key(encoding.name, text or "") for text in texts]
+    counts = [_cache_get(key) for key in keys]
+
+    missing = [index for index, count in enumerate(counts) if count is None]
+    if missing:
+        missing_texts = [texts[index] or "" for index in missing]
+        if len(missing_texts) == 1:
+            encoded = [encoding.encode(missing_texts[0], disallowed_special=())]
+        else:
+            encoded = encoding.encode_batch(missing_texts, disallowed_special=())
+        for index, tokens in zip(missing, encoded):
+            counts[index] = len(tokens)
+            _cache_put(keys[index], len(tokens))
+
+    return counts
+
+def clear_cache():
+    """Esvazia o cache de contagens"""
+    with _count_cache_lock:
+        _count_cache.clear()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
-Script para criar a migração inicial do banco de dados
-Execute este script para gerar a primeira migração do Alembic
+Script para criar/atualizar o banco de dados
+Aplica a cadeia de migrações do Alembic (alembic/versions, a partir de 0000_initial)
 """
 
 import subprocess
@@ -9,27 +9,13 @@ import sys
 import os
 
 def create_initial_migration():
-    """Cria a migração inicial do banco de dados"""
+    """Aplica as migrações ao banco de dados (a inicial já está versionada)"""
     
     try:
         # Verificar se alembic está instalado
         subprocess.run(["alembic", "--version"], check=True, capture_output=True)
         print("✅ Alembic encontrado")
         
-        # Criar migração inicial
-        print("📝 Criando migração inicial...")
-        result = subprocess.run([
-            "alembic", "revision", "--autogenerate", 
-            "-m", "Initial migration - create all tables"
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print("✅ Migração inicial criada com sucesso!")
-            print(f"Output: {result.stdout}")
-        else:
-            print(f"❌ Erro ao criar migração: {result.stderr}")
-            return False
-            
         # Aplicar migração
         print("🚀 Aplicando migração ao banco de dados...")
         result = subprocess.run([
@@ -0,0 +1,280 @@
+import json
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker, selectinload
+from app.core.database import Base
+from app.models import Company, AUMSnapshot
+from types import SimpleNamespace
+from app.services.ai_extractor import (
+    AIExtractor, allocate_tokens, needs_escalation, _validate_answer, plan_incremental,
+    PLAN_FULL, PLAN_INCREMENTAL, PLAN_CARRY_FORWARD, CARRY_FORWARD_METHOD
+)
+from app.utils.dedup import chunk_fingerprint
+from app.services.budget_controller import BudgetController
+
+class FakeBudget:
+    def __init__(self):
+        self.recorded = []
+        self.models = []
+    
+    def estimate_task_cost(self, tokens, model="gpt-4o"):
+        return 0.0
+    
+    async def check_budget_and_run(self, cost, db):
+        return True
+    
+    async def record_usage(self, db, company_id=None, prompt_tokens=0, completion_tokens=0, model=None, **kwargs):
+        self.recorded.append((company_id, prompt_tokens, completion_tokens))
+        self.models.append(model)
+
+def fake_response(content, prompt_tokens=100, completion_tokens=5):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    )
+
+class TestModelCascade:
+    """Testes para a cascata modelo barato -> modelo grande"""
+    
+    def test_needs_escalation(self):
+        """Escala com NAO_DISPONIVEL e evidência forte, valor inválido ou divergente"""
+        content = "A gestora tem R$ 2,3 bilhões de patrimônio sob gestão."
+        
+        assert needs_escalation("R$ 2,3 bi", content) is None
+        assert needs_escalation("NAO_DISPONIVEL", "Conheça nossa equipe.") is None
+        assert needs_escalation("NAO_DISPONIVEL", content) is not None
+        assert needs_escalation("R$ 900 bi", content) is not None
+        assert needs_escalation("R$ 0,001 mi", "Sem valores aqui.") is not None
+    
+    def test_model_specific_prices(self):
+        """Custo registrado usa o preço do modelo (mini bem mais barato que gpt-4o)"""
+        budget = BudgetController()
+        
+        assert budget.estimate_task_cost(1000, model="gpt-4o-mini") < budget.estimate_task_cost(1000) / 50
+        assert budget.estimate_task_cost(1000, model="gpt-4o-2024-08-06") == budget.estimate_task_cost(1000)
+    
+    @pytest.mark.asyncio
+    async def test_escalates_on_disagreement(self, monkeypatch):
+        """Resposta do modelo barato que diverge do conteúdo é refeita no modelo grande"""
+        extractor = AIExtractor()
+        extractor.cascade_enabled = True
+        extractor.budget_controller = FakeBudget()
+        calls = []
+        
+        async def fake_call(prompt, max_tokens=100, json_mode=False, model=None, **kwargs):
+            calls.append(model)
+            return fake_response("R$ 23 bi" if model == extractor.cheap_model else "R$ 2,3 bi")
+        
+        async def fake_finish(company, aum_text, content, sources, db, model=None):
+            return SimpleNamespace(aum_raw_text=aum_text, model=model)
+        
+        async def no_previous(company, db):
+            return None
+        
+        monkeypatch.setattr(extractor, "_call_openai", fake_call)
+        monkeypatch.setattr(extractor, "_finish_extraction", fake_finish)
+        monkeypatch.setattr(extractor, "_previous_snapshot", no_previous)
+        
+        snapshot = await extractor.extract_aum_from_content(
+            SimpleNamespace(id=1, name="Gestora"),
+            [{"status": "success", "content_type": "site", "url": "https://g.com",
+              "content": "A gestora tem R$ 2,3 bilhões de patrimônio sob gestão."}],
+            None
+        )
+        
+        assert calls == [extractor.cheap_model, extractor.model]
+        assert snapshot.aum_raw_text == "R$ 2,3 bi" and snapshot.model == extractor.model
+        assert extractor.budget_controller.models == calls
+    
+    @pytest.mark.asyncio
+    async def test_hedge_only_for_interactive_extractor(self):
+        """Pipeline, lotes e replay nunca pedem hedge; só o extrator interativo"""
+        hedges = []
+        
+        async def fake_call(prompt, max_tokens=100, json_mode=False, model=None, hedge=False, **kwargs):
+            hedges.append(hedge)
+            return fake_response("R$ 2,3 bi")
+        
+        for extractor in (AIExtractor(), AIExtractor(interactive=True)):
+            extractor.cascade_enabled = False
+            extractor.budget_controller = FakeBudget()
+            extractor._call_openai = fake_call
+            await extractor._ask_models(SimpleNamespace(id=1, name="Gestora"), "prompt", "", None)
+        
+        assert hedges == [False, True]
+
+class TestBatchExtraction:
+    """Testes para extração de várias empresas por prompt"""
+    
+    def test_allocate_tokens_sums_exactly(self):
+        """Rateio proporcional com inteiros que somam o total"""
+        shares = allocate_tokens(100, [1, 1, 1])
+        
+        assert sum(shares) == 100
+        assert sorted(shares) == [33, 33, 34]
+        assert allocate_tokens(10, [3, 1]) == [8, 2]
+    
+    def test_validate_answer(self):
+        """Só valores conversíveis ou NAO_DISPONIVEL são aceitos"""
+        assert _validate_answer(" NAO_DISPONIVEL ") == "NAO_DISPONIVEL"
+        assert _validate_answer(None) is None
+        assert _validate_answer(123) is None
+        assert _validate_answer("não sei") is None
+    
+    @pytest.mark.asyncio
+    async def test_group_usage_attributed_per_company(self, monkeypatch):
+        """Uso da chamada conjunta é rateado por empresa; respostas inválidas ficam de fora"""
+        extractor = AIExtractor()
+        extractor.budget_controller = FakeBudget()
+        
+        async def fake_call(prompt, max_tokens=100, json_mode=False, model=None):
+            assert json_mode and "### EMPRESA 1" in prompt and "### EMPRESA 2" in prompt
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(
+                    content=json.dumps({"1": "NAO_DISPONIVEL", "2": "talvez"})
+                ))],
+                usage=SimpleNamespace(prompt_tokens=300, completion_tokens=20)
+            )
+        
+        monkeypatch.setattr(extractor, "_call_openai", fake_call)
+        
+        group = [
+            {"company": SimpleNamespace(id=company_id, name=f"Gestora {company_id}"), "tokens": tokens,
+             "block": f"### EMPRESA {company_id}\nconteúdo", "content": ["conteúdo"]}
+            for company_id, tokens in [(1, 100), (2, 50)]
+        ]
+        
+        answers = await extractor._extract_group(group, None)
+        
+        assert answers == {1: "NAO_DISPONIVEL"}
+        recorded = extractor.budget_controller.recorded
+        assert [company_id for company_id, _, _ in recorded] == [1, 2]
+        assert sum(prompt for _, prompt, _ in recorded) == 300
+        assert sum(completion for _, _, completion in recorded) == 20
+        assert recorded[0][1] > recorded[1][1]
+
+class TestIncrementalExtraction:
+    """Testes para a extração incremental contra o snapshot anterior"""
+    
+    aum_chunk = "A gestora encerrou o ano com R$ 5,2 bilhões sob gestão"
+    about_chunk = "Fundada em 2010, a gestora atua em renda variável"
+    
+    def previous(self, chunks, answer_chunks, aum_text="R$ 5,2 bi"):
+        return SimpleNamespace(
+            aum_raw_text=aum_text,
+            evidence_fingerprints=[chunk_fingerprint(chunk) for chunk in chunks],
+            answer_fingerprints=[chunk_fingerprint(chunk) for chunk in answer_chunks]
+        )
+    
+    def test_unchanged_evidence_carries_forward(self):
+        """Mesmos trechos (mesmo com espaços/caixa diferentes) reaproveitam o valor"""
+        previous = self.previous([self.aum_chunk, self.about_chunk], [self.aum_chunk])
+        chunks = [self.about_chunk.upper(), "  " + self.aum_chunk, "Entre em contato pelo formulário"]
+        
+        assert plan_incremental(previous, chunks) == (PLAN_CARRY_FORWARD, [])
+    
+    def test_new_money_chunk_is_sent_alone(self):
+        """Só o trecho novo com valor monetário vai para o modelo"""
+        previous = self.previous([self.aum_chunk, self.about_chunk], [self.aum_chunk])
+        chunks = [self.aum_chunk, "Em 2024 o patrimônio chegou a R$ 6,1 bilhões", self.about_chunk]
+        
+        assert plan_incremental(previous, chunks) == (PLAN_INCREMENTAL, [1])
+    
+    def test_missing_answer_chunk_forces_full_extraction(self):
+        """Se o trecho da resposta anterior sumiu, extrai tudo de novo"""
+        previous = self.previous([self.aum_chunk, self.about_chunk], [self.aum_chunk])
+        
+        assert plan_incremental(previous, [self.about_chunk]) == (PLAN_FULL, [])
+        assert plan_incremental(None, [self.aum_chunk]) == (PLAN_FULL, [])
+    
+    @pytest.mark.asyncio
+    async def test_carried_forward_answer_counts_source_hits(self, monkeypatch):
+        """Resposta reaproveitada conta o acerto da fonte (sem tokens) para o rendimento"""
+        extractor = AIExtractor()
+        recorded = []
+        
+        class FakeTracker:
+            async def record_extraction(self, db, tokens_by_type, hit_types):
+                recorded.append((tokens_by_type, set(hit_types)))
+        
+        async def fake_snapshot(**kwargs):
+            return SimpleNamespace(**kwargs)
+        
+        extractor.yield_tracker = FakeTracker()
+        monkeypatch.setattr(extractor, "_create_aum_snapshot", fake_snapshot)
+        
+        previous = self.previous([self.aum_chunk, self.about_chunk], [self.aum_chunk])
+        snapshot = await extractor._finish_extraction(
+            SimpleNamespace(id=1, name="Gestora"), previous.aum_raw_text,
+            [self.about_chunk, self.aum_chunk], [("linkedin", "l"), ("site", "s")], None,
+            extraction_method=CARRY_FORWARD_METHOD, carried_from=previous
+        )
+        
+        assert recorded == [({}, {"site"})]
+        assert snapshot.source_type == "site"
+
+class TestChangeOnlySnapshots:
+    """Testes para o histórico de AUM só com mudanças"""
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_value_extends_previous_snapshot(self):
+        """Valor repetido estende o intervalo; valor novo cria outro snapshot"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with Session() as db:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+                
+                extractor = AIExtractor()
+                for index, aum_text in enumerate(["R$ 2,3 bi", "R$ 2,3 bilhões", "R$ 2,3 bi", "R$ 2,5 bi"]):
+                    await extractor._create_aum_snapshot(
+                        company, aum_text, [f"https://fonte{index}.com.br"], "conteúdo", db
+                    )
+                await extractor._create_empty_snapshot(company, db)
+                await extractor._create_empty_snapshot(company, db, error="Budget insuficiente")
+                
+                history = (await db.execute(
+                    select(AUMSnapshot).order_by(AUMSnapshot.id)
+                )).scalars().all()
+                
+                assert [(s.aum_raw_text, s.observation_count) for s in history] == [
+                    ("R$ 2,3 bi", 3), ("R$ 2,5 bi", 1), ("NAO_DISPONIVEL", 2)
+                ]
+                assert history[0].last_seen_at > history[0].first_seen_at
+                # Intervalo estendido fica com a fonte da observação mais recente
+                assert history[0].source_url == "https://fonte2.com.br"
+        finally:
+            await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_source_content_blob_loaded_only_on_request(self):
+        """Consultas comuns não trazem o blob; selectinload carrega o texto"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with Session() as db:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+                await AIExtractor()._create_aum_snapshot(company, "R$ 2,3 bi", [], "conteúdo longo", db)
+                db.expunge_all()
+                
+                snapshot = (await db.execute(select(AUMSnapshot))).scalar_one()
+                assert "source_content_blob" not in snapshot.__dict__
+                db.expunge_all()
+                
+                snapshot = (await db.execute(
+                    select(AUMSnapshot).options(selectinload(AUMSnapshot.source_content_blob))
+                )).scalar_one()
+                assert snapshot.source_content == "conteúdo longo"
+        finally:
+            await engine.dispose()
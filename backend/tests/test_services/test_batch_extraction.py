@@ -0,0 +1,151 @@
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models import Company, AUMSnapshot, Usage
+from app.services.ai_extractor import AIExtractor
+from app.services.batch_extraction import BatchExtractionRunner
+from app.services.fake_batch_server import create_fake_batch_app
+
+class TestBatchExtraction:
+    """Testes para extração via arquivo de lote contra o servidor local"""
+    
+    @pytest.mark.asyncio
+    async def test_batch_round_trip(self, tmp_path, monkeypatch):
+        """Lote enviado, consultado e ingerido em AUMSnapshot e Usage"""
+        monkeypatch.setattr(settings, "batch_files_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "openai_batch_base_url", "http://fake/v1")
+        
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        transport = httpx.ASGITransport(app=create_fake_batch_app())
+        try:
+            async with Session() as db, httpx.AsyncClient(transport=transport) as client:
+                companies = [Company(name="Gestora Alfa"), Company(name="Gestora Beta")]
+                db.add_all(companies)
+                await db.commit()
+                
+                runner = BatchExtractionRunner(AIExtractor(), http_client=client, poll_interval=0)
+                await runner.add_company(companies[0], [{
+                    "status": "success", "content_type": "site", "url": "https://alfa.com.br",
+                    "content": "A Gestora Alfa tem R$ 3,5 bilhões de patrimônio sob gestão."
+                }], db)
+                await runner.add_company(companies[1], [{
+                    "status": "success", "content_type": "news", "url": "https://news.com/beta",
+                    "content": "A Gestora Beta anunciou a contratação de um novo diretor de risco."
+                }], db)
+                
+                snapshots = await runner.run(db)
+                
+                assert {snapshot.aum_raw_text for snapshot in snapshots} == {"R$ 3,5 bilhões", "NAO_DISPONIVEL"}
+                alfa = next(snapshot for snapshot in snapshots if snapshot.company_id == companies[0].id)
+                assert alfa.source_type == "site"
+                
+                usages = (await db.execute(select(Usage))).scalars().all()
+                assert {usage.company_id for usage in usages} == {companies[0].id, companies[1].id}
+                assert all(usage.request_type == "aum_extraction_batch_file" for usage in usages)
+                assert len(list(tmp_path.glob("*.jsonl"))) == 1
+        finally:
+            await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_invalid_lines_fall_back_to_single_extraction(self, tmp_path, monkeypatch):
+        """Linha malformada, com erro ou ausente e lote que falhou caem na extração individual"""
+        monkeypatch.setattr(settings, "batch_files_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "openai_batch_base_url", "http://fake/v1")
+        
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        def broken_api(request):
+            return httpx.Response(500, json={"error": "indisponível"})
+        
+        try:
+            async with Session() as db, httpx.AsyncClient(transport=httpx.MockTransport(broken_api)) as client:
+                companies = [Company(name=f"Gestora {index}") for index in range(4)]
+                db.add_all(companies)
+                await db.commit()
+                
+                extractor = AIExtractor()
+                fallback = []
+                
+                async def fake_extract_single(company, scraped_data, db):
+                    fallback.append(company.id)
+                    return await extractor._create_empty_snapshot(company, db, error="individual")
+                
+                extractor._extract_single = fake_extract_single
+                runner = BatchExtractionRunner(extractor, http_client=client, poll_interval=0)
+                
+                async def queue_all(aum: str):
+                    for company in companies:
+                        await runner.add_company(company, [{
+                            "status": "success", "content_type": "site", "url": "https://g.com.br",
+                            "content": f"A {company.name} tem {aum} de patrimônio sob gestão."
+                        }], db)
+                
+                await queue_all("R$ 2 bilhões")
+                ok = {"choices": [{"message": {"content": "R$ 2 bilhões"}}], "usage": {}}
+                snapshots = await runner.ingest_results([
+                    {"custom_id": f"company-{companies[0].id}", "response": {"status_code": 200, "body": ok}},
+                    {"custom_id": f"company-{companies[1].id}", "response": {"status_code": 200, "body": {}}},
+                    {"custom_id": f"company-{companies[2].id}", "error": {"message": "rate limit"}},
+                ], db)
+                
+                assert len(snapshots) == 4
+                assert sorted(fallback) == [company.id for company in companies[1:]]
+                
+                # Falha ao enviar o lote: todas as pendentes vão para a extração individual
+                fallback.clear()
+                await queue_all("R$ 3 bilhões")
+                snapshots = await runner.run(db)
+                assert len(snapshots) == 4 and sorted(fallback) == [company.id for company in companies]
+                assert runner.pending_count == 0
+        finally:
+            await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_batch_over_budget_is_not_submitted(self, tmp_path, monkeypatch):
+        """Lote acima do budget diário não é enviado; as empresas ficam com snapshot vazio"""
+        monkeypatch.setattr(settings, "batch_files_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "openai_batch_base_url", "http://fake/v1")
+        
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        requests = []
+        
+        def api(request):
+            requests.append(request)
+            return httpx.Response(500)
+        
+        try:
+            async with Session() as db, httpx.AsyncClient(transport=httpx.MockTransport(api)) as client:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+                
+                extractor = AIExtractor()
+                extractor.budget_controller.daily_budget = 0.000001
+                runner = BatchExtractionRunner(extractor, http_client=client, poll_interval=0)
+                await runner.add_company(company, [{
+                    "status": "success", "content_type": "site", "url": "https://alfa.com.br",
+                    "content": "A Gestora Alfa tem R$ 3,5 bilhões de patrimônio sob gestão."
+                }], db)
+                
+                snapshots = await runner.run(db)
+                
+                assert requests == [] and runner.pending_count == 0
+                assert [snapshot.source_content for snapshot in snapshots] == ["Budget insuficiente"]
+                assert list(tmp_path.glob("*.jsonl")) == []
+        finally:
+            await engine.dispose()
@@ -0,0 +1,71 @@
+import os
+import pytest
+from datetime import datetime, timedelta, timezone
+from openpyxl import load_workbook
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import Company, AUMSnapshot, ScrapeLog
+from app.services.excel_exporter import ExcelExporter
+
+class TestExcelExporter:
+    """Testes para a exportação do Excel em blocos"""
+
+    @pytest.mark.asyncio
+    async def test_export_streams_rows_in_chunks(self):
+        """Lê em blocos menores que o total e mantém ordem, contagens e resumo"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        try:
+            async with Session() as db:
+                companies = [Company(name=f"Gestora {index}") for index in range(5)]
+                db.add_all(companies)
+                await db.commit()
+
+                now = datetime.now(timezone.utc)
+                db.add_all([
+                    AUMSnapshot(company_id=companies[1].id, aum_raw_text="R$ 1 bi", aum_normalized=1e9,
+                                confidence_score=0.9, extracted_at=now - timedelta(days=1)),
+                    AUMSnapshot(company_id=companies[1].id, aum_raw_text="R$ 2 bi", aum_normalized=2e9,
+                                confidence_score=0.8, extracted_at=now),
+                    AUMSnapshot(company_id=companies[3].id, aum_raw_text="R$ 500 mi", aum_normalized=5e8,
+                                confidence_score=0.7, extracted_at=now),
+                    ScrapeLog(company_id=companies[1].id, url="https://g1.com.br", status="success",
+                              content_type="site", scraped_at=now, scraped_content="texto"),
+                    ScrapeLog(company_id=companies[1].id, url="https://g1.com.br/x", status="failed",
+                              content_type="site", scraped_at=now),
+                    ScrapeLog(company_id=companies[1].id, url="https://g1.com.br/antigo", status="success",
+                              content_type="site", scraped_at=now - timedelta(days=400))
+                ])
+                await db.commit()
+
+                path = await ExcelExporter(chunk_size=2).export_to_file(db)
+
+            try:
+                workbook = load_workbook(path)
+                main = list(workbook["Resultados AUM"].values)
+                assert [row[0] for row in main[1:4]] == ["Gestora 1", "Gestora 3", "Gestora 0"]
+                assert main[1][5:7] == ("R$ 2 bi", 2e9)
+                assert main[1][11:14] == (1, 1, "https://g1.com.br")
+                assert len(main) == 6
+
+                logs = list(workbook["Logs de Scraping"].values)
+                assert sorted(row[5] for row in logs[1:]) == [0, 5]
+
+                summary = dict(list(workbook["Resumo"].values)[1:])
+                assert summary["Total de Empresas"] == 5
+                assert summary["Empresas com AUM Encontrado"] == 2
+                assert workbook["Resultados AUM"].column_dimensions["A"].width == len("Gestora 0") + 2
+            finally:
+                os.remove(path)
+        finally:
+            await engine.dispose()
+
+    def test_log_cutoff_is_utc(self):
+        """Janela de logs em UTC, comparável com scraped_at (DateTime(timezone=True))"""
+        cutoff = ExcelExporter()._log_cutoff()
+
+        assert cutoff.tzinfo == timezone.utc
@@ -0,0 +1,46 @@
+import os
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import Company, AUMSnapshot
+from app.services.export_jobs import ExportJobManager
+
+class TestExportJobs:
+    """Testes para os jobs de exportação do Excel em background"""
+
+    @pytest.mark.asyncio
+    async def test_job_reuses_file_until_data_changes(self, tmp_path):
+        """Gera o arquivo numa thread, devolve o cache para a mesma versão e refaz quando os dados mudam"""
+        url = f"sqlite+aiosqlite:///{tmp_path / 'export.db'}"
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        jobs = ExportJobManager(directory=str(tmp_path / "exports"), database_url=url)
+
+        try:
+            async with Session() as db:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+
+                first = await jobs.submit(db)
+                job = await jobs.wait(first["job_id"])
+                assert job["status"] == "done" and not job["cached"]
+                assert os.path.exists(jobs.get_file(first["job_id"]))
+
+                again = await jobs.submit(db)
+                assert again["cached"] and again["status"] == "done"
+                assert again["version"] == first["version"]
+
+                db.add(AUMSnapshot(company_id=company.id, aum_raw_text="R$ 1 bi", aum_normalized=1e9,
+                                   confidence_score=0.9))
+                await db.commit()
+
+                changed = await jobs.submit(db)
+                assert changed["version"] != first["version"] and not changed["cached"]
+                assert (await jobs.wait(changed["job_id"]))["status"] == "done"
+        finally:
+            jobs.close()
+            await engine.dispose()
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import DomainFetchStrategy
+from app.services.fetch_strategy import (
+    get_domain, looks_like_js_shell, FetchStrategyStore, STRATEGY_BROWSER, STRATEGY_HTTP
+)
+
+class TestFetchStrategy:
+    """Testes para detecção de páginas dependentes de JavaScript"""
+    
+    def test_get_domain_strips_www(self):
+        """Domínio normalizado sem www e em minúsculas"""
+        assert get_domain("https://www.Gestora.com.br/sobre") == "gestora.com.br"
+        assert get_domain("https://linkedin.com/company/x") == "linkedin.com"
+    
+    def test_detects_spa_shell(self):
+        """HTML com root vazio e pouco texto é casca de SPA"""
+        html = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+        assert looks_like_js_shell(html, "")
+    
+    def test_static_page_with_text_is_not_shell(self):
+        """Página com bastante texto não escala para o navegador"""
+        text = "A gestora possui patrimônio sob gestão de R$ 10 bilhões. " * 20
+        html = f'<html><body><div id="root"></div><p>{text}</p></body></html>'
+        assert not looks_like_js_shell(html, text)
+    
+    def test_small_static_page_is_not_shell(self):
+        """Página pequena sem marcadores de SPA continua em HTTP"""
+        html = "<html><body><p>Contato: (11) 1234-5678</p></body></html>"
+        assert not looks_like_js_shell(html, "Contato: (11) 1234-5678")
+    
+    @pytest.mark.asyncio
+    async def test_browser_fetches_do_not_extend_probe_ttl(self):
+        """Fetches frequentes com o navegador não adiam o re-teste com HTTP"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with Session() as db:
+                old_probe = datetime.now(timezone.utc) - timedelta(days=60)
+                db.add(DomainFetchStrategy(domain="gestora.com.br", strategy=STRATEGY_BROWSER,
+                                           success_count=10, probed_at=old_probe))
+                await db.commit()
+                
+                store = FetchStrategyStore()
+                await store.record_result(db, "gestora.com.br", STRATEGY_BROWSER, probed=False)
+                await db.commit()
+                
+                assert await store.get_strategy(db, "gestora.com.br") is None
+                
+                await store.record_result(db, "gestora.com.br", STRATEGY_BROWSER)
+                assert await store.get_strategy(db, "gestora.com.br") == STRATEGY_BROWSER
+        finally:
+            await engine.dispose()
+
+    
+    @pytest.mark.asyncio
+    async def test_shell_page_not_escalated_again_within_ttl(self):
+        """Domínio onde o navegador não trouxe ganho não abre o Chromium de novo até o TTL"""
+        from app.services.scraper import WebScraper
+        
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        shell = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+        rendered = []
+        
+        async def fake_fetch_html(url, require_html=True):
+            return shell
+        
+        async def fake_render(url):
+            rendered.append(url)
+            return shell
+        
+        try:
+            async with Session() as db:
+                scraper = WebScraper()
+                scraper._fetch_html = fake_fetch_html
+                scraper._render_with_playwright = fake_render
+                
+                for _ in range(3):
+                    await scraper._fetch_adaptive("https://gestora.com.br/login", db)
+                assert len(rendered) == 1
+                assert await scraper.strategy_store.get_strategy(db, "gestora.com.br") == STRATEGY_HTTP
+                
+                # Depois do TTL o domínio volta a ser testado com o navegador
+                record = await scraper.strategy_store._load(db, "gestora.com.br")
+                record.probed_at = datetime.now(timezone.utc) - timedelta(days=60)
+                await scraper._fetch_adaptive("https://gestora.com.br/login", db)
+                assert len(rendered) == 2
+        finally:
+            await engine.dispose()
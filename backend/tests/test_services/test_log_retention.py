@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker, selectinload
+from app.core.database import Base
+from app.models import Company, ScrapeLog, ContentBlob, ScrapeLogDailySummary
+from app.services.log_retention import LogRetentionManager, partition_name, next_month
+
+class TestLogRetention:
+    """Testes para a retenção e compactação dos scrape_logs"""
+
+    def test_partition_names(self):
+        """Partições mensais com virada de ano"""
+        month = datetime(2024, 12, 15).date()
+
+        assert partition_name(month.replace(day=1)) == "scrape_logs_y2024m12"
+        assert next_month(month) == datetime(2025, 1, 1).date()
+
+    def test_cutoff_is_timezone_aware(self):
+        """Cutoff em UTC, comparável com as colunas DateTime(timezone=True)"""
+        cutoff = LogRetentionManager(retention_days=90).cutoff()
+
+        assert cutoff.tzinfo == timezone.utc
+        assert cutoff.date() == datetime.now(timezone.utc).date() - timedelta(days=90)
+
+    @pytest.mark.asyncio
+    async def test_compacts_old_logs_into_daily_summaries(self):
+        """Logs antigos viram resumos por empresa/dia e os recentes ficam brutos"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        try:
+            async with Session() as db:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+
+                old_day = datetime.now() - timedelta(days=100)
+                recent = datetime.now() - timedelta(days=1)
+                db.add_all([
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br", status="success",
+                              content_type="site", scraped_at=old_day, scraped_content="texto antigo"),
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br/sobre", status="success",
+                              content_type="site", scraped_at=old_day + timedelta(minutes=5)),
+                    ScrapeLog(company_id=company.id, url="https://x.com/alfa", status="blocked",
+                              content_type="x", scraped_at=old_day),
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br", status="success",
+                              content_type="site", scraped_at=recent, scraped_content="texto recente")
+                ])
+                await db.commit()
+
+                report = await LogRetentionManager(retention_days=90).run(db)
+
+                assert report["logs_deleted"] == 3 and report["blobs_deleted"] == 1
+                logs = (await db.execute(
+                    select(ScrapeLog).options(selectinload(ScrapeLog.scraped_content_blob))
+                )).scalars().all()
+                assert [log.scraped_content for log in logs] == ["texto recente"]
+                assert await db.scalar(select(func.count()).select_from(ContentBlob)) == 1
+
+                summaries = (await db.execute(
+                    select(ScrapeLogDailySummary).order_by(ScrapeLogDailySummary.content_type)
+                )).scalars().all()
+                assert [(s.content_type, s.status, s.log_count, s.url_count) for s in summaries] == [
+                    ("site", "success", 2, 2), ("x", "blocked", 1, 1)
+                ]
+                assert summaries[0].day == old_day.date()
+        finally:
+            await engine.dispose()
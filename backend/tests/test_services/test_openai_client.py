@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.openai_client import LatencyTracker, hedged_call, get_openai_client
+
+class TestOpenAIClient:
+    """Testes para o cliente compartilhado e chamadas com hedge"""
+    
+    def test_client_is_shared(self):
+        """Todas as instâncias usam o mesmo cliente (e o mesmo pool)"""
+        assert get_openai_client() is get_openai_client()
+    
+    def test_p95_needs_samples(self):
+        """p95 só é estimado com amostras suficientes"""
+        tracker = LatencyTracker(min_samples=20)
+        for latency in range(10):
+            tracker.record("gpt-4o", latency)
+        assert tracker.p95("gpt-4o") is None
+        
+        for latency in range(10, 100):
+            tracker.record("gpt-4o", latency)
+        assert tracker.p95("gpt-4o") == 95
+    
+    @pytest.mark.asyncio
+    async def test_hedge_returns_first_answer(self, monkeypatch):
+        """Chamada lenta ganha cópia após o p95 e a resposta mais rápida vence"""
+        monkeypatch.setattr(settings, "openai_hedging_enabled", True)
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record("gpt-4o", 0.05)
+        delays = iter([5.0, 0.01])
+        hedges = []
+        
+        async def call():
+            delay = next(delays)
+            await asyncio.sleep(delay)
+            return delay
+        
+        async def allow_hedge():
+            hedges.append(True)
+            return True
+        
+        result = await asyncio.wait_for(hedged_call(call, "gpt-4o", allow_hedge, tracker), timeout=2)
+        
+        assert result == 0.01
+        assert hedges == [True]
+    
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_not_allowed(self, monkeypatch):
+        """Sem autorização (ex: budget) a chamada original segue sozinha"""
+        monkeypatch.setattr(settings, "openai_hedging_enabled", True)
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record("gpt-4o", 0.01)
+        calls = []
+        
+        async def call():
+            calls.append(True)
+            await asyncio.sleep(0.05)
+            return "ok"
+        
+        async def deny():
+            return False
+        
+        assert await hedged_call(call, "gpt-4o", deny, tracker) == "ok"
+        assert len(calls) == 1
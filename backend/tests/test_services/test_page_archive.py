@@ -0,0 +1,54 @@
+from datetime import datetime
+from app.services.page_archive import PageArchive
+
+class TestPageArchive:
+    """Testes para o arquivo de páginas brutas"""
+
+    def test_round_trip_and_dedup(self, tmp_path):
+        """Corpos iguais são gravados uma vez e lidos de volta após reabrir"""
+        archive = PageArchive(str(tmp_path))
+        html = "<html><body><p>R$ 3,5 bilhões sob gestão</p></body></html>".encode("utf-8")
+
+        first = archive.put("https://alfa.com.br", html, fetched_at=datetime(2024, 1, 1))
+        second = archive.put("https://alfa.com.br/sobre", html, fetched_at=datetime(2024, 1, 2))
+        other = archive.put("https://alfa.com.br", b"Texto novo", "text/plain", fetched_at=datetime(2024, 2, 1))
+        segment_size = (tmp_path / "segment-00001.arc").stat().st_size
+        archive.close()
+
+        assert first == second != other
+
+        reopened = PageArchive(str(tmp_path))
+        assert reopened.get(first) == (html, "text/html")
+        assert reopened.get_text(other) == ("Texto novo", "text/plain")
+        assert [entry["digest"] for entry in reopened.history("https://alfa.com.br")] == [first, other]
+        assert reopened.latest("https://alfa.com.br") == other
+
+        reopened.put("https://beta.com.br", html)
+        assert (tmp_path / "segment-00001.arc").stat().st_size == segment_size
+        reopened.close()
+
+    def test_segment_rollover(self, tmp_path):
+        """Segmento cheio abre um novo sem perder as leituras do anterior"""
+        archive = PageArchive(str(tmp_path), segment_max_bytes=200)
+        refs = [archive.put(f"https://g{i}.com.br", f"página {i} ".encode() * 40) for i in range(3)]
+
+        assert len(list(tmp_path.glob("segment-*.arc"))) == 3
+        assert archive.get(refs[0])[0] == "página 0 ".encode() * 40
+        archive.close()
+
+    def test_shared_directory_between_processes(self, tmp_path):
+        """Outra instância (outro worker) lê referências novas e grava depois delas"""
+        writer = PageArchive(str(tmp_path))
+        reader = PageArchive(str(tmp_path))
+
+        first = writer.put("https://alfa.com.br", b"primeira")
+        assert reader.get(first) == (b"primeira", "text/html")
+
+        second = reader.put("https://beta.com.br", b"segunda")
+        third = writer.put("https://gama.com.br", b"terceira")
+
+        assert writer.get(second)[0] == b"segunda" and reader.get(third)[0] == b"terceira"
+        assert reader.get(first)[0] == b"primeira"
+        assert reader.latest("https://gama.com.br") == third
+        writer.close()
+        reader.close()
@@ -0,0 +1,105 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import Company, AUMSnapshot, ScrapeLog
+from app.services.replay_pipeline import ReplayPipeline
+
+class TestReplayPipeline:
+    """Testes para o replay da extração a partir dos ScrapeLogs"""
+
+    @pytest.mark.asyncio
+    async def test_dry_run_report(self):
+        """Usa o log mais recente de cada URL na janela e não grava snapshots"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        try:
+            async with Session() as db:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+
+                now = datetime.now(timezone.utc)
+                db.add_all([
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br", status="success",
+                              content_type="site", scraped_at=now - timedelta(days=2),
+                              scraped_content="A Gestora Alfa tem R$ 1,0 bilhão sob gestão."),
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br", status="success",
+                              content_type="site", scraped_at=now - timedelta(hours=1),
+                              scraped_content="A Gestora Alfa tem R$ 3,5 bilhões de patrimônio sob gestão."),
+                    ScrapeLog(company_id=company.id, url="https://antigo.com.br", status="success",
+                              content_type="news", scraped_at=now - timedelta(days=30),
+                              scraped_content="Notícia antiga sobre a Gestora Alfa."),
+                    AUMSnapshot(company_id=company.id, aum_raw_text="NAO_DISPONIVEL", confidence_score=0.0)
+                ])
+                await db.commit()
+
+            replay = ReplayPipeline(dry_run=True, max_age_hours=72, session_factory=Session)
+            replay.extractor.cascade_enabled = False
+            prompts = []
+
+            async def fake_call(prompt, max_tokens=100, json_mode=False, model=None, **kwargs):
+                prompts.append(prompt)
+                return SimpleNamespace(
+                    choices=[SimpleNamespace(message=SimpleNamespace(content="R$ 3,5 bi"))],
+                    usage=SimpleNamespace(prompt_tokens=100, completion_tokens=5)
+                )
+
+            replay.extractor._call_openai = fake_call
+
+            report = await replay.run()
+
+            assert report["companies"] == 1 and report["changed"] == 1
+            result = report["results"][0]
+            assert result["sources"] == 1
+            assert result["previous_aum"] == "NAO_DISPONIVEL" and result["replayed_aum"] == "R$ 3,5 bi"
+            assert "3,5 bilhões" in prompts[0] and "1,0 bilhão" not in prompts[0]
+
+            async with Session() as db:
+                snapshots = (await db.execute(select(AUMSnapshot))).scalars().all()
+                assert len(snapshots) == 1
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_window_cutoff_in_utc(self, monkeypatch):
+        """Janela do replay em UTC, independente do fuso do servidor"""
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        # Servidor em UTC-3: um cutoff em hora local naive abriria a janela 3h a mais
+        monkeypatch.setenv("TZ", "America/Sao_Paulo")
+        time.tzset()
+        try:
+            async with Session() as db:
+                company = Company(name="Gestora Alfa")
+                db.add(company)
+                await db.commit()
+
+                now = datetime.now(timezone.utc)
+                db.add_all([
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br/dentro", status="success",
+                              content_type="site", scraped_at=now - timedelta(minutes=110),
+                              scraped_content="Dentro da janela."),
+                    ScrapeLog(company_id=company.id, url="https://alfa.com.br/fora", status="success",
+                              content_type="site", scraped_at=now - timedelta(minutes=130),
+                              scraped_content="Fora da janela.")
+                ])
+                await db.commit()
+
+                scraped = await ReplayPipeline(dry_run=True, max_age_hours=2).load_scraped_data(db)
+
+                assert [item["url"] for item in scraped[company.id]] == ["https://alfa.com.br/dentro"]
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+            await engine.dispose()
@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from app.services.resilience import (
+    CircuitBreaker,
+    FetchStatusError,
+    retry_with_backoff,
+    is_transient_error,
+    is_blocking_error
+)
+
+class TestCircuitBreaker:
+    """Testes para o circuit breaker por domínio"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Circuito abre após o limite de falhas consecutivas"""
+        breaker = CircuitBreaker(failure_threshold=3, block_threshold=2, reset_timeout=60)
+        
+        for _ in range(3):
+            assert breaker.allow_request("gestora.com.br")
+            breaker.record_failure("gestora.com.br")
+        
+        assert not breaker.allow_request("gestora.com.br")
+        assert breaker.allow_request("outra.com.br")
+    
+    def test_blocked_responses_open_faster(self):
+        """Respostas 403/429 abrem o circuito com limite próprio"""
+        breaker = CircuitBreaker(failure_threshold=5, block_threshold=2, reset_timeout=60)
+        
+        breaker.record_failure("linkedin.com", blocked=True)
+        assert breaker.allow_request("linkedin.com")
+        breaker.record_failure("linkedin.com", blocked=True)
+        assert not breaker.allow_request("linkedin.com")
+    
+    def test_success_resets_failures(self):
+        """Sucesso zera a contagem de falhas"""
+        breaker = CircuitBreaker(failure_threshold=2, block_threshold=2, reset_timeout=60)
+        
+        breaker.record_failure("gestora.com.br")
+        breaker.record_success("gestora.com.br")
+        breaker.record_failure("gestora.com.br")
+        
+        assert breaker.allow_request("gestora.com.br")
+    
+    def test_half_open_allows_single_trial(self):
+        """Após o reset_timeout apenas uma requisição de teste passa"""
+        breaker = CircuitBreaker(failure_threshold=1, block_threshold=1, reset_timeout=0)
+        
+        breaker.record_failure("gestora.com.br")
+        assert breaker.allow_request("gestora.com.br")
+        assert not breaker.allow_request("gestora.com.br")
+        
+        # Falha no teste reabre o circuito
+        breaker.record_failure("gestora.com.br")
+        assert breaker.is_open("gestora.com.br")
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_trial_releases_half_open(self):
+        """Requisição de teste cancelada libera o half-open; 404 não conta como falha"""
+        from app.services.scraper import WebScraper
+        
+        scraper = WebScraper()
+        scraper.circuit_breaker = CircuitBreaker(failure_threshold=1, block_threshold=1, reset_timeout=0)
+        scraper.circuit_breaker.record_failure("gestora.com.br")
+        
+        async def cancelled(url, db, force_browser=False):
+            raise asyncio.CancelledError()
+        
+        scraper._fetch_adaptive = cancelled
+        with pytest.raises(asyncio.CancelledError):
+            await scraper._fetch_with_resilience("https://gestora.com.br", None)
+        assert scraper.circuit_breaker.allow_request("gestora.com.br")
+        scraper.circuit_breaker.release_trial("gestora.com.br")
+        
+        async def not_found(url, db, force_browser=False):
+            raise FetchStatusError(404, url)
+        
+        scraper._fetch_adaptive = not_found
+        for _ in range(3):
+            with pytest.raises(FetchStatusError):
+                await scraper._fetch_with_resilience("https://gestora.com.br/x", None)
+        assert not scraper.circuit_breaker.is_open("gestora.com.br")
+
+class TestRetryWithBackoff:
+    """Testes para retries com backoff"""
+    
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        """Erros transitórios são repetidos até o sucesso"""
+        calls = []
+        
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise asyncio.TimeoutError()
+            return "ok"
+        
+        result = await retry_with_backoff(flaky, attempts=3, base_delay=0, max_delay=0)
+        
+        assert result == "ok"
+        assert len(calls) == 3
+    
+    @pytest.mark.asyncio
+    async def test_does_not_retry_blocking_status(self):
+        """403/429 não são repetidos"""
+        calls = []
+        
+        async def blocked():
+            calls.append(1)
+            raise FetchStatusError(429, "https://linkedin.com")
+        
+        with pytest.raises(FetchStatusError):
+            await retry_with_backoff(blocked, attempts=3, base_delay=0, max_delay=0)
+        
+        assert len(calls) == 1
+    
+    def test_error_classification(self):
+        """Teste classificação de erros"""
+        assert is_transient_error(FetchStatusError(503, "u"))
+        assert not is_transient_error(FetchStatusError(404, "u"))
+        assert is_blocking_error(FetchStatusError(403, "u"))
+        assert not is_blocking_error(ValueError("Conteúdo não é HTML"))
+    
+    @pytest.mark.asyncio
+    async def test_news_fetch_releases_half_open_trial(self, monkeypatch):
+        """Busca de notícias com 404 ou conteúdo não-HTML não deixa o half-open preso"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from app.services import news_scraper
+        
+        app = web.Application()
+        app.router.add_get("/ausente", lambda request: web.Response(status=404))
+        app.router.add_get("/pdf", lambda request: web.Response(body=b"%PDF", content_type="application/pdf"))
+        breaker = CircuitBreaker(failure_threshold=1, block_threshold=1, reset_timeout=0)
+        monkeypatch.setattr(news_scraper, "domain_circuit_breaker", breaker)
+        
+        async with TestServer(app) as server:
+            scraper = news_scraper.NewsScaper()
+            domain = news_scraper.get_domain(str(server.make_url("/")))
+            
+            breaker.record_failure(domain)
+            assert await scraper._fetch_search_results(str(server.make_url("/ausente"))) is None
+            assert not breaker.is_open(domain)
+            
+            breaker.record_failure(domain)
+            with pytest.raises(ValueError):
+                await scraper._fetch_search_results(str(server.make_url("/pdf")))
+            assert breaker.is_open(domain) and breaker.allow_request(domain)
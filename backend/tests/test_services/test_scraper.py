@@ -0,0 +1,22 @@
+import pytest
+from app.services.scraper import should_block_request
+
+class TestPlaywrightRequestBlocking:
+    """Testes para o bloqueio de recursos no Playwright"""
+    
+    def test_blocks_heavy_resource_types(self):
+        """Imagens, fontes, mídia e CSS são bloqueados"""
+        for resource_type in ["image", "font", "media", "stylesheet"]:
+            assert should_block_request(resource_type, "https://gestora.com.br/a")
+    
+    def test_keeps_document_and_scripts(self):
+        """Documento, scripts e XHR da própria página passam"""
+        assert not should_block_request("document", "https://gestora.com.br/")
+        assert not should_block_request("script", "https://gestora.com.br/app.js")
+        assert not should_block_request("xhr", "https://api.gestora.com.br/dados")
+    
+    def test_blocks_third_party_analytics(self):
+        """Scripts de analytics de terceiros são bloqueados, inclusive subdomínios"""
+        assert should_block_request("script", "https://www.googletagmanager.com/gtm.js")
+        assert should_block_request("xhr", "https://region1.google-analytics.com/g/collect")
+        assert not should_block_request("script", "https://notgoogle-analytics.com.br/x.js")
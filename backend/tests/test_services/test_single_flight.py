@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight
+
+class TestSingleFlight:
+    """Testes para coalescência de execuções concorrentes"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_execution(self):
+        """Chamadas simultâneas com a mesma chave executam uma vez só"""
+        flight = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(True)
+            await asyncio.sleep(0.05)
+            return "snapshot"
+        
+        results = await asyncio.gather(*(flight.do(1, work) for _ in range(3)))
+        
+        assert results == ["snapshot"] * 3
+        assert len(calls) == 1
+        assert not flight.in_flight(1)
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Cancelar quem iniciou não interrompe a execução compartilhada"""
+        flight = SingleFlight()
+        
+        async def work():
+            await asyncio.sleep(0.05)
+            return 42
+        
+        first = asyncio.ensure_future(flight.do("empresa", work))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("empresa", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        
+        assert await second == 42
+    
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_and_key_released(self):
+        """Erro chega a todos e a chave é liberada para nova tentativa"""
+        flight = SingleFlight()
+        
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("falhou")
+        
+        results = await asyncio.gather(flight.do(1, failing), flight.do(1, failing), return_exceptions=True)
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        
+        async def ok():
+            return "ok"
+        
+        assert await flight.do(1, ok) == "ok"
+    
+    @pytest.mark.asyncio
+    async def test_manual_owner_publishes_result(self):
+        """Dono via start/finish (pipeline) entrega o resultado a quem aguarda"""
+        flight = SingleFlight()
+        future, owner = flight.start(7)
+        joined, joined_owner = flight.start(7)
+        
+        flight.finish(7, result="snapshot")
+        
+        assert owner and not joined_owner
+        assert await joined == "snapshot"
@@ -0,0 +1,120 @@
+import pytest
+from app.services.site_crawler import SiteCrawler, score_link
+
+HOME = """
+<html><body>
+    <a href="/quem-somos">Quem Somos</a>
+    <a href="/blog/post-1">Blog</a>
+    <a href="/contato">Contato</a>
+    <a href="https://outro-site.com.br/sobre">Parceiro</a>
+    <p>Bem-vindo à gestora.</p>
+</body></html>
+"""
+
+PAGES = {
+    "https://gestora.com.br/quem-somos": "<p>Somos uma gestora com patrimônio sob gestão de R$ 12,5 bilhões.</p>",
+    "https://gestora.com.br/blog/post-1": "<p>Post do blog</p>",
+}
+
+class TestSiteCrawler:
+    """Testes para o crawl priorizado do site da gestora"""
+    
+    def test_score_link_prefers_institutional_pages(self):
+        """Links institucionais têm prioridade; contato e arquivos são ignorados"""
+        assert score_link("https://g.com.br/quem-somos", "Quem Somos") > score_link("https://g.com.br/blog/post", "Blog")
+        assert score_link("https://g.com.br/contato", "Fale conosco") < 0
+        assert score_link("https://g.com.br/lamina.pdf", "Lâmina") < 0
+    
+    @pytest.mark.asyncio
+    async def test_crawl_stops_on_strong_aum_evidence(self):
+        """Crawl visita a página mais promissora primeiro e para ao achar o AUM"""
+        fetched = []
+        
+        async def fake_fetch(url, require_html=True):
+            fetched.append(url)
+            if url.endswith("sitemap.xml"):
+                raise ValueError("sem sitemap")
+            return PAGES[url]
+        
+        crawler = SiteCrawler(fake_fetch, max_pages=5, max_depth=2, stop_score=0.9, delay=0)
+        pages = await crawler.crawl("https://gestora.com.br", HOME)
+        
+        assert [page["url"] for page in pages] == ["https://gestora.com.br/quem-somos"]
+        assert pages[0]["html"] == PAGES["https://gestora.com.br/quem-somos"]
+        assert pages[0]["score"] == 1.0
+        assert "https://outro-site.com.br/sobre" not in fetched
+    
+    @pytest.mark.asyncio
+    async def test_crawl_respects_page_budget(self):
+        """Crawl não passa do limite de páginas"""
+        async def fake_fetch(url, require_html=True):
+            if url.endswith("sitemap.xml"):
+                return "<urlset><url><loc>https://gestora.com.br/sobre</loc></url></urlset>"
+            return '<a href="/institucional/a">Institucional</a><a href="/institucional/b">Sobre</a>'
+        
+        crawler = SiteCrawler(fake_fetch, max_pages=2, max_depth=3, stop_score=0.9, delay=0)
+        pages = await crawler.crawl("https://gestora.com.br", HOME)
+        
+        assert len(pages) == 2
+    
+    @pytest.mark.asyncio
+    async def test_scraper_crawl_goes_through_circuit_breaker(self, monkeypatch):
+        """Crawl do scraper não busca páginas de domínio com circuito aberto"""
+        from app.core.config import settings
+        from app.models import Company
+        from app.services.resilience import CircuitBreaker
+        from app.services.scraper import WebScraper
+        
+        monkeypatch.setattr(settings, "request_delay", 0)
+        scraper = WebScraper()
+        scraper.circuit_breaker = CircuitBreaker(failure_threshold=1, block_threshold=1, reset_timeout=60)
+        scraper.circuit_breaker.record_failure("gestora.com.br")
+        fetched = []
+        
+        async def fake_fetch_html(url, require_html=True):
+            fetched.append(url)
+            return PAGES.get(url, "")
+        
+        scraper._fetch_html = fake_fetch_html
+        results = await scraper._crawl_site(Company(id=1, name="Gestora"), "https://gestora.com.br", "", HOME, None)
+        
+        assert results == [] and fetched == []
+    
+    @pytest.mark.asyncio
+    async def test_crawled_pages_archived_as_raw_html(self, tmp_path, monkeypatch):
+        """Páginas do crawl vão para o arquivo como HTML bruto, não como texto limpo"""
+        from app.core.config import settings
+        from app.models import Company
+        from app.services.page_archive import PageArchive
+        from app.services.resilience import CircuitBreaker
+        from app.services.scraper import WebScraper
+        
+        monkeypatch.setattr(settings, "request_delay", 0)
+        scraper = WebScraper()
+        scraper.archive = PageArchive(directory=str(tmp_path))
+        scraper.circuit_breaker = CircuitBreaker(failure_threshold=5, block_threshold=5, reset_timeout=60)
+        
+        async def fake_fetch(url, db, force_browser=False):
+            html = PAGES.get(url, "")
+            return await scraper._clean_html(html), html
+        
+        async def no_sitemap(url, require_html=True):
+            raise ValueError("sem sitemap")
+        
+        class FakeDB:
+            def add(self, obj):
+                pass
+        
+        scraper._fetch_adaptive = fake_fetch
+        scraper._fetch_html = no_sitemap
+        try:
+            results = await scraper._crawl_site(
+                Company(id=1, name="Gestora"), "https://gestora.com.br", "", HOME, FakeDB()
+            )
+            
+            url = "https://gestora.com.br/quem-somos"
+            assert [result["url"] for result in results] == [url]
+            body, media_type = scraper.archive.get_text(scraper.archive.latest(url))
+            assert media_type == "text/html" and body == PAGES[url]
+        finally:
+            scraper.archive.close()
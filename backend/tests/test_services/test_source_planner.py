@@ -0,0 +1,48 @@
+import pytest
+from app.services.source_planner import (
+    SourcePlanner, DEFAULT_SOURCE_ORDER, has_enough_evidence, find_answer_chunks
+)
+from app.core.config import settings
+
+class TestSourcePlanner:
+    """Testes para ordem das fontes, proveniência e parada antecipada"""
+    
+    @pytest.mark.asyncio
+    async def test_order_follows_yield_and_skips_poor_sources(self, monkeypatch):
+        """Fontes sem histórico vêm antes; rendimento ruim fica de fora"""
+        planner = SourcePlanner()
+        planner.min_yield_per_second = 0.01
+        planner.explore_rate = 0.0
+        
+        async def fake_yield(db):
+            return {"site": 0.05, "news": 0.2, "instagram": 0.001}
+        
+        monkeypatch.setattr(planner, "_yield_per_second", fake_yield)
+        
+        order = await planner.get_source_order(None)
+        
+        assert order == ["linkedin", "x", "news", "site"]
+        assert set(order) < set(DEFAULT_SOURCE_ORDER)
+    
+    def test_find_answer_chunks(self):
+        """Trechos com o número da resposta, em vírgula ou ponto decimal"""
+        chunks = [
+            "Fundada em 2003, a gestora tem 40 funcionários",
+            "Patrimônio sob gestão de R$ 2,3 bilhões",
+            "AUM of US$ 2.3 bi in 2023",
+            "Crescimento de 12,35% no ano"
+        ]
+        
+        assert find_answer_chunks("R$ 2,3 bi", chunks) == [1, 2]
+        assert find_answer_chunks("NAO_DISPONIVEL", chunks) == []
+    
+    def test_has_enough_evidence(self, monkeypatch):
+        """Parada só com evidência acima do limite e com a flag ligada"""
+        monkeypatch.setattr(settings, "aum_evidence_stop_score", 0.9)
+        monkeypatch.setattr(settings, "early_stop_enabled", True)
+        
+        assert has_enough_evidence(1.0)
+        assert not has_enough_evidence(0.3)
+        
+        monkeypatch.setattr(settings, "early_stop_enabled", False)
+        assert not has_enough_evidence(1.0)
@@ -0,0 +1,82 @@
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import URLNegativeCache
+from app.services.resilience import FetchStatusError
+from app.services.url_validator import URLValidator, dead_url_reason
+from app.api.routes.auto_setup import generate_url_candidates, generate_company_urls, _apply_validated_urls
+
+class TestURLValidator:
+    """Testes para validação de URLs adivinhadas"""
+    
+    @pytest.mark.asyncio
+    async def test_unresolvable_host_is_dead(self):
+        """Host que não resolve no DNS é marcado como inválido"""
+        validator = URLValidator()
+        
+        results = await validator.check_urls(["https://www.gestora-inexistente.invalid"])
+        
+        assert results["https://www.gestora-inexistente.invalid"] == (False, "dns")
+    
+    def test_dead_url_reason(self):
+        """Apenas 404/410 e DNS indicam URL inexistente"""
+        assert dead_url_reason(FetchStatusError(404, "u")) == "http_404"
+        assert dead_url_reason(FetchStatusError(410, "u")) == "http_410"
+        assert dead_url_reason(FetchStatusError(503, "u")) is None
+        assert dead_url_reason(ValueError("x")) is None
+    
+    def test_candidates_include_alternatives(self):
+        """Candidatas incluem TLDs e slugs alternativos, com a URL padrão primeiro"""
+        candidates = generate_url_candidates("Vinci Partners")
+        site, linkedin, instagram, _ = generate_company_urls("Vinci Partners")
+        
+        assert candidates["site"][0] == site
+        assert candidates["linkedin"][0] == linkedin
+        assert candidates["instagram"][0] == instagram
+        assert "https://www.vincipartners.com" in candidates["site"]
+        assert "https://www.linkedin.com/company/vinci-partners" in candidates["linkedin"]
+    
+    @pytest.mark.asyncio
+    async def test_revalidation_only_replaces_definitively_dead_urls(self, monkeypatch):
+        """Timeout mantém a URL, 404 só é trocado por alternativa viva e nada é apagado"""
+        candidates = generate_url_candidates("Vinci Partners")
+        statuses = {
+            "https://lenta.com.br": (False, "timeout"),
+            "https://morta.com.br": (False, "http_404"),
+            candidates["site"][1]: (True, "http_200"),
+        }
+        
+        async def fake_check(self, urls):
+            return {url: statuses.get(url, (False, "dns")) for url in urls}
+        
+        monkeypatch.setattr(URLValidator, "check_urls", fake_check)
+        
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        
+        slow = SimpleNamespace(name="Vinci Partners", url_site="https://lenta.com.br",
+                               url_linkedin=None, url_instagram=None, url_x=None)
+        dead = SimpleNamespace(name="Vinci Partners", url_site="https://morta.com.br",
+                               url_linkedin="https://www.linkedin.com/company/vinci", url_instagram=None, url_x=None)
+        curated = SimpleNamespace(name="XP Investimentos", url_site="https://morta.com.br",
+                                  url_linkedin=None, url_instagram=None, url_x=None)
+        
+        try:
+            async with Session() as db:
+                changes = await _apply_validated_urls([slow, dead, curated], db)
+                cached = set((await db.execute(select(URLNegativeCache.url))).scalars())
+        finally:
+            await engine.dispose()
+        
+        assert slow.url_site == "https://lenta.com.br"
+        assert dead.url_site == candidates["site"][1]
+        assert dead.url_linkedin == "https://www.linkedin.com/company/vinci"
+        assert curated.url_site == "https://morta.com.br"
+        assert [change["field"] for change in changes] == ["url_site"]
+        assert "https://morta.com.br" in cached and "https://lenta.com.br" not in cached
+
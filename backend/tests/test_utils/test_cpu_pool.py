@@ -0,0 +1,40 @@
+import pytest
+from app.core.config import settings
+from app.utils.cpu_pool import run_cpu_bound, shutdown_cpu_pool
+from app.utils.text_processing import clean_html
+
+class TestCpuPool:
+    """Testes para execução de tarefas CPU-bound fora do event loop"""
+
+    @pytest.mark.asyncio
+    async def test_small_input_runs_inline(self, monkeypatch):
+        """Entradas abaixo do limite rodam inline, sem criar o pool"""
+        monkeypatch.setattr(settings, "cpu_offload_threshold_chars", 1000)
+
+        html = "<p>Patrimônio de R$ 2 bi</p><script>x()</script>"
+        text = await run_cpu_bound(clean_html, html, size=len(html))
+
+        assert text == "Patrimônio de R$ 2 bi"
+
+    @pytest.mark.asyncio
+    async def test_large_input_uses_pool(self, monkeypatch):
+        """Entradas acima do limite são processadas no pool com o mesmo resultado"""
+        monkeypatch.setattr(settings, "cpu_offload_threshold_chars", 10)
+        monkeypatch.setattr(settings, "cpu_pool_workers", 1)
+
+        html = "<html><body><nav>menu</nav><p>AUM de R$ 5 bi</p></body></html>"
+        try:
+            text = await run_cpu_bound(clean_html, html, size=len(html))
+        finally:
+            shutdown_cpu_pool()
+
+        assert text == clean_html(html)
+        assert "menu" not in text
+
+    @pytest.mark.asyncio
+    async def test_disabled_pool_runs_inline(self, monkeypatch):
+        """Com cpu_pool_workers = 0 tudo roda inline"""
+        monkeypatch.setattr(settings, "cpu_offload_threshold_chars", 0)
+        monkeypatch.setattr(settings, "cpu_pool_workers", 0)
+
+        assert await run_cpu_bound(len, "abc", size=3) == 3
@@ -0,0 +1,27 @@
+from app.utils.dedup import deduplicate_passages, shingles, minhash_signature, estimated_similarity
+
+class TestDedup:
+    """Testes para deduplicação de trechos"""
+    
+    def test_near_duplicates_keep_first_copy(self):
+        """Boilerplate repetido em outra fonte (com pequenas diferenças) é removido"""
+        boilerplate = (
+            "A XYZ Investimentos é uma gestora independente fundada em 2010, com R$ 5,2 bilhões "
+            "sob gestão em fundos multimercado, ações e crédito privado para clientes institucionais"
+        )
+        passages = [
+            boilerplate,
+            "Nossa equipe é formada por 30 profissionais com ampla experiência no mercado.",
+            boilerplate.replace("A XYZ", "XYZ") + ".",
+            "A XYZ anunciou hoje a contratação de um novo gestor para a área de crédito."
+        ]
+        
+        assert deduplicate_passages(passages, threshold=0.8) == [0, 1, 3]
+    
+    def test_similarity_estimate(self):
+        """Textos iguais têm similaridade 1; textos diferentes, baixa"""
+        first = minhash_signature(shingles("patrimônio sob gestão de dez bilhões de reais em fundos"))
+        second = minhash_signature(shingles("equipe de profissionais com experiência no mercado local"))
+        
+        assert estimated_similarity(first, first) == 1.0
+        assert estimated_similarity(first, second) < 0.2
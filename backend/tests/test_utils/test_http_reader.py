@@ -0,0 +1,74 @@
+import pytest
+from app.utils.http_reader import read_html_capped, is_html_content_type
+
+class FakeStream:
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[i:i + self.chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+class FakeResponse:
+    """Imita a interface de aiohttp.ClientResponse usada pelo leitor"""
+    def __init__(self, body: bytes, content_type: str, charset=None, chunk_size: int = 4):
+        self.headers = {'content-type': content_type}
+        self.charset = charset
+        self.content_length = len(body)
+        self.url = "https://gestora.com.br"
+        self.content = FakeStream(body, chunk_size)
+
+class TestHttpReader:
+    """Testes para leitura em streaming com limite de bytes"""
+
+    @pytest.mark.asyncio
+    async def test_reads_full_body_with_multibyte_split_across_chunks(self):
+        """Caracteres multibyte divididos entre chunks são decodificados corretamente"""
+        body = "<p>Patrimônio sob gestão: R$ 2,5 bilhões</p>".encode("utf-8")
+        response = FakeResponse(body, "text/html; charset=utf-8", charset="utf-8", chunk_size=3)
+
+        html = await read_html_capped(response, max_bytes=10000)
+
+        assert html == body.decode("utf-8")
+
+    @pytest.mark.asyncio
+    async def test_stops_at_max_bytes(self):
+        """Leitura para ao atingir o limite de bytes"""
+        body = b"<p>" + b"a" * 1000 + b"</p>"
+        response = FakeResponse(body, "text/html", chunk_size=64)
+
+        html = await read_html_capped(response, max_bytes=100)
+
+        assert len(html) == 100
+        assert response.content.bytes_read <= 128
+
+    @pytest.mark.asyncio
+    async def test_rejects_non_html_before_reading(self):
+        """Content-Type não HTML é rejeitado sem ler o corpo"""
+        response = FakeResponse(b"%PDF-1.4 ...", "application/pdf")
+
+        with pytest.raises(ValueError):
+            await read_html_capped(response, max_bytes=1000)
+
+        assert response.content.bytes_read == 0
+
+    @pytest.mark.asyncio
+    async def test_uses_meta_charset_when_header_has_none(self):
+        """Sem charset no header, usa o declarado na tag meta"""
+        body = '<meta charset="iso-8859-1"><p>Gestão</p>'.encode("latin-1")
+        response = FakeResponse(body, "text/html", chunk_size=1024)
+
+        html = await read_html_capped(response, max_bytes=10000)
+
+        assert "Gestão" in html
+
+    def test_is_html_content_type(self):
+        """Teste identificação de Content-Type HTML"""
+        assert is_html_content_type("text/html; charset=utf-8")
+        assert is_html_content_type("application/xhtml+xml")
+        assert not is_html_content_type("image/png")
+        assert not is_html_content_type("")
@@ -3,7 +3,11 @@ from app.utils.text_processing import (
     extract_relevant_chunks,
     clean_text,
     extract_money_values,
-    count_tokens
+    count_tokens,
+    split_passages,
+    select_relevant_passages,
+    aum_evidence_score,
+    aum_candidates
 )
 
 class TestTextProcessing:
@@ -98,4 +102,33 @@ class TestTextProcessing:
         # Verificar que total de tokens não excede o limite
         total_text = " ".join(chunks)
         total_tokens = count_tokens(total_text)
-        assert total_tokens <= 600  # Margem de erro para estimativa
\ No newline at end of file
+        assert total_tokens <= 600  # Margem de erro para estimativa
+    
+    def test_select_relevant_passages_prefers_aum_statement(self):
+        """Trecho com valor perto de termo de AUM vence trechos só com palavras genéricas"""
+        passages = [
+            "Nossa gestão de riscos é feita por uma equipe de gestão dedicada à gestão de fundos.",
+            "Contamos com mais de 40 profissionais em São Paulo e no Rio de Janeiro.",
+            "A gestora encerrou o ano com R$ 12,5 bilhões de patrimônio sob gestão."
+        ]
+        
+        selected = select_relevant_passages(passages, max_tokens=25)
+        
+        assert selected == [2]
+    
+    def test_split_passages_single_line_text(self):
+        """Texto limpo numa linha só é dividido em trechos por frases"""
+        text = " ".join(f"Frase número {i} sobre a gestora e seus fundos." for i in range(40))
+        
+        passages = split_passages(text, max_words=30)
+        
+        assert len(passages) > 1
+        assert all(len(passage.split()) <= 60 for passage in passages)
+    
+    def test_aum_keyword_matches_whole_words_only(self):
+        """"aumento"/"aumentou" perto de valor não contam como evidência de AUM"""
+        text = "A empresa aumentou a receita para R$ 300 milhões após o aumento de capital."
+        
+        assert aum_evidence_score(text) == 0.3
+        assert aum_candidates(text) == []
+        assert aum_evidence_score("Temos R$ 2,5 bi de AUM.") == 1.0
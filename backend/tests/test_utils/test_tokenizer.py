@@ -0,0 +1,61 @@
+import pytest
+from app.utils import tokenizer
+from app.core.config import settings
+
+class FakeEncoding:
+    """Encoding falso: um token por palavra, contando as chamadas"""
+    name = "fake_base"
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def encode(self, text, disallowed_special=()):
+        self.calls += 1
+        return text.split()
+    
+    def encode_batch(self, texts, disallowed_special=()):
+        return [self.encode(text) for text in texts]
+
+class TestTokenizer:
+    """Testes para o tokenizer com cache"""
+    
+    @pytest.fixture
+    def fake_encoding(self, monkeypatch):
+        encoding = FakeEncoding()
+        monkeypatch.setitem(tokenizer._encodings, "cl100k_base", encoding)
+        tokenizer.clear_cache()
+        yield encoding
+        tokenizer.clear_cache()
+    
+    def test_model_encoding_mapping(self):
+        """Modelos mapeiam para o encoding correto"""
+        assert tokenizer.encoding_name_for_model("gpt-4o") == "o200k_base"
+        assert tokenizer.encoding_name_for_model("gpt-4o-mini") == "o200k_base"
+        assert tokenizer.encoding_name_for_model("gpt-4-turbo") == "cl100k_base"
+        assert tokenizer.encoding_name_for_model("gpt-3.5-turbo") == "cl100k_base"
+        assert tokenizer.encoding_name_for_model("modelo-desconhecido") == "cl100k_base"
+    
+    def test_counts_are_memoized(self, fake_encoding):
+        """Mesmo texto não é tokenizado de novo"""
+        assert tokenizer.count_tokens("patrimônio sob gestão", "gpt-4") == 3
+        assert tokenizer.count_tokens("patrimônio sob gestão", "gpt-4") == 3
+        
+        assert fake_encoding.calls == 1
+    
+    def test_batch_only_encodes_misses(self, fake_encoding):
+        """Contagem em lote só tokeniza os textos fora do cache"""
+        tokenizer.count_tokens("um dois", "gpt-4")
+        
+        counts = tokenizer.count_tokens_batch(["um dois", "três", "quatro cinco seis"], "gpt-4")
+        
+        assert counts == [2, 1, 3]
+        assert fake_encoding.calls == 3
+    
+    def test_cache_is_bounded(self, fake_encoding, monkeypatch):
+        """LRU descarta as contagens mais antigas"""
+        monkeypatch.setattr(settings, "tokenizer_cache_size", 2)
+        
+        for text in ["a", "b", "c"]:
+            tokenizer.count_tokens(text, "gpt-4")
+        
+        assert len(tokenizer._count_cache) == 2